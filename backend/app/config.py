@@ -7,10 +7,23 @@ class Settings(BaseSettings):
     
     DATABASE_URL: str
     
+    # Pool de connexions (par moteur, sync et async) : à dimensionner selon max_connections de PostgreSQL
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: int = 30
+    
+    # Jeton exigé par /api/v1/metrics (en-tête X-Metrics-Token) ; vide = endpoint désactivé
+    METRICS_TOKEN: Optional[str] = None
+    
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Cache des utilisateurs authentifiés (0 = désactivé) : borne aussi le délai de prise en compte entre workers
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
     GOOGLE_REDIRECT_URI: Optional[str] = None
@@ -19,6 +32,87 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = 5368709120
     STORAGE_QUOTA: int = 32212254720
     
+    # Réservations de quota des uploads en cours : expiration (upload direct) et libération des réservations abandonnées
+    QUOTA_RESERVATION_TTL_SECONDS: int = 3600
+    QUOTA_RESERVATION_CLEANUP_INTERVAL: int = 300
+    
+    # Réconciliation des statistiques de stockage (storage_stats, storage_used) avec les fichiers et dossiers
+    STORAGE_STATS_RECONCILE_INTERVAL: int = 86400
+    
+    # Arborescence des blobs : niveaux de sous-répertoires et caractères de l'empreinte par niveau (0 = à plat)
+    STORAGE_SHARD_DEPTH: int = 2
+    STORAGE_SHARD_WIDTH: int = 2
+    
+    # Taille des blocs lus/écrits lors des uploads (mémoire bornée par upload)
+    UPLOAD_CHUNK_SIZE: int = 1048576
+    
+    # Uploads reprenables : taille des morceaux, expiration et nettoyage des sessions
+    UPLOAD_SESSION_CHUNK_SIZE: int = 8388608
+    UPLOAD_SESSION_MIN_CHUNK_SIZE: int = 1048576
+    UPLOAD_SESSION_MAX_CHUNK_SIZE: int = 104857600
+    UPLOAD_SESSION_TTL_SECONDS: int = 86400
+    UPLOAD_SESSION_CLEANUP_INTERVAL: int = 3600
+    
+    # Upload instantané par empreinte SHA-256 (contenu déjà présent sur le serveur), désactivé par défaut :
+    # le client doit prouver qu'il détient le contenu en hachant une plage d'octets tirée par le serveur
+    INSTANT_UPLOAD_ENABLED: bool = False
+    INSTANT_UPLOAD_PROOF_BYTES: int = 65536
+    INSTANT_UPLOAD_CHALLENGE_TTL_SECONDS: int = 300
+    
+    # Détection du type MIME : début du fichier analysé par libmagic (pool de threads), types mémorisés par empreinte
+    MIME_SNIFF_BYTES: int = 65536
+    MIME_SNIFF_WORKERS: int = 2
+    MIME_CACHE_SIZE: int = 10000
+    
+    # Pagination des listings par curseur (taille par défaut et maximale d'une page)
+    LIST_PAGE_SIZE: int = 200
+    LIST_MAX_PAGE_SIZE: int = 1000
+    
+    # Recherche par nom : taille de page et profondeur maximale (offset + limit)
+    SEARCH_PAGE_SIZE: int = 50
+    SEARCH_MAX_RESULTS: int = 1000
+    
+    # Indexation du contenu des documents (texte, PDF, bureautique) en arrière-plan, hors requête
+    CONTENT_INDEX_ENABLED: bool = True
+    CONTENT_INDEX_WORKERS: int = 2
+    CONTENT_INDEX_QUEUE_SIZE: int = 1000
+    CONTENT_INDEX_MAX_BYTES: int = 10485760
+    CONTENT_INDEX_MAX_TERMS: int = 5000
+    CONTENT_INDEX_SCAN_INTERVAL: int = 600
+    
+    # Cache-Control des fichiers servis (téléchargement, aperçu, lien de partage) : revalidation par ETag
+    DOWNLOAD_CACHE_CONTROL: str = "private, no-cache"
+    PREVIEW_CACHE_CONTROL: str = "private, max-age=300"
+    SHARE_CACHE_CONTROL: str = "private, no-cache"
+    
+    # Envoi des fichiers : stream (API, lecture par blocs), x-accel-redirect (nginx, location interne
+    # DOWNLOAD_ACCEL_PREFIX, envoi sans copie) ou x-sendfile (Apache, lighttpd)
+    DOWNLOAD_MODE: str = "stream"
+    DOWNLOAD_ACCEL_PREFIX: str = "/protected-uploads/"
+    
+    # Miniatures et aperçus web des images (pool de processus, cache disque LRU sous UPLOAD_DIR/.renditions)
+    RENDITION_WORKERS: int = 2
+    RENDITION_FORMAT: str = "webp"
+    RENDITION_CACHE_MAX_BYTES: int = 1073741824
+    RENDITION_CACHE_CONTROL: str = "private, max-age=31536000, immutable"
+    
+    # Compression parallèle des membres ZIP (0 = compression séquentielle dans le flux)
+    ZIP_COMPRESSION_WORKERS: int = 0
+    ZIP_COMPRESSION_EXECUTOR: str = "thread"
+    ZIP_PARALLEL_MAX_MEMBER_SIZE: int = 16777216
+    
+    # Suppression physique des blobs en arrière-plan après une purge (tentatives avec attente croissante)
+    BLOB_UNLINK_WORKERS: int = 2
+    BLOB_UNLINK_RETRIES: int = 3
+    BLOB_UNLINK_RETRY_DELAY: float = 1.0
+    
+    # Nettoyage des fichiers orphelins (0 = tâche périodique désactivée, lancer python -m app.scripts.gc)
+    GC_INTERVAL: int = 86400
+    GC_GRACE_PERIOD_SECONDS: int = 86400
+    GC_BATCH_SIZE: int = 1000
+    GC_MAX_OPS_PER_SECOND: float = 500
+    GC_MAX_REPORTED_MISSING: int = 100
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,16 +1,71 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from app.config import settings
+from app.utils.pool_metrics import timed_pool_class
+import os
 
+# Pilotes asynchrones correspondant aux pilotes synchrones de DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str):
+    """Dérive l'URL asynchrone (asyncpg, aiosqlite) de DATABASE_URL"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    
+    if backend in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+    
+    return url
+
+def pool_options(url, pool_base, name: str):
+    """Pool à file d'attente instrumenté, dimensionné par les réglages DB_POOL_*"""
+    url = make_url(url)
+    
+    # Base SQLite en mémoire : connexion unique propre au pilote, pas de pool à dimensionner
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    
+    return {
+        "poolclass": timed_pool_class(pool_base, name),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+# Moteur synchrone : scripts d'administration, migrations et tâches exécutées hors boucle
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    echo=True if settings.ENVIRONMENT == "development" else False
+    echo=True if settings.ENVIRONMENT == "development" else False,
+    **pool_options(settings.DATABASE_URL, QueuePool, "sync")
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Moteur asynchrone : requêtes des handlers sans bloquer la boucle d'événements
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    echo=True if settings.ENVIRONMENT == "development" else False,
+    **pool_options(settings.DATABASE_URL, AsyncAdaptedQueuePool, "async")
+)
+
+# Pas d'expiration au commit : un attribut expiré déclencherait un chargement implicite impossible en asynchrone
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -20,10 +75,45 @@ def get_db():
     finally:
         db.close()
 
-def init_db():
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def import_models():
+    """Enregistre toutes les tables dans Base.metadata"""
     from app.models.user import User
     from app.models.file import File
     from app.models.folder import Folder
     from app.models.share import Share
+    from app.models.upload_session import UploadSession
+    from app.models.blob import Blob
+    from app.models.search_gram import SearchGram
+    from app.models.content_index import ContentDocument, ContentTerm
+    from app.models.quota_reservation import QuotaReservation
+    from app.models.storage_stat import StorageStat
+
+def alembic_config():
+    """Configuration Alembic de l'application (backend/alembic.ini), indépendante du répertoire courant"""
+    from alembic.config import Config
+    
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = Config(os.path.join(backend_dir, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(backend_dir, "migrations"))
+    config.attributes["configure_logger"] = False
+    
+    return config
+
+def init_db():
+    """Met le schéma à jour via les migrations Alembic (alembic upgrade head)"""
+    from alembic import command
+    
+    import_models()
+    tables = set(inspect(engine).get_table_names())
+    
+    # Base créée par create_all avant les migrations : marquée au schéma d'origine (0001) ;
+    # 0001a ajoute ce qui manque (blobs, content_hash, sessions d'upload), les révisions suivantes le reste
+    if "users" in tables and "alembic_version" not in tables:
+        command.stamp(alembic_config(), "0001")
     
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    # Chaque migration gère sa transaction (CREATE INDEX CONCURRENTLY hors transaction sous PostgreSQL)
+    command.upgrade(alembic_config(), "head")
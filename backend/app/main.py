@@ -1,8 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.routers import auth, users, files, folders, shares
+from app.routers import auth, users, files, folders, shares, metrics
 from app.database import init_db
+from app.services.upload_session_service import purge_expired_upload_sessions
+from app.services.quota_service import release_expired_quota_reservations
+from app.services.stats_service import reconcile_storage_stats
+from app.services.gc_service import collect_garbage
+from app.services.content_index_service import content_indexer, index_missing_content
+from app.utils.tasks import start_periodic, stop_all
+from app.utils.executors import shutdown_executors
+from app.utils.pool_metrics import PoolWaitMiddleware
 
 # Configuration FastAPI avec documentation OpenAPI automatique
 app = FastAPI(
@@ -24,10 +32,37 @@ app.add_middleware(
     expose_headers=["*"], 
 )
 
+# Attente de connexion imputée à chaque requête (en-tête Server-Timing et attentes les plus longues)
+app.add_middleware(PoolWaitMiddleware)
+
 # Initialisation des tables en base au démarrage
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    
+    # Expiration des sessions d'upload abandonnées et de leurs morceaux
+    start_periodic(purge_expired_upload_sessions, settings.UPLOAD_SESSION_CLEANUP_INTERVAL)
+    
+    # Réservations de quota d'uploads interrompus sans nettoyage (processus arrêté en cours d'écriture)
+    start_periodic(release_expired_quota_reservations, settings.QUOTA_RESERVATION_CLEANUP_INTERVAL)
+    
+    # Correction de la dérive des statistiques de stockage (écarts signalés dans les logs) : pas au démarrage
+    start_periodic(reconcile_storage_stats, settings.STORAGE_STATS_RECONCILE_INTERVAL, delay=settings.STORAGE_STATS_RECONCILE_INTERVAL)
+    
+    # Fichiers orphelins : pas au démarrage (parcours complet du stockage), puis à intervalle régulier
+    if settings.GC_INTERVAL > 0:
+        start_periodic(collect_garbage, settings.GC_INTERVAL, delay=settings.GC_INTERVAL)
+    
+    # Indexation du contenu des documents : workers et rattrapage des blobs non indexés
+    if settings.CONTENT_INDEX_ENABLED:
+        content_indexer.start()
+        start_periodic(index_missing_content, settings.CONTENT_INDEX_SCAN_INTERVAL)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    content_indexer.stop()
+    await stop_all()
+    shutdown_executors()
 
 # Enregistrement des routes API avec préfixe de versioning
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
@@ -35,6 +70,7 @@ app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
 app.include_router(files.router, prefix="/api/v1/files", tags=["Files"])
 app.include_router(folders.router, prefix="/api/v1/folders", tags=["Folders"])
 app.include_router(shares.router, prefix="/api/v1/shares", tags=["Shares"])
+app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["Metrics"])
 
 # Endpoint racine pour vérifier que l'API est accessible
 @app.get("/")
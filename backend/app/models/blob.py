@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class Blob(Base):
+    __tablename__ = "blobs"
+    
+    # Empreinte SHA-256 du contenu : un seul fichier physique par contenu
+    digest = Column(String(64), primary_key=True)
+    
+    size = Column(BigInteger, nullable=False)
+    storage_path = Column(String, nullable=False, unique=True)
+    
+    # Nombre de lignes File pointant vers ce contenu (corbeille incluse)
+    ref_count = Column(Integer, nullable=False, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<Blob {self.digest[:12]}... refs={self.ref_count}>"
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ContentDocument(Base):
+    """
+    État d'indexation du texte d'un blob : un contenu partagé par plusieurs fichiers n'est extrait qu'une fois
+    """
+    __tablename__ = "content_documents"
+    
+    digest = Column(String(64), primary_key=True)
+    
+    # indexed, empty (aucun texte), unsupported (type non extrait) ou failed
+    status = Column(String(16), nullable=False)
+    term_count = Column(Integer, nullable=False, default=0)
+    
+    indexed_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<ContentDocument {self.digest[:12]}... {self.status}>"
+
+
+class ContentTerm(Base):
+    """
+    Index inversé du contenu : un terme, un blob qui le contient et son nombre d'occurrences
+    """
+    __tablename__ = "content_terms"
+    
+    term = Column(String(64), primary_key=True)
+    digest = Column(String(64), primary_key=True)
+    frequency = Column(Integer, nullable=False)
+    
+    # Retrait des termes d'un blob libéré
+    __table_args__ = (
+        Index("ix_content_terms_digest", "digest"),
+    )
+    
+    def __repr__(self):
+        return f"<ContentTerm {self.term!r} {self.digest[:12]}...>"
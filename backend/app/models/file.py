@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, DateTime, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -15,8 +15,11 @@ class File(Base):
     size = Column(BigInteger, nullable=False)
     mime_type = Column(String, nullable=True)
     
-    # Chemin physique UUID pour éviter collisions
-    storage_path = Column(String, nullable=False, unique=True)
+    # Chemin physique du contenu, partagé entre fichiers identiques (déduplication)
+    storage_path = Column(String, nullable=False)
+    
+    # Empreinte SHA-256 du blob ; NULL pour les fichiers antérieurs non migrés
+    content_hash = Column(String(64), ForeignKey("blobs.digest"), nullable=True, index=True)
     
     # Relations : appartenance utilisateur et dossier parent
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -35,5 +38,32 @@ class File(Base):
     folder = relationship("Folder", back_populates="files")
     shares = relationship("Share", back_populates="file", cascade="all, delete-orphan")
     
+    # Index alignés sur les requêtes fréquentes (migrations 0002 à 0004)
+    __table_args__ = (
+        # Listing d'un dossier trié par nom, reprise après curseur (racine : folder_id IS NULL)
+        Index("ix_files_user_folder_name", "user_id", "folder_id", "is_deleted", "name", "id"),
+        # Fichiers d'un sous-arbre (téléchargement, corbeille, purge)
+        Index("ix_files_folder_deleted", "folder_id", "is_deleted"),
+        # Corbeille : index partiel limité aux fichiers supprimés
+        Index(
+            "ix_files_user_trash", "user_id", "deleted_at",
+            postgresql_where=text("is_deleted = true"),
+            sqlite_where=text("is_deleted = 1")
+        ),
+        # Nettoyage des orphelins : chemins propres aux fichiers antérieurs à la déduplication (hors blobs)
+        Index(
+            "ix_files_legacy_storage_path", "storage_path",
+            postgresql_where=text("content_hash IS NULL"),
+            sqlite_where=text("content_hash IS NULL")
+        ),
+        # Recherche par nom (ILIKE '%terme%') : trigrammes pg_trgm, PostgreSQL uniquement (migration 0004)
+        Index(
+            "ix_files_name_trgm", "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+            info={"dialect": "postgresql"}
+        ).ddl_if(dialect="postgresql"),
+    )
+    
     def __repr__(self):
         return f"<File {self.name}>"
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -22,5 +22,26 @@ class Folder(Base):
     parent = relationship("Folder", remote_side=[id], backref="subfolders")
     files = relationship("File", back_populates="folder", cascade="all, delete-orphan")
     
+    # Index alignés sur les requêtes fréquentes (migrations 0002 à 0004)
+    __table_args__ = (
+        # Listing des sous-dossiers trié par nom, reprise après curseur (racine : parent_id IS NULL)
+        Index("ix_folders_user_parent_name", "user_id", "parent_id", "is_deleted", "name", "id"),
+        # Descente récursive de l'arborescence (CTE)
+        Index("ix_folders_parent_deleted", "parent_id", "is_deleted"),
+        # Corbeille : index partiel limité aux dossiers supprimés
+        Index(
+            "ix_folders_user_trash", "user_id", "deleted_at",
+            postgresql_where=text("is_deleted = true"),
+            sqlite_where=text("is_deleted = 1")
+        ),
+        # Recherche par nom (ILIKE '%terme%') : trigrammes pg_trgm, PostgreSQL uniquement (migration 0004)
+        Index(
+            "ix_folders_name_trgm", "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+            info={"dialect": "postgresql"}
+        ).ddl_if(dialect="postgresql"),
+    )
+    
     def __repr__(self):
         return f"<Folder {self.name}>"
\ No newline at end of file
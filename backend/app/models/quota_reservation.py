@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class QuotaReservation(Base):
+    """
+    Espace réservé sur le quota pendant un upload (octets pas encore écrits ou pas encore validés)
+    Converti en espace utilisé à la création du fichier, libéré en cas d'échec ou d'expiration
+    """
+    __tablename__ = "quota_reservations"
+    
+    # Identifiant de l'upload : UUID, ou identifiant de la session d'upload reprenable
+    id = Column(String(36), primary_key=True)
+    
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    
+    # Réservation abandonnée (processus arrêté en cours d'upload) : libérée par la tâche périodique
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<QuotaReservation {self.id[:8]}... {self.size}>"
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Index
+from app.database import Base
+
+class SearchGram(Base):
+    """
+    Index n-grammes des noms de fichiers et dossiers, calculé en Python
+    Repli de la recherche hors PostgreSQL (pg_trgm indisponible) : table vide sous PostgreSQL
+    """
+    __tablename__ = "search_grams"
+    
+    # Élément indexé : "file" ou "folder" et son identifiant
+    kind = Column(String(6), primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    gram = Column(String(3), primary_key=True)
+    
+    user_id = Column(Integer, nullable=False)
+    
+    # Éléments d'un utilisateur contenant un n-gramme (ou un préfixe de n-gramme) : index couvrant
+    __table_args__ = (
+        Index("ix_search_grams_user_gram", "user_id", "kind", "gram", "item_id"),
+    )
+    
+    def __repr__(self):
+        return f"<SearchGram {self.kind}:{self.item_id} {self.gram!r}>"
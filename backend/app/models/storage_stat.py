@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, BigInteger, Boolean, ForeignKey
+from app.database import Base
+
+class StorageStat(Base):
+    """
+    Statistiques de stockage d'un utilisateur, tenues à jour dans la transaction de chaque modification
+    Une ligne par catégorie (type MIME principal des fichiers, ou "folder") et par état (actif ou corbeille)
+    """
+    __tablename__ = "storage_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category = Column(String(16), primary_key=True)
+    trashed = Column(Boolean, primary_key=True)
+    
+    item_count = Column(BigInteger, nullable=False, default=0)
+    bytes = Column(BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<StorageStat {self.user_id} {self.category}{' (corbeille)' if self.trashed else ''}: {self.item_count}>"
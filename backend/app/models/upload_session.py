@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    
+    # Identifiant opaque transmis au client pour reprendre l'upload
+    id = Column(String, primary_key=True, index=True)
+    
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    folder_id = Column(Integer, ForeignKey("folders.id"), nullable=True)
+    
+    filename = Column(String, nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    total_chunks = Column(Integer, nullable=False)
+    
+    # Expiration glissante : repoussée à chaque morceau reçu
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<UploadSession {self.id[:8]}...>"
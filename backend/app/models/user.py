@@ -20,6 +20,9 @@ class User(Base):
     storage_used = Column(BigInteger, default=0)
     storage_quota = Column(BigInteger, default=32212254720)
     
+    # Espace réservé par les uploads en cours (table quota_reservations) : compté dans le quota
+    storage_reserved = Column(BigInteger, nullable=False, default=0, server_default="0")
+    
     # OAuth : provider (google/microsoft) + ID unique provider
     oauth_provider = Column(String, nullable=True)
     oauth_provider_id = Column(String, nullable=True)
@@ -1,14 +1,14 @@
 import urllib.parse
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas.user import UserCreate, UserResponse
 from app.schemas.auth import LoginRequest, LoginResponse
 from app.services.auth_service import AuthService
 from app.services.auth_oauth import OAuthService
 from app.utils.dependencies import get_current_active_user
-from app.models.user import User
+from app.utils.user_cache import CurrentUser
 from app.config import settings
 from app.utils.security import create_access_token
 
@@ -17,12 +17,12 @@ router = APIRouter()
 @router.post("/register", response_model=LoginResponse, status_code=status.HTTP_201_CREATED)
 async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Inscription avec retour token pour connexion automatique
     """
-    user = AuthService.register_user(db, user_data)
+    user = await AuthService.register_user(db, user_data)
     
     # Token créé immédiatement pour éviter double connexion
     access_token = create_access_token(data={"sub": str(user.id), "email": user.email})
@@ -42,26 +42,28 @@ async def register(
 @router.post("/login", response_model=LoginResponse)
 async def login(
     login_data: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Connexion classique avec validation email/password
     """
-    result = AuthService.authenticate_user(db, login_data)
+    result = await AuthService.authenticate_user(db, login_data)
     return result
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Profil utilisateur authentifié via JWT
     """
-    return current_user
+    # Relecture en base : l'espace utilisé du profil en cache peut dater de quelques secondes
+    return await AuthService.get_user_by_id(db, current_user.id)
 
 @router.post("/logout")
 async def logout(
-    current_user: User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Déconnexion côté client (JWT stateless)
@@ -98,7 +100,7 @@ async def google_login():
 @router.get("/google/callback")
 async def google_callback(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Callback OAuth2 : échange code contre token puis création/connexion user
@@ -125,7 +127,7 @@ async def google_callback(
         user_info = await OAuthService.get_google_user_info(access_token)
         
         # Création ou récupération utilisateur local
-        user = OAuthService.find_or_create_oauth_user(db, user_info, "google")
+        user = await OAuthService.find_or_create_oauth_user(db, user_info, "google")
         
         # Génération JWT SUPFile
         access_token = create_access_token(data={"sub": str(user.id), "email": user.email})
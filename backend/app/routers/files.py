@@ -1,15 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
-from fastapi.responses import FileResponse as FastAPIFileResponse, StreamingResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
-from app.database import get_db
-from app.models.user import User
+from app.database import get_async_db
 from app.models.file import File as FileModel
 from app.models.folder import Folder
-from app.schemas.file import FileResponse, FileCreate, FileUpdate, FileUploadResponse
+from app.schemas.file import FileResponse, FileCreate, FileUpdate, FileUploadResponse, UploadSessionCreate, UploadSessionResponse, UploadChunkResponse, InstantUploadRequest, InstantUploadChallengeRequest, InstantUploadChallenge, SearchResults
 from app.services.file_service import FileService
+from app.services.search_service import SearchService
+from app.services.rendition_service import RenditionService
+from app.services.upload_session_service import UploadSessionService
 from app.utils.dependencies import get_current_active_user
+from app.utils.user_cache import CurrentUser
+from app.utils.pagination import PageParams, page_params, fetch_page
+from app.utils.http_files import file_response
+from app.config import settings
 import os
 from pathlib import Path
 
@@ -19,23 +25,159 @@ router = APIRouter()
 async def upload_file(
     folder_id: Optional[int] = Form(None),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Téléverser un fichier avec validation quota et dossier parent
     """
     return await FileService.upload_file(db, current_user, file, folder_id)
 
+def _check_instant_upload_enabled():
+    if not settings.INSTANT_UPLOAD_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload instantané désactivé"
+        )
+
+@router.post("/upload/instant/challenge", response_model=InstantUploadChallenge)
+async def instant_upload_challenge(
+    challenge_data: InstantUploadChallengeRequest,
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Défi de preuve de possession préalable à l'upload instantané
+    
+    - **offset** / **length** : plage d'octets du fichier à hacher
+    - **proof** attendue : SHA-256 hexadécimal de bytes.fromhex(nonce) suivi de cette plage
+    """
+    _check_instant_upload_enabled()
+    
+    return FileService.instant_upload_challenge(current_user, challenge_data)
+
+@router.post("/upload/instant", response_model=FileUploadResponse, status_code=status.HTTP_201_CREATED)
+async def instant_upload(
+    upload_data: InstantUploadRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Pré-upload par empreinte SHA-256 : fichier créé sans transfert si le contenu est déjà stocké
+    
+    - **challenge** / **proof** : défi obtenu sur /upload/instant/challenge et sa réponse
+    - 400 : défi invalide, expiré ou émis pour un autre contenu
+    - 404 : contenu inconnu ou preuve fausse, le client doit téléverser le fichier normalement
+    """
+    _check_instant_upload_enabled()
+    
+    result = await FileService.instant_upload(db, current_user, upload_data)
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contenu inconnu, téléversement requis"
+        )
+    
+    return result
+
+@router.post("/uploads", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    session_data: UploadSessionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Ouvrir une session d'upload reprenable (envoi par morceaux numérotés)
+    """
+    return await UploadSessionService.create_session(db, current_user, session_data)
+
+@router.get("/uploads/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    État d'une session : morceaux reçus et manquants pour reprendre l'envoi
+    """
+    upload = await UploadSessionService.get_session_status(db, session_id, current_user.id)
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session d'upload non trouvée ou expirée"
+        )
+    
+    return upload
+
+@router.put("/uploads/{session_id}/chunks/{index}", response_model=UploadChunkResponse)
+async def upload_chunk(
+    session_id: str,
+    index: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Envoi d'un morceau (corps brut), dans n'importe quel ordre ou en parallèle
+    """
+    chunk = await UploadSessionService.write_chunk(db, session_id, current_user.id, index, request.stream())
+    if not chunk:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session d'upload non trouvée ou expirée"
+        )
+    
+    return chunk
+
+@router.post("/uploads/{session_id}/commit", response_model=FileUploadResponse, status_code=status.HTTP_201_CREATED)
+async def commit_upload_session(
+    session_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Finaliser l'upload : assemblage des morceaux et création du fichier
+    """
+    result = await UploadSessionService.commit_session(db, session_id, current_user)
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session d'upload non trouvée ou expirée"
+        )
+    
+    return result
+
+@router.delete("/uploads/{session_id}")
+async def abort_upload_session(
+    session_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Abandonner une session d'upload et supprimer les morceaux reçus
+    """
+    success = await UploadSessionService.abort_session(db, session_id, current_user.id)
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session d'upload non trouvée ou expirée"
+        )
+    
+    return {"message": "Session d'upload annulée"}
+
 @router.get("/", response_model=List[FileResponse])
 async def get_files(
+    response: Response,
     folder_id: Optional[int] = None,
     show_deleted: bool = False,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Liste fichiers utilisateur avec filtres sur dossier et corbeille
+    
+    - **sort** / **order**: name (défaut), size, created_at ou mime_type ; asc ou desc
+    - **limit** / **cursor**: pagination par curseur, page suivante annoncée dans l'en-tête X-Next-Cursor
     """
     query = select(FileModel).where(FileModel.user_id == current_user.id)
     
@@ -51,14 +193,56 @@ async def get_files(
         else:
             query = query.where(FileModel.folder_id.is_(None))
     
-    files = db.execute(query).scalars().all()
+    page.check_phase("files")
+    
+    files, next_cursor = await fetch_page(
+        db, query, FileModel, page, "files",
+        limit=page.page_size if page.paginated else None,
+        after=page.after("files")
+    )
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return files
 
+@router.get("/search", response_model=SearchResults)
+async def search_items(
+    q: str = Query(..., min_length=1, max_length=255),
+    folder_id: Optional[int] = None,
+    limit: int = Query(settings.SEARCH_PAGE_SIZE, ge=1, le=settings.LIST_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    content: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Recherche fichiers et dossiers par nom (insensible à la casse, index trigrammes)
+    
+    - **q**: termes recherchés, tous doivent apparaître dans le nom ; nom exact, préfixe puis début de mot classés en tête
+    - **folder_id**: limite la recherche au dossier et à tous ses sous-dossiers
+    - **limit** / **offset**: pagination, page suivante à next_offset
+    - **content**: inclut les fichiers dont le texte indexé contient tous les mots, classés après les correspondances de nom
+    """
+    if offset + limit > settings.SEARCH_MAX_RESULTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Pagination limitée aux {settings.SEARCH_MAX_RESULTS} premiers résultats : affinez la recherche"
+        )
+    
+    results = await SearchService.search(db, current_user.id, q, folder_id, limit, offset, content)
+    if results is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dossier non trouvé"
+        )
+    
+    return results
+
 @router.get("/{file_id}", response_model=FileResponse)
 async def get_file(
     file_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Détails fichier avec vérification propriété
@@ -76,8 +260,8 @@ async def get_file(
 async def update_file(
     file_id: int,
     file_data: FileUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Mise à jour fichier : renommage ou déplacement
@@ -95,8 +279,8 @@ async def update_file(
 async def delete_file(
     file_id: int,
     permanent: bool = False,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Suppression fichier : corbeille (soft) ou définitive (hard)
@@ -113,8 +297,8 @@ async def delete_file(
 @router.post("/{file_id}/restore")
 async def restore_file(
     file_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Restauration fichier depuis corbeille
@@ -131,11 +315,14 @@ async def restore_file(
 @router.get("/{file_id}/download")
 async def download_file(
     file_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Téléchargement fichier avec nom original préservé
+    
+    Reprise et lecture partielle (Range, If-Range), revalidation (If-None-Match, If-Modified-Since)
     """
     file = await FileService.get_file_with_path(db, file_id, current_user.id)
     if not file:
@@ -152,20 +339,26 @@ async def download_file(
         )
     
     # Header Content-Disposition force le téléchargement
-    return FastAPIFileResponse(
-        path=filepath,
+    return file_response(
+        request,
+        str(filepath),
+        media_type=file.mime_type,
+        cache_control=settings.DOWNLOAD_CACHE_CONTROL,
         filename=file.original_name,
-        media_type=file.mime_type
+        digest=file.content_hash
     )
 
 @router.get("/{file_id}/preview")
 async def preview_file(
     file_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Prévisualisation fichier sans header download (affichage navigateur)
+    
+    Requêtes partielles prises en charge : lecture vidéo/audio avec déplacement dans le média
     """
     file = await FileService.get_file_with_path(db, file_id, current_user.id)
     if not file:
@@ -182,27 +375,41 @@ async def preview_file(
         )
     
     # Pas de Content-Disposition = affichage navigateur
-    return FastAPIFileResponse(
-        path=filepath,
-        media_type=file.mime_type
+    return file_response(
+        request,
+        str(filepath),
+        media_type=file.mime_type,
+        cache_control=settings.PREVIEW_CACHE_CONTROL,
+        digest=file.content_hash
     )
 
-@router.get("/search")
-async def search_items(
-    q: str,
-    folder_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+@router.get("/{file_id}/rendition/{name}")
+async def get_rendition(
+    file_id: int,
+    name: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
-    Recherche fichiers et dossiers par nom (case insensitive)
+    Miniature ou aperçu web d'une image, générés à la première demande puis servis depuis le cache
+    
+    - **name**: small (128 px), medium (256 px), large (512 px) ou preview (1920 px)
     """
-    from app.services.folder_service import FolderService
+    file = await FileService.get_file_with_path(db, file_id, current_user.id)
+    if not file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Fichier non trouvé"
+        )
     
-    files = await FileService.search_files(db, current_user.id, q, folder_id)
-    folders = await FolderService.search_folders(db, current_user.id, q, folder_id)
+    path = await RenditionService.get_rendition(file, name)
     
-    return {
-        "files": files,
-        "folders": folders
-    }
\ No newline at end of file
+    # Contenu d'un fichier jamais modifié : rendu immuable, mis en cache longtemps par le navigateur
+    return file_response(
+        request,
+        path,
+        media_type=RenditionService.media_type(),
+        cache_control=settings.RENDITION_CACHE_CONTROL,
+        digest=f"{RenditionService.content_key(file)}-{name}.{settings.RENDITION_FORMAT}"
+    )
@@ -1,16 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
-from app.database import get_db
-from app.models.user import User
+from app.database import get_async_db
 from app.models.folder import Folder
-from app.schemas.file import FolderCreate, FolderResponse
+from app.schemas.file import FolderCreate, FolderResponse, DirectoryListing
 from app.services.folder_service import FolderService
 from app.utils.dependencies import get_current_active_user
-import os
-import zipfile
-import io
+from app.utils.user_cache import CurrentUser
+from app.utils.pagination import PageParams, page_params, fetch_page
+from app.services.storage_service import StorageService
+from urllib.parse import quote
 from fastapi.responses import StreamingResponse
 
 router = APIRouter()
@@ -18,8 +18,8 @@ router = APIRouter()
 @router.post("/", response_model=FolderResponse, status_code=status.HTTP_201_CREATED)
 async def create_folder(
     folder_data: FolderCreate,
-    db: Session = Depends(get_db),
-   current_user = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+   current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Création dossier avec validation parent si spécifié
@@ -28,13 +28,18 @@ async def create_folder(
 
 @router.get("/", response_model=List[FolderResponse])
 async def get_folders(
+    response: Response,
     parent_id: Optional[int] = None,
     show_deleted: bool = False,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_active_user)
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Liste dossiers avec filtres sur parent et corbeille
+    
+    - **sort** / **order**: name (défaut) ou created_at ; size et mime_type trient les dossiers par nom
+    - **limit** / **cursor**: pagination par curseur, page suivante annoncée dans l'en-tête X-Next-Cursor
     """
     query = select(Folder).where(Folder.user_id == current_user.id)
     
@@ -50,14 +55,45 @@ async def get_folders(
         else:
             query = query.where(Folder.parent_id.is_(None))
     
-    folders = db.execute(query).scalars().all()
+    page.check_phase("folders")
+    
+    folders, next_cursor = await fetch_page(
+        db, query, Folder, page, "folders",
+        limit=page.page_size if page.paginated else None,
+        after=page.after("folders")
+    )
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return folders
 
+@router.get("/contents", response_model=DirectoryListing)
+async def list_directory(
+    folder_id: Optional[int] = None,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Contenu d'un dossier (None = racine) en une seule page : sous-dossiers d'abord, puis fichiers
+    
+    - **limit**: taille de page (LIST_PAGE_SIZE par défaut)
+    - **cursor**: next_cursor de la page précédente, absent sur la dernière page
+    """
+    listing = await FolderService.list_directory(db, current_user.id, folder_id, page)
+    if listing is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dossier non trouvé"
+        )
+    
+    return listing
+
 @router.get("/{folder_id}", response_model=FolderResponse)
 async def get_folder(
     folder_id: int,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Détails dossier avec vérification propriété
@@ -75,8 +111,8 @@ async def get_folder(
 async def update_folder(
     folder_id: int,
     folder_data: dict,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Mise à jour dossier : renommage ou déplacement avec validation cycles
@@ -95,8 +131,8 @@ async def delete_folder(
     folder_id: int,
     permanent: bool = False,
     recursive: bool = True,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Suppression dossier : recursive=True supprime contenu, permanent=True bypass corbeille
@@ -114,8 +150,8 @@ async def delete_folder(
 async def restore_folder(
     folder_id: int,
     recursive: bool = True,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Restauration dossier depuis corbeille avec contenu si recursive=True
@@ -132,34 +168,27 @@ async def restore_folder(
 @router.get("/{folder_id}/download")
 async def download_folder(
     folder_id: int,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_active_user)
+    compression: str = Query("auto", pattern="^(auto|store|fast|best)$"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Téléchargement dossier complet en ZIP avec arborescence préservée
+    
+    - **compression**: auto (défaut), store, fast ou best ; les formats déjà compressés sont toujours stockés
     """
-    folder_data = await FolderService.get_folder_contents_for_download(db, folder_id, current_user.id)
+    folder_data = await StorageService.prepare_folder_download(db, folder_id, current_user.id)
     if not folder_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Dossier non trouvé ou vide"
         )
     
-    # Création ZIP en mémoire (streaming)
-    zip_io = io.BytesIO()
-    with zipfile.ZipFile(zip_io, mode='w', compression=zipfile.ZIP_DEFLATED) as zip_file:
-        folder_name = folder_data["name"]
-        
-        # Ajout fichiers avec chemins relatifs
-        for file_path, file_info in folder_data["files"].items():
-            zip_file.write(
-                file_info["path"], 
-                arcname=os.path.join(file_path, file_info["name"])
-            )
+    folder_name = folder_data["name"]
     
-    zip_io.seek(0)
     return StreamingResponse(
-        zip_io,
+        # Archive produite à la volée : mémoire constante, premier octet envoyé immédiatement
+        StorageService.create_zip_from_folder(folder_data, compression),
         media_type="application/zip",
-        headers={"Content-Disposition": f"attachment; filename={folder_name}.zip"}
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(folder_name)}.zip"}
     )
\ No newline at end of file
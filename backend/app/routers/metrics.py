@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Header
+from typing import Optional
+from app.database import engine, async_engine
+from app.config import settings
+from app.utils.pool_metrics import pool_status
+from app.utils.user_cache import user_cache
+import secrets
+
+router = APIRouter()
+
+async def verify_metrics_token(x_metrics_token: Optional[str] = Header(None)):
+    """
+    Accès réservé aux outils d'exploitation détenteurs de METRICS_TOKEN
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Métriques désactivées"
+        )
+    
+    if not x_metrics_token or not secrets.compare_digest(x_metrics_token, settings.METRICS_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Jeton de métriques invalide"
+        )
+
+@router.get("/")
+async def get_metrics(
+    _: None = Depends(verify_metrics_token)
+):
+    """
+    État des pools de connexions (connexions prêtées, débordement, histogramme d'attente, attentes les plus longues)
+    et compteurs du cache des utilisateurs authentifiés
+    """
+    return {
+        "database": {
+            "pool_settings": {
+                "pool_size": settings.DB_POOL_SIZE,
+                "max_overflow": settings.DB_MAX_OVERFLOW,
+                "pool_recycle": settings.DB_POOL_RECYCLE,
+                "pool_timeout": settings.DB_POOL_TIMEOUT
+            },
+            "async": pool_status(async_engine.pool),
+            "sync": pool_status(engine.pool)
+        },
+        "user_cache": user_cache.snapshot()
+    }
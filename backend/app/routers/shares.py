@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from fastapi.responses import FileResponse, RedirectResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
-from app.database import get_db
-from app.models.user import User
+from app.database import get_async_db
 from app.models.file import File
 from app.models.share import Share
 from app.schemas.share import ShareCreate, ShareResponse
 from app.services.share_service import ShareService
+from app.services.blob_store import BlobStore
 from app.utils.dependencies import get_current_active_user
+from app.utils.user_cache import CurrentUser
+from app.utils.http_files import file_response
 from app.config import settings
 from pathlib import Path
 import datetime
@@ -20,8 +22,8 @@ router = APIRouter()
 async def create_share(
     file_id: int,
     share_data: ShareCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Créer un lien de partage pour un fichier
@@ -30,13 +32,13 @@ async def create_share(
     - **expires_at**: Date d'expiration (optionnelle)
     """
     
-    file = db.execute(
+    file = (await db.execute(
         select(File).where(
             File.id == file_id,
             File.user_id == current_user.id,
             File.is_deleted == False
         )
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
     
     if not file:
         raise HTTPException(
@@ -49,8 +51,8 @@ async def create_share(
 @router.get("/", response_model=List[ShareResponse])
 async def get_shares(
     file_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Récupérer la liste des liens de partage de l'utilisateur
@@ -62,8 +64,8 @@ async def get_shares(
 @router.delete("/{share_id}")
 async def delete_share(
     share_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Supprimer un lien de partage
@@ -82,7 +84,7 @@ async def delete_share(
 @router.get("/public/{token}")
 async def access_shared_file(
     token: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None
 ):
     """
@@ -92,12 +94,12 @@ async def access_shared_file(
     - **token**: Token unique du lien de partage
     """
     
-    share = db.execute(
+    share = (await db.execute(
         select(Share).where(
             Share.token == token,
             Share.is_active == True
         )
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
     
     if not share:
         raise HTTPException(
@@ -108,19 +110,19 @@ async def access_shared_file(
     
     if share.expires_at and share.expires_at < datetime.datetime.now(datetime.timezone.utc):
         share.is_active = False
-        db.commit()
+        await db.commit()
         raise HTTPException(
             status_code=status.HTTP_410_GONE,
             detail="Ce lien de partage a expiré"
         )
     
     
-    file = db.execute(
+    file = (await db.execute(
         select(File).where(
             File.id == share.file_id,
             File.is_deleted == False
         )
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
     
     if not file:
         raise HTTPException(
@@ -128,7 +130,7 @@ async def access_shared_file(
             detail="Fichier non trouvé ou supprimé"
         )
     
-    filepath = Path(file.storage_path)
+    filepath = Path(BlobStore.resolve_path(file.storage_path, file.content_hash))
     if not filepath.exists():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -137,10 +139,13 @@ async def access_shared_file(
     
     
     if request and request.query_params.get("download") == "1":
-        return FileResponse(
-            path=filepath,
+        return file_response(
+            request,
+            str(filepath),
+            media_type=file.mime_type,
+            cache_control=settings.SHARE_CACHE_CONTROL,
             filename=file.original_name,
-            media_type=file.mime_type
+            digest=file.content_hash
         )
     
     
@@ -156,7 +161,8 @@ async def access_shared_file(
 @router.get("/public/{token}/download")
 async def download_shared_file(
     token: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Télécharger un fichier partagé
@@ -164,12 +170,12 @@ async def download_shared_file(
     - **token**: Token unique du lien de partage
     """
     
-    share = db.execute(
+    share = (await db.execute(
         select(Share).where(
             Share.token == token,
             Share.is_active == True
         )
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
     
     if not share:
         raise HTTPException(
@@ -180,19 +186,19 @@ async def download_shared_file(
     
     if share.expires_at and share.expires_at < datetime.datetime.now(datetime.timezone.utc):
         share.is_active = False
-        db.commit()
+        await db.commit()
         raise HTTPException(
             status_code=status.HTTP_410_GONE,
             detail="Ce lien de partage a expiré"
         )
     
     
-    file = db.execute(
+    file = (await db.execute(
         select(File).where(
             File.id == share.file_id,
             File.is_deleted == False
         )
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
     
     if not file:
         raise HTTPException(
@@ -200,7 +206,7 @@ async def download_shared_file(
             detail="Fichier non trouvé ou supprimé"
         )
     
-    filepath = Path(file.storage_path)
+    filepath = Path(BlobStore.resolve_path(file.storage_path, file.content_hash))
     if not filepath.exists():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -208,8 +214,12 @@ async def download_shared_file(
         )
     
     
-    return FileResponse(
-        path=filepath,
+    # Reprise de téléchargement (Range) et revalidation (ETag) sans authentification
+    return file_response(
+        request,
+        str(filepath),
+        media_type=file.mime_type,
+        cache_control=settings.SHARE_CACHE_CONTROL,
         filename=file.original_name,
-        media_type=file.mime_type
+        digest=file.content_hash
     )
\ No newline at end of file
@@ -1,43 +1,56 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
-from app.schemas.user import UserResponse, UserUpdate
+from app.database import get_async_db
+from app.schemas.user import UserResponse, UserUpdate, StorageInfoResponse
 from app.schemas.oauth import OAuthProviderInfo, OAuthDisconnectRequest
-from app.models.user import User
 from app.utils.dependencies import get_current_active_user
+from app.utils.user_cache import CurrentUser
 from app.services.user_service import UserService
+from app.services.storage_service import StorageService
 
 
 router = APIRouter()
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user(
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Récupérer les informations de l'utilisateur connecté
     """
-    return current_user
+    # Relecture en base : l'espace utilisé du profil en cache peut dater de quelques secondes
+    return await UserService.get_user_by_id(db, current_user.id)
+
+@router.get("/me/storage", response_model=StorageInfoResponse)
+async def get_storage_info(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """
+    Récupérer l'utilisation du stockage : quota, corbeille et répartition par type de fichier
+    """
+    return await StorageService.get_user_storage_info(db, current_user.id)
 
 @router.put("/me", response_model=UserResponse)
 async def update_current_user(
     user_data: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Mettre à jour les informations de l'utilisateur
     
     - **full_name**: Nouveau nom complet (optionnel)
     """
-    return UserService.update_user(db, current_user.id, user_data)
+    return await UserService.update_user(db, current_user.id, user_data)
 
 @router.put("/me/password")
 async def change_password(
     password_data: dict,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Changer le mot de passe
@@ -51,9 +64,9 @@ async def change_password(
             detail="Les mots de passe actuels et nouveaux sont requis"
         )
         
-    UserService.change_password(
+    await UserService.change_password(
         db, 
-        current_user, 
+        current_user.id, 
         password_data["current_password"], 
         password_data["new_password"]
     )
@@ -62,7 +75,7 @@ async def change_password(
 
 @router.get("/me/oauth", response_model=List[OAuthProviderInfo])
 async def get_oauth_connections(
-    current_user: User = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Récupérer les connexions OAuth de l'utilisateur
@@ -80,8 +93,8 @@ async def get_oauth_connections(
 @router.post("/me/oauth/disconnect")
 async def disconnect_oauth_provider(
     disconnect_data: OAuthDisconnectRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     """
     Déconnecter un fournisseur OAuth
@@ -94,4 +107,4 @@ async def disconnect_oauth_provider(
             detail=f"Pas de connexion active au fournisseur: {disconnect_data.provider}"
         )
         
-    return UserService.disconnect_oauth(db, current_user, disconnect_data.provider)
\ No newline at end of file
+    return await UserService.disconnect_oauth(db, current_user.id, disconnect_data.provider)
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List
 from datetime import datetime
 
 class FileBase(BaseModel):
@@ -33,6 +33,25 @@ class FileUploadResponse(BaseModel):
     mime_type: Optional[str]
     message: str = "File uploaded successfully"
 
+class InstantUploadChallengeRequest(BaseModel):
+    size: int = Field(..., ge=0)
+    digest: str = Field(..., pattern=r"^[0-9a-f]{64}$")
+
+class InstantUploadChallenge(BaseModel):
+    challenge: str
+    nonce: str
+    offset: int
+    length: int
+    expires_in: int
+
+class InstantUploadRequest(BaseModel):
+    name: str
+    size: int = Field(..., ge=0)
+    digest: str = Field(..., pattern=r"^[0-9a-f]{64}$")
+    folder_id: Optional[int] = None
+    challenge: str
+    proof: str = Field(..., pattern=r"^[0-9a-f]{64}$")
+
 class FolderCreate(BaseModel):
     name: str
     parent_id: Optional[int] = None
@@ -46,4 +65,35 @@ class FolderResponse(BaseModel):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class DirectoryListing(BaseModel):
+    folders: List[FolderResponse]
+    files: List[FileResponse]
+    next_cursor: Optional[str] = None
+
+class SearchResults(BaseModel):
+    files: List[FileResponse]
+    folders: List[FolderResponse]
+    next_offset: Optional[int] = None
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(..., ge=0)
+    folder_id: Optional[int] = None
+    chunk_size: Optional[int] = None
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    filename: str
+    size: int
+    folder_id: Optional[int]
+    chunk_size: int
+    total_chunks: int
+    received_chunks: List[int]
+    missing_chunks: List[int]
+    expires_at: datetime
+
+class UploadChunkResponse(BaseModel):
+    index: int
+    size: int
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Optional, Dict
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -25,6 +25,25 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+class StorageTypeUsage(BaseModel):
+    file_count: int
+    bytes: int
+
+class StorageInfoResponse(BaseModel):
+    # Espace compté dans le quota (fichiers actifs et corbeille) et réservé par les uploads en cours
+    storage_used: int
+    storage_reserved: int
+    storage_quota: int
+    percentage_used: float
+    file_count: int
+    folder_count: int
+    active_bytes: int
+    trash_file_count: int
+    trash_folder_count: int
+    trash_bytes: int
+    # Fichiers actifs par type MIME principal (image, video, text...)
+    by_type: Dict[str, StorageTypeUsage]
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
\ No newline at end of file
@@ -0,0 +1 @@
+"""Module initialization file"""
@@ -0,0 +1,151 @@
+"""
+Vérification des plans d'exécution des requêtes fréquentes
+
+Usage : python -m app.scripts.check_indexes [--verbose]
+
+Chaque requête (listing, corbeille, arborescence, partages, sessions d'upload, quota, recherche, contenu)
+passe par EXPLAIN sur la base de DATABASE_URL, migrée au préalable
+(alembic upgrade head). Le script échoue (code 1) dès qu'une table chaude
+est parcourue séquentiellement ; la même vérification tourne dans les tests
+(tests/test_query_plans.py), qui contrôlent aussi l'index utilisé.
+
+PostgreSQL : enable_seqscan est désactivé pour que le plan ne dépende pas du
+volume de données ; un « Seq Scan » restant signifie qu'aucun index ne convient.
+SQLite : EXPLAIN QUERY PLAN ne doit produire que des SEARCH sur ces tables.
+"""
+from sqlalchemy import select, func, literal, tuple_
+from app.database import engine, import_models
+from app.models.file import File
+from app.models.folder import Folder
+from app.models.share import Share
+from app.models.upload_session import UploadSession
+from app.models.quota_reservation import QuotaReservation
+from app.models.storage_stat import StorageStat
+from app.services.tree_service import TreeService
+from app.services.search_service import SearchService
+import argparse
+import re
+import sys
+
+HOT_TABLES = ("files", "folders", "shares", "upload_sessions", "search_grams", "content_terms", "quota_reservations", "storage_stats")
+
+def hot_queries(dialect_name: str):
+    """Formes de requêtes des services, avec des valeurs quelconques"""
+    user_id, folder_id = 1, 1
+
+    return [
+        ("listing fichiers (dossier)", select(File).where(
+            File.user_id == user_id, File.is_deleted == False, File.folder_id == folder_id
+        )),
+        ("listing fichiers (racine)", select(File).where(
+            File.user_id == user_id, File.is_deleted == False, File.folder_id.is_(None)
+        )),
+        ("listing dossiers (dossier)", select(Folder).where(
+            Folder.user_id == user_id, Folder.is_deleted == False, Folder.parent_id == folder_id
+        )),
+        ("listing dossiers (racine)", select(Folder).where(
+            Folder.user_id == user_id, Folder.is_deleted == False, Folder.parent_id.is_(None)
+        )),
+        ("page de listing (tri par nom, après curseur)", select(File).where(
+            File.user_id == user_id, File.is_deleted == False, File.folder_id == folder_id,
+            tuple_(File.name, File.id) > tuple_(literal("m"), literal(1))
+        ).order_by(File.name, File.id).limit(200)),
+        ("corbeille fichiers", select(File).where(
+            File.user_id == user_id, File.is_deleted == True
+        )),
+        ("corbeille dossiers", select(Folder).where(
+            Folder.user_id == user_id, Folder.is_deleted == True
+        )),
+        ("sous-arbre (CTE récursive)", TreeService.subtree_ids_query(folder_id, deleted=False)),
+        ("fichiers d'un sous-arbre", select(File).where(
+            File.folder_id.in_(TreeService.subtree_ids_query(folder_id)), File.is_deleted == False
+        )),
+        ("partages d'un fichier", select(Share).where(Share.file_id == folder_id)),
+        ("quota (agrégat par utilisateur)", select(func.count(File.id), func.sum(File.size)).where(
+            File.user_id == user_id, File.is_deleted == True
+        )),
+        ("sessions d'upload expirées", select(UploadSession.id).where(
+            UploadSession.expires_at <= func.now()
+        )),
+        ("réservations de quota expirées", select(QuotaReservation.id).where(
+            QuotaReservation.expires_at <= func.now()
+        )),
+        ("statistiques de stockage", select(StorageStat).where(StorageStat.user_id == user_id)),
+        ("nettoyage des orphelins (fichiers sans empreinte)", select(File.storage_path).where(
+            File.content_hash.is_(None), File.storage_path.in_(["/app/uploads/a", "/app/uploads/b"])
+        )),
+        ("recherche par nom", SearchService.match_query(dialect_name, "file", File, user_id, ["rapport"]).where(
+            File.user_id == user_id, File.is_deleted == False
+        )),
+        ("recherche par nom (terme court)", SearchService.match_query(dialect_name, "folder", Folder, user_id, ["ra"]).where(
+            Folder.user_id == user_id, Folder.is_deleted == False
+        )),
+        ("recherche dans le contenu", SearchService.content_query(["rapport", "annuel"]).where(
+            File.user_id == user_id, File.is_deleted == False
+        ).limit(50)),
+    ]
+
+def explain(connection, statement):
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    sql = str(compiled)
+
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params).all()
+        return [row[-1] for row in rows]
+
+    return [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {sql}", params).all()]
+
+def sequential_scans(dialect: str, plan):
+    tables = "|".join(HOT_TABLES)
+
+    if dialect == "sqlite":
+        # « SCAN files » (ou « SCAN TABLE files » avant SQLite 3.36) : parcours complet
+        pattern = re.compile(rf"^SCAN (TABLE )?({tables})\b")
+    else:
+        pattern = re.compile(rf"Seq Scan on ({tables})\b")
+
+    return [line.strip() for line in plan if pattern.search(line.strip())]
+
+def query_plans():
+    """(libellé, plan, parcours séquentiels) de chaque requête fréquente"""
+    import_models()
+
+    with engine.connect() as connection:
+        dialect = connection.dialect.name
+        if dialect == "postgresql":
+            connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+        try:
+            for label, statement in hot_queries(dialect):
+                plan = explain(connection, statement)
+                yield label, plan, sequential_scans(dialect, plan)
+        finally:
+            connection.rollback()
+
+def check(verbose: bool = False):
+    failures = 0
+
+    for label, plan, scans in query_plans():
+        print(f"{'ÉCHEC' if scans else 'ok'} : {label}")
+        for line in (plan if verbose or scans else []):
+            print(f"    {line}")
+
+        failures += bool(scans)
+
+    print(f"{failures} requête(s) sans index adapté")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérifie que les requêtes fréquentes utilisent un index")
+    parser.add_argument("--verbose", action="store_true", help="Affiche le plan de chaque requête")
+    args = parser.parse_args()
+
+    sys.exit(1 if check(verbose=args.verbose) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Nettoyage des fichiers orphelins du stockage
+
+Usage : python -m app.scripts.gc [--dry-run] [--grace 86400] [--batch-size 1000] [--rate 500] [--skip-missing]
+
+Parcourt UPLOAD_DIR en flux, vérifie les chemins en base par lots et supprime les
+fichiers qui ne sont plus référencés, hors période de grâce (uploads en cours).
+Signale aussi les blobs et fichiers dont le fichier physique a disparu.
+Même traitement que la tâche périodique (GC_INTERVAL).
+"""
+from app.database import init_db
+from app.services.gc_service import GarbageCollector
+import argparse
+import sys
+
+def main():
+    parser = argparse.ArgumentParser(description="Supprime les fichiers orphelins de UPLOAD_DIR")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche le bilan sans rien supprimer")
+    parser.add_argument("--grace", type=int, help="Âge minimal d'un orphelin supprimé, en secondes")
+    parser.add_argument("--batch-size", type=int, help="Chemins vérifiés en base par requête")
+    parser.add_argument("--rate", type=float, help="Opérations disque par seconde (0 : sans limite)")
+    parser.add_argument("--skip-missing", action="store_true", help="Ne recherche pas les références sans fichier")
+    args = parser.parse_args()
+    
+    init_db()
+    collector = GarbageCollector(
+        dry_run=args.dry_run,
+        grace_period=args.grace,
+        batch_size=args.batch_size,
+        rate=args.rate
+    )
+    report = collector.run(check_missing=not args.skip_missing)
+    
+    for kind, key, path in report.missing:
+        print(f"Fichier physique manquant ({kind} {key}) : {path}")
+    if report.missing_count > len(report.missing):
+        print(f"... et {report.missing_count - len(report.missing)} autre(s)")
+    
+    print(report.summary())
+    
+    # Code 1 si des références pointent vers un fichier disparu (supervision)
+    sys.exit(1 if report.missing_count or report.errors else 0)
+
+if __name__ == "__main__":
+    main()
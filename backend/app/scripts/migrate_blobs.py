@@ -0,0 +1,117 @@
+"""
+Migration des fichiers existants vers le stockage adressé par contenu
+
+Usage : python -m app.scripts.migrate_blobs [--batch-size 500] [--dry-run]
+
+Chaque fichier sans empreinte est haché, puis soit renommé en blob, soit
+supprimé au profit d'un blob identique déjà présent (déduplication).
+"""
+from sqlalchemy import select, update
+from app.database import SessionLocal, init_db
+from app.models.file import File
+from app.models.blob import Blob
+from app.services.blob_store import BlobStore
+import argparse
+import os
+import shutil
+
+def _link_or_copy(source: str, destination: str):
+    # Lien physique : l'ancien chemin reste valide tant que la transaction n'est pas validée
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copyfile(source, destination)
+
+def migrate(batch_size: int = 500, dry_run: bool = False):
+    stats = {"migrated": 0, "deduplicated": 0, "missing": 0, "bytes_saved": 0}
+    known_digests = set()
+    last_id = 0
+    
+    while True:
+        db = SessionLocal()
+        obsolete_paths = []
+        try:
+            files = db.execute(
+                select(File)
+                .where(File.content_hash.is_(None), File.id > last_id)
+                .order_by(File.id)
+                .limit(batch_size)
+            ).scalars().all()
+            
+            if not files:
+                break
+            
+            for file in files:
+                last_id = file.id
+                
+                if not os.path.exists(file.storage_path):
+                    stats["missing"] += 1
+                    print(f"Fichier introuvable sur disque: #{file.id} {file.storage_path}")
+                    continue
+                
+                digest = BlobStore.hash_file(file.storage_path)
+                
+                # Blob existant : son chemin enregistré (arborescence antérieure éventuelle), sinon le nouvel emplacement
+                existing = db.get(Blob, digest)
+                target = existing.storage_path if existing else BlobStore.blob_path(digest)
+                
+                if digest in known_digests or existing:
+                    stats["deduplicated"] += 1
+                    stats["bytes_saved"] += file.size
+                    
+                    if not dry_run:
+                        db.execute(
+                            update(Blob)
+                            .where(Blob.digest == digest)
+                            .values(ref_count=Blob.ref_count + 1)
+                        )
+                else:
+                    stats["migrated"] += 1
+                    
+                    if not dry_run:
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        _link_or_copy(file.storage_path, target)
+                        db.add(Blob(digest=digest, size=file.size, storage_path=target, ref_count=1))
+                
+                known_digests.add(digest)
+                
+                if not dry_run:
+                    obsolete_paths.append(file.storage_path)
+                    file.storage_path = target
+                    file.content_hash = digest
+                    
+                    # Visible des fichiers suivants du même lot
+                    db.flush()
+            
+            db.commit()
+        finally:
+            db.close()
+        
+        # Anciens chemins supprimés uniquement une fois le lot validé
+        for path in obsolete_paths:
+            if os.path.exists(path):
+                os.remove(path)
+    
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Déduplication des fichiers existants de UPLOAD_DIR")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Affiche le résultat sans rien modifier")
+    args = parser.parse_args()
+    
+    if not args.dry_run:
+        # Schéma à jour (colonne content_hash, unicité de storage_path retirée : migration 0001a)
+        init_db()
+    
+    stats = migrate(batch_size=args.batch_size, dry_run=args.dry_run)
+    
+    print(
+        f"Blobs créés: {stats['migrated']}, doublons fusionnés: {stats['deduplicated']}, "
+        f"fichiers manquants: {stats['missing']}, espace libéré: {stats['bytes_saved']} octets"
+    )
+
+if __name__ == "__main__":
+    main()
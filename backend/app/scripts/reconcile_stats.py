@@ -0,0 +1,37 @@
+"""
+Réconciliation des statistiques de stockage avec les fichiers et dossiers
+
+Usage : python -m app.scripts.reconcile_stats [--user-id 42] [--dry-run]
+
+Recalcule pour chaque utilisateur les compteurs de storage_stats (par type et
+corbeille) et l'espace utilisé (users.storage_used), corrige les écarts et les
+affiche. Même traitement que la tâche périodique (STORAGE_STATS_RECONCILE_INTERVAL).
+"""
+from app.database import init_db
+from app.services.stats_service import StatsService
+import argparse
+import asyncio
+import sys
+
+def main():
+    parser = argparse.ArgumentParser(description="Corrige la dérive des statistiques de stockage")
+    parser.add_argument("--user-id", type=int, help="Limite la réconciliation à un utilisateur")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche les écarts sans les corriger")
+    args = parser.parse_args()
+    
+    init_db()
+    corrections = asyncio.run(StatsService.reconcile_all(args.user_id, fix=not args.dry_run))
+    
+    for correction in corrections:
+        state = "corbeille" if correction["trashed"] else "actif"
+        if correction["trashed"] is None:
+            state = "quota"
+        print(f"utilisateur {correction['user_id']} {correction['category']} ({state}) : {correction['stored']} -> {correction['actual']}")
+    
+    print(f"{len(corrections)} écart(s) {'constaté(s)' if args.dry_run else 'corrigé(s)'}")
+    
+    # Code 1 en simulation si une dérive existe (utilisable en CI ou en supervision)
+    sys.exit(1 if args.dry_run and corrections else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Déplacement des blobs existants vers l'arborescence répartie de UPLOAD_DIR
+
+Usage : python -m app.scripts.shard_blobs [--batch-size 500] [--settle 30] [--dry-run]
+
+Sans interruption de service : chaque blob reçoit d'abord un lien physique à son
+nouvel emplacement (STORAGE_SHARD_DEPTH, STORAGE_SHARD_WIDTH), puis blobs.storage_path
+et files.storage_path sont mis à jour par lots. L'ancien nom n'est supprimé qu'après
+--settle secondes : une requête ayant lu l'ancien chemin juste avant la mise à jour le
+trouve encore (les lectures résolvent aussi les deux emplacements, BlobStore.resolve_path).
+Relançable à tout moment : seuls les blobs hors de leur emplacement cible sont traités.
+"""
+from sqlalchemy import select, update
+from app.database import SessionLocal, init_db
+from app.models.blob import Blob
+from app.models.file import File
+from app.services.blob_store import BlobStore
+import argparse
+import os
+import shutil
+import time
+
+def _link_or_copy(source: str, destination: str):
+    # Lien physique : les deux noms restent valides jusqu'à la suppression différée de l'ancien
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copyfile(source, destination)
+
+    # Date rafraîchie : le nettoyage des orphelins ignore le nouveau nom tant que la ligne n'est pas validée
+    os.utime(destination)
+
+def _unlink_settled(pending, settle: float, wait: bool = False):
+    """Supprime les anciens noms des lots validés depuis au moins settle secondes"""
+    while pending:
+        committed_at, moves = pending[0]
+        remaining = committed_at + settle - time.monotonic()
+        if remaining > 0:
+            if not wait:
+                return
+            time.sleep(remaining)
+
+        for path, target in moves:
+            try:
+                # Nouveau nom disparu entre-temps : recréé depuis l'ancien avant sa suppression
+                if not os.path.exists(target):
+                    _link_or_copy(path, target)
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Erreur lors de la suppression de l'ancien chemin {path}: {str(e)} (laissé au nettoyage des orphelins)")
+        pending.pop(0)
+
+def shard(batch_size: int = 500, settle: float = 30, dry_run: bool = False):
+    stats = {"moved": 0, "missing": 0, "already": 0, "changed": 0}
+    pending = []
+    last_digest = ""
+
+    while True:
+        db = SessionLocal()
+        moves = []
+        try:
+            blobs = db.execute(
+                select(Blob.digest, Blob.storage_path)
+                .where(Blob.digest > last_digest)
+                .order_by(Blob.digest)
+                .limit(batch_size)
+            ).all()
+
+            if not blobs:
+                break
+            last_digest = blobs[-1].digest
+
+            for digest, path in blobs:
+                target = BlobStore.blob_path(digest)
+                if path == target:
+                    stats["already"] += 1
+                    continue
+
+                if not os.path.exists(path) and not os.path.exists(target):
+                    stats["missing"] += 1
+                    print(f"Blob introuvable sur disque: {digest} {path}")
+                    continue
+
+                if dry_run:
+                    stats["moved"] += 1
+                    continue
+
+                if os.path.exists(path):
+                    _link_or_copy(path, target)
+
+                # Condition sur l'ancien chemin : un blob libéré ou déplacé entre-temps n'est pas modifié,
+                # ses fichiers non plus (ils pointeraient vers un chemin qu'aucun blob ne possède) ; aucun des
+                # deux noms n'est alors supprimé ici, le nouveau revenant au besoin au nettoyage des orphelins
+                moved = db.execute(
+                    update(Blob)
+                    .where(Blob.digest == digest, Blob.storage_path == path)
+                    .values(storage_path=target)
+                ).rowcount
+                if moved != 1:
+                    stats["changed"] += 1
+                    continue
+
+                db.execute(
+                    update(File)
+                    .where(File.content_hash == digest, File.storage_path != target)
+                    .values(storage_path=target)
+                )
+
+                stats["moved"] += 1
+                if os.path.exists(path):
+                    moves.append((path, target))
+
+            db.commit()
+        finally:
+            db.close()
+
+        if moves:
+            pending.append((time.monotonic(), moves))
+        _unlink_settled(pending, settle)
+
+    _unlink_settled(pending, settle, wait=True)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Répartit les blobs existants dans l'arborescence configurée")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--settle", type=float, default=30, help="Délai avant suppression des anciens noms, en secondes")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche le résultat sans rien modifier")
+    args = parser.parse_args()
+
+    init_db()
+    stats = shard(batch_size=args.batch_size, settle=args.settle, dry_run=args.dry_run)
+
+    print(
+        f"Blobs déplacés: {stats['moved']}, déjà en place: {stats['already']}, "
+        f"introuvables: {stats['missing']}, modifiés pendant la migration: {stats['changed']}"
+    )
+
+if __name__ == "__main__":
+    main()
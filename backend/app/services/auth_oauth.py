@@ -1,8 +1,9 @@
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from httpx import AsyncClient
 from app.config import settings
+from app.utils.user_cache import user_cache
 import secrets
 
 class OAuthService:
@@ -70,7 +71,7 @@ class OAuthService:
             )
     
     @staticmethod
-    def find_or_create_oauth_user(db: Session, user_info: dict, provider: str = "google"):
+    async def find_or_create_oauth_user(db: AsyncSession, user_info: dict, provider: str = "google"):
         """
         Trouve un utilisateur existant par ID OAuth ou en crée un nouveau
         """
@@ -86,25 +87,27 @@ class OAuthService:
                 detail="Informations utilisateur incomplètes"
             )
         
-        user = db.execute(
+        user = (await db.execute(
             select(User).where(
                 User.oauth_provider == provider,
                 User.oauth_provider_id == provider_id
             )
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         if user:
             return user
         
-        user = db.execute(
+        user = (await db.execute(
             select(User).where(User.email == email)
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         if user:
             user.oauth_provider = provider
             user.oauth_provider_id = provider_id
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
+            
+            user_cache.invalidate(user.id)
             return user
         
         full_name = user_info.get("name", "")
@@ -122,7 +125,7 @@ class OAuthService:
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         
         return new_user
\ No newline at end of file
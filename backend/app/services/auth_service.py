@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from fastapi import HTTPException, status
 from app.schemas.user import UserCreate
@@ -8,12 +8,12 @@ from app.utils.security import hash_password, verify_password, create_access_tok
 class AuthService:
     
     @staticmethod
-    def register_user(db: Session, user_data: UserCreate):
+    async def register_user(db: AsyncSession, user_data: UserCreate):
         from app.models.user import User
         
-        existing_user = db.execute(
+        existing_user = (await db.execute(
             select(User).where(User.email == user_data.email)
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         if existing_user:
             raise HTTPException(
@@ -35,18 +35,18 @@ class AuthService:
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         
         return new_user
     
     @staticmethod
-    def authenticate_user(db: Session, login_data: LoginRequest) -> dict:
+    async def authenticate_user(db: AsyncSession, login_data: LoginRequest) -> dict:
         from app.models.user import User
         
-        user = db.execute(
+        user = (await db.execute(
             select(User).where(User.email == login_data.email)
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         if not user:
             raise HTTPException(
@@ -81,17 +81,17 @@ class AuthService:
         }
     
     @staticmethod
-    def get_user_by_email(db: Session, email: str):
+    async def get_user_by_email(db: AsyncSession, email: str):
         from app.models.user import User
-        return db.execute(select(User).where(User.email == email)).scalar_one_or_none()
+        return (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
     
     @staticmethod
-    def get_user_by_id(db: Session, user_id: int):
+    async def get_user_by_id(db: AsyncSession, user_id: int):
         from app.models.user import User
-        return db.execute(select(User).where(User.id == user_id)).scalar_one_or_none()
+        return (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
     
     @staticmethod
-    def login_with_google(db: Session, userinfo: dict) -> dict:
+    async def login_with_google(db: AsyncSession, userinfo: dict) -> dict:
         from app.models.user import User
         from app.utils.security import create_access_token
 
@@ -105,7 +105,7 @@ class AuthService:
                 detail="Impossible de récupérer l'email Google"
             )
 
-        user = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
+        user = (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
 
         if not user:
             user = User(
@@ -120,8 +120,8 @@ class AuthService:
                 oauth_provider_id=provider_id
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
 
         access_token = create_access_token(data={"sub": str(user.id), "email": user.email})
 
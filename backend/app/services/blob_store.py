@@ -0,0 +1,272 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, bindparam
+from sqlalchemy.exc import IntegrityError
+from app.models.blob import Blob
+from app.config import settings
+from app.database import SessionLocal
+from app.utils.executors import get_executor
+from app.services.content_index_service import ContentIndexer
+from app.services.rendition_service import RenditionService
+from app.services.gc_service import QUARANTINE_SUFFIX
+import os
+import uuid
+import hashlib
+import time
+
+# Fichier libéré modifié peu avant la libération ou après : possiblement recréé par un upload, jamais supprimé ici
+REVIVAL_WINDOW_SECONDS = 60
+
+class BlobStore:
+    """
+    Stockage adressé par contenu : un fichier physique par empreinte SHA-256,
+    partagé par toutes les lignes File de même contenu grâce à un compteur de références
+    """
+
+    @staticmethod
+    def new_digest():
+        return hashlib.sha256()
+
+    @staticmethod
+    def shard_dirs(digest: str):
+        # Répartition par préfixes de l'empreinte (ab/cd/abcd...) : répertoires de taille bornée
+        width = settings.STORAGE_SHARD_WIDTH
+        return [digest[level * width:(level + 1) * width] for level in range(settings.STORAGE_SHARD_DEPTH)]
+
+    @staticmethod
+    def blob_path(digest: str):
+        """Emplacement d'un nouveau blob selon la répartition configurée (STORAGE_SHARD_DEPTH, STORAGE_SHARD_WIDTH)"""
+        return os.path.join(settings.UPLOAD_DIR, *BlobStore.shard_dirs(digest), digest)
+
+    @staticmethod
+    def resolve_path(storage_path: str, digest: str = None):
+        """
+        Chemin physique d'un contenu : emplacement réparti du blob, sinon chemin enregistré ou ancien emplacement à plat
+        L'emplacement réparti passe en premier : la migration (shard_blobs) ne le supprime jamais, alors que
+        l'ancien nom d'une ligne lue juste avant son déplacement disparaît après --settle secondes
+        """
+        if not digest:
+            return storage_path
+
+        for candidate in (BlobStore.blob_path(digest), storage_path, os.path.join(settings.UPLOAD_DIR, digest)):
+            if os.path.exists(candidate):
+                return candidate
+
+        return storage_path
+
+    @staticmethod
+    def new_temp_path():
+        # Écriture dans un répertoire de transit : le contenu n'est nommé qu'une fois haché
+        tmp_dir = os.path.join(settings.UPLOAD_DIR, ".tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        return os.path.join(tmp_dir, str(uuid.uuid4()))
+
+    @staticmethod
+    def hash_file(path: str, chunk_size: int = None):
+        digest = BlobStore.new_digest()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size or settings.UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    async def _add_reference(db: AsyncSession, digest: str):
+        # Incrément atomique côté base : pas de lecture-modification-écriture concurrente
+        result = await db.execute(
+            update(Blob)
+            .where(Blob.digest == digest)
+            .values(ref_count=Blob.ref_count + 1)
+        )
+        return result.rowcount > 0
+
+    @staticmethod
+    async def adopt(db: AsyncSession, temp_path: str, digest: str, size: int):
+        """
+        Rattache un fichier temporaire haché au blob correspondant (créé si absent)
+        Le fichier temporaire est consommé ; la transaction reste à valider par l'appelant
+        """
+        path = BlobStore.blob_path(digest)
+
+        if await BlobStore._add_reference(db, digest):
+            blob = await db.get(Blob, digest)
+
+            # Réparation si le fichier physique a disparu malgré la ligne en base
+            if not os.path.exists(blob.storage_path):
+                os.utime(temp_path)
+                os.replace(temp_path, blob.storage_path)
+            else:
+                os.remove(temp_path)
+
+            return blob
+
+        # Date rafraîchie au nommage : une suppression concurrente du même contenu le reconnaît comme recréé
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.utime(temp_path)
+        os.replace(temp_path, path)
+
+        try:
+            async with db.begin_nested():
+                blob = Blob(digest=digest, size=size, storage_path=path, ref_count=1)
+                db.add(blob)
+        except IntegrityError:
+            # Upload concurrent du même contenu : le blob vient d'être créé ailleurs
+            await BlobStore._add_reference(db, digest)
+            blob = await db.get(Blob, digest)
+
+        return blob
+
+    @staticmethod
+    async def release_files(db: AsyncSession, files):
+        """
+        Retire une référence par fichier supprimé ; renvoie les chemins devenus inutiles
+        À appeler avant le commit, les chemins ne doivent être supprimés qu'après celui-ci
+        """
+        released = []
+        counts = {}
+
+        for file in files:
+            if file.content_hash:
+                counts[file.content_hash] = counts.get(file.content_hash, 0) + 1
+            else:
+                # Fichier antérieur à la déduplication : chemin propre au fichier
+                released.append((None, file.storage_path))
+
+        released.extend(await BlobStore.release_counts(db, counts))
+        return released
+
+    @staticmethod
+    async def release_counts(db: AsyncSession, counts: dict):
+        """
+        Décrémente les compteurs par empreinte (digest -> nombre de références retirées)
+        Un seul UPDATE exécuté en lot, puis suppression des blobs sans référence
+        """
+        if not counts:
+            return []
+
+        blobs = Blob.__table__
+        await db.execute(
+            update(blobs)
+            .where(blobs.c.digest == bindparam("b_digest"))
+            .values(ref_count=blobs.c.ref_count - bindparam("b_count")),
+            [{"b_digest": digest, "b_count": count} for digest, count in counts.items()]
+        )
+
+        orphans = (await db.execute(
+            select(Blob.digest, Blob.storage_path).where(
+                Blob.digest.in_(list(counts)),
+                Blob.ref_count <= 0
+            )
+        )).all()
+
+        if orphans:
+            orphan_digests = [digest for digest, _ in orphans]
+            await db.execute(
+                delete(Blob).where(Blob.digest.in_(orphan_digests)),
+                execution_options={"synchronize_session": False}
+            )
+            
+            # Contenu disparu : son texte indexé aussi
+            await ContentIndexer.forget(db, orphan_digests)
+
+        return [(digest, path) for digest, path in orphans]
+
+    @staticmethod
+    def _revived(digests):
+        if not digests:
+            return set()
+
+        db = SessionLocal()
+        try:
+            return set(db.execute(select(Blob.digest).where(Blob.digest.in_(digests))).scalars().all())
+        finally:
+            db.close()
+
+    @staticmethod
+    def _restore(path: str, quarantine: str):
+        # Contenu adressé par empreinte : un fichier recréé entre-temps au même chemin est identique
+        if os.path.exists(path):
+            os.remove(quarantine)
+        else:
+            os.rename(quarantine, path)
+
+    @staticmethod
+    def unlink_released(released, released_at: float = None):
+        """
+        Supprime physiquement les blobs libérés, sauf s'ils ont été recréés entre-temps
+        Sûr face à un upload concurrent du même contenu (adopt recrée le même chemin) : les fichiers sont mis
+        de côté, puis les lignes et les dates revérifiées ; remis en place si le blob est revenu
+        released_at : instant du commit qui a retiré les références
+        Renvoie les entrées dont la suppression a échoué
+        """
+        if not released:
+            return []
+
+        failed = []
+        quarantined = []
+        cutoff = (released_at or time.time()) - REVIVAL_WINDOW_SECONDS
+        revived = BlobStore._revived([digest for digest, _ in released if digest])
+
+        for digest, path in released:
+            if digest in revived:
+                continue
+            try:
+                if digest:
+                    os.rename(path, path + QUARANTINE_SUFFIX)
+                    quarantined.append((digest, path))
+                else:
+                    # Fichier antérieur à la déduplication : chemin propre au fichier, jamais recréé
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Erreur lors de la suppression du fichier {path}: {str(e)}")
+                failed.append((digest, path))
+
+        try:
+            revived = BlobStore._revived([digest for digest, _ in quarantined])
+        except Exception as e:
+            print(f"Erreur lors de la vérification des blobs libérés: {str(e)}")
+            revived = {digest for digest, _ in quarantined}
+
+        for digest, path in quarantined:
+            quarantine = path + QUARANTINE_SUFFIX
+            try:
+                if digest in revived or os.stat(quarantine).st_mtime > cutoff:
+                    BlobStore._restore(path, quarantine)
+                    continue
+
+                os.remove(quarantine)
+            except OSError as e:
+                print(f"Erreur lors de la suppression du fichier {path}: {str(e)}")
+                failed.append((digest, path))
+                continue
+
+            # Miniatures et aperçus du contenu supprimé
+            RenditionService.discard(digest)
+
+        return failed
+
+    @staticmethod
+    def _unlink_with_retry(released, released_at: float):
+        # Nouvelle tentative avec attente croissante (fichier verrouillé, volume réseau indisponible...)
+        pending = BlobStore.unlink_released(released, released_at)
+
+        for attempt in range(settings.BLOB_UNLINK_RETRIES):
+            if not pending:
+                return
+            time.sleep(settings.BLOB_UNLINK_RETRY_DELAY * 2 ** attempt)
+            pending = BlobStore.unlink_released(pending, released_at)
+
+        for _, path in pending:
+            print(f"Abandon de la suppression du fichier {path} : laissé au nettoyage des orphelins")
+
+    @staticmethod
+    def schedule_unlink(released):
+        """
+        Confie la suppression physique au pool dédié, hors de la boucle d'événements
+        À appeler après le commit qui a retiré les références
+        """
+        if not released:
+            return None
+
+        executor = get_executor("blob-unlink", settings.BLOB_UNLINK_WORKERS)
+        return executor.submit(BlobStore._unlink_with_retry, list(released), time.time())
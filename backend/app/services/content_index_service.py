@@ -0,0 +1,154 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.exc import IntegrityError
+from app.models.blob import Blob
+from app.models.file import File
+from app.models.content_index import ContentDocument, ContentTerm
+from app.database import AsyncSessionLocal
+from app.config import settings
+from app.utils.executors import get_executor
+from app.utils.tasks import start_task
+from app.utils.text_extract import extract_text, tokenize
+import asyncio
+
+class ContentIndexer:
+    """
+    Indexation du texte des documents en arrière-plan, hors du chemin des requêtes
+    File bornée (pleine : la tâche est abandonnée, le rattrapage périodique la reprendra),
+    extraction dans un pool de threads dédié, écriture de l'index inversé par empreinte de blob
+    """
+
+    def __init__(self):
+        self._queue = None
+        # Empreintes en file ou en cours : un contenu téléversé plusieurs fois n'est traité qu'une fois
+        self._pending = set()
+
+    @property
+    def running(self):
+        return self._queue is not None
+
+    def start(self):
+        """Démarre les workers (au démarrage de l'application, boucle d'événements active)"""
+        if self.running or not settings.CONTENT_INDEX_ENABLED:
+            return
+
+        self._queue = asyncio.Queue(maxsize=settings.CONTENT_INDEX_QUEUE_SIZE)
+        for i in range(settings.CONTENT_INDEX_WORKERS):
+            start_task(self._worker(), name=f"content-index-{i}")
+
+    def stop(self):
+        # Les workers sont annulés avec les autres tâches de fond (stop_all)
+        self._queue = None
+        self._pending.clear()
+
+    def enqueue(self, digest: str, path: str, mime_type: str, filename: str):
+        """Planifie l'indexation d'un blob ; à appeler après le commit qui l'a rendu visible"""
+        if not self.running or not digest or digest in self._pending:
+            return False
+
+        try:
+            self._queue.put_nowait((digest, path, mime_type, filename))
+        except asyncio.QueueFull:
+            return False
+
+        self._pending.add(digest)
+        return True
+
+    @property
+    def free_slots(self):
+        return self._queue.maxsize - self._queue.qsize() if self.running else 0
+
+    async def _worker(self):
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            try:
+                await self._index(*job)
+            except Exception as e:
+                print(f"Erreur lors de l'indexation du contenu {job[0]}: {str(e)}")
+            finally:
+                self._pending.discard(job[0])
+                queue.task_done()
+
+    @staticmethod
+    def _extract(path: str, mime_type: str, filename: str):
+        # Exécuté dans le pool : lecture disque et analyse bloquantes
+        try:
+            text = extract_text(path, mime_type, filename, settings.CONTENT_INDEX_MAX_BYTES)
+        except Exception as e:
+            print(f"Erreur lors de l'extraction du texte de {filename}: {str(e)}")
+            return "failed", {}
+
+        if text is None:
+            return "unsupported", {}
+
+        terms = tokenize(text, settings.CONTENT_INDEX_MAX_TERMS)
+        return ("indexed" if terms else "empty"), terms
+
+    async def _index(self, digest: str, path: str, mime_type: str, filename: str):
+        async with AsyncSessionLocal() as db:
+            if await db.get(ContentDocument, digest) is not None:
+                return
+
+        executor = get_executor("content-index", settings.CONTENT_INDEX_WORKERS)
+        status, terms = await asyncio.get_running_loop().run_in_executor(
+            executor, ContentIndexer._extract, path, mime_type, filename
+        )
+
+        async with AsyncSessionLocal() as db:
+            # Blob libéré pendant l'extraction : rien à indexer
+            if await db.get(Blob, digest) is None:
+                return
+
+            db.add(ContentDocument(digest=digest, status=status, term_count=len(terms)))
+            await db.flush()
+
+            if terms:
+                await db.execute(insert(ContentTerm.__table__), [
+                    {"term": term, "digest": digest, "frequency": frequency}
+                    for term, frequency in terms.items()
+                ])
+
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Indexé entre-temps par un autre processus
+                await db.rollback()
+
+    async def catch_up(self, db: AsyncSession):
+        """
+        Remet en file les blobs sans état d'indexation (file pleine, redémarrage, contenus antérieurs)
+        Renvoie le nombre de blobs planifiés
+        """
+        slots = self.free_slots
+        if not slots:
+            return 0
+
+        # Un fichier quelconque du blob fournit type et nom (même contenu, même extraction)
+        missing = (await db.execute(
+            select(Blob.digest, Blob.storage_path, func.min(File.mime_type), func.min(File.name))
+            .join(File, File.content_hash == Blob.digest)
+            .outerjoin(ContentDocument, ContentDocument.digest == Blob.digest)
+            .where(ContentDocument.digest.is_(None))
+            .group_by(Blob.digest, Blob.storage_path)
+            .limit(slots + len(self._pending))
+        )).all()
+
+        return sum(self.enqueue(*row) for row in missing)
+
+    @staticmethod
+    async def forget(db: AsyncSession, digests):
+        """Retire de l'index les blobs libérés ; la transaction reste à valider par l'appelant"""
+        for model in (ContentTerm, ContentDocument):
+            await db.execute(
+                delete(model).where(model.digest.in_(digests)),
+                execution_options={"synchronize_session": False}
+            )
+
+
+content_indexer = ContentIndexer()
+
+async def index_missing_content():
+    """Tâche périodique : session dédiée hors requête"""
+    async with AsyncSessionLocal() as db:
+        await content_indexer.catch_up(db)
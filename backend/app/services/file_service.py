@@ -1,101 +1,104 @@
 from fastapi import UploadFile, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.orm.attributes import set_committed_value
+from starlette.concurrency import run_in_threadpool
 from app.models.file import File
-from app.models.user import User
+from app.utils.user_cache import CurrentUser
 from app.models.folder import Folder
-from app.schemas.file import FileCreate, FileUpdate, FileUploadResponse
+from app.models.blob import Blob
+from app.schemas.file import FileCreate, FileUpdate, FileUploadResponse, InstantUploadRequest, InstantUploadChallengeRequest, InstantUploadChallenge
 from app.config import settings
+from app.services.storage_service import StorageService
+from app.services.blob_store import BlobStore
+from app.services.purge_service import PurgeService
+from app.services.quota_service import QuotaService
+from app.services.stats_service import StatsService
+from app.services.content_index_service import content_indexer
+from app.utils.mime import detect_mime_type
+from app.utils.security import create_access_token, decode_access_token
 import os
 import uuid
 import aiofiles
-import magic
 import datetime
+import hashlib
+import hmac
+import secrets
 from pathlib import Path
 import shutil
 
+INSTANT_UPLOAD_PURPOSE = "instant-upload"
+
 class FileService:
     
     @staticmethod
-    async def upload_file(db: Session, user: User, file: UploadFile, folder_id: int = None):
-        # Calcul de la taille totale pour vérification quota
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
-        file.file.seek(0)
-        
+    def _check_file_size(file_size: int):
         # Blocage upload si dépassement de la limite par fichier
         if file_size > settings.MAX_FILE_SIZE:
             raise HTTPException(
                 status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 detail=f"Le fichier est trop volumineux (max: {settings.MAX_FILE_SIZE // 1024 // 1024} Mo)"
             )
-        
-        # Vérification quota utilisateur avant stockage physique
-        if user.storage_used + file_size > user.storage_quota:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail="Quota de stockage dépassé"
-            )
-        
+    
+    @staticmethod
+    async def _check_target_folder(db: AsyncSession, user_id: int, folder_id: int = None):
         # Validation dossier parent si spécifié
         if folder_id:
-            folder = db.execute(
+            folder = (await db.execute(
                 select(Folder).where(
                     Folder.id == folder_id,
-                    Folder.user_id == user.id,
+                    Folder.user_id == user_id,
                     Folder.is_deleted == False
                 )
-            ).scalar_one_or_none()
+            )).scalar_one_or_none()
             
             if not folder:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Dossier non trouvé"
                 )
+    
+    @staticmethod
+    async def _create_file_record(db: AsyncSession, user: CurrentUser, filename: str, file_size: int, temp_path: str, digest: str, folder_id: int = None, prefix: bytes = None, reservation_id: str = None):
+        """
+        Rattache le contenu haché à son blob, enregistre le fichier en base et impute sa taille au quota
+        prefix : premiers octets capturés à l'écriture (type MIME détecté sans relire le fichier)
+        reservation_id : réservation de quota prise avant l'écriture, convertie dans la même transaction
+        """
+        mime_type = await detect_mime_type(filename, digest, prefix, temp_path)
+        blob = await BlobStore.adopt(db, temp_path, digest, file_size)
         
-        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-        
-        # UUID garantit l'unicité même en cas d'upload concurrent
-        file_uuid = str(uuid.uuid4())
-        file_path = os.path.join(settings.UPLOAD_DIR, file_uuid)
-        
-        # Écriture asynchrone pour ne pas bloquer les autres requêtes
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        file_extension = os.path.splitext(file.filename)[1].lower()
-
-        # Mapping manuel pour Markdown car magic ne le détecte pas toujours
-        mime_type_map = {
-            '.md': 'text/markdown',
-            '.markdown': 'text/markdown',
-            '.txt': 'text/plain',
-        }
-
-        if file_extension in mime_type_map:
-            mime_type = mime_type_map[file_extension]
-        else:
-            # Magic analyse le contenu réel, plus fiable que l'extension (sécurité)
-            mime_type = magic.from_file(file_path, mime=True)
+        return await FileService._create_file_from_blob(db, user, filename, blob, mime_type, folder_id, reservation_id)
+    
+    @staticmethod
+    async def _create_file_from_blob(db: AsyncSession, user: CurrentUser, filename: str, blob: Blob, mime_type: str, folder_id: int = None, reservation_id: str = None):
+        file_size = blob.size
         
         db_file = File(
-            name=file.filename,
-            original_name=file.filename,
+            name=filename,
+            original_name=filename,
             size=file_size,
             mime_type=mime_type,
-            storage_path=file_path,
+            storage_path=blob.storage_path,
+            content_hash=blob.digest,
             user_id=user.id,
             folder_id=folder_id
         )
         
         db.add(db_file)
         
-        # Mise à jour immédiate du quota utilisateur
-        user.storage_used += file_size
+        # Imputation au quota dans la transaction du fichier : réservation convertie, sinon incrément conditionnel
+        if reservation_id:
+            await QuotaService.consume(db, reservation_id, user.id, file_size)
+        else:
+            await QuotaService.charge(db, user.id, file_size)
+        await StatsService.apply(db, user.id, StatsService.file_delta(mime_type, file_size))
         
-        db.commit()
-        db.refresh(db_file)
+        await db.commit()
+        await db.refresh(db_file)
+        
+        # Indexation du texte en arrière-plan (sans effet si le contenu est déjà indexé)
+        content_indexer.enqueue(blob.digest, blob.storage_path, mime_type, filename)
         
         return FileUploadResponse(
             id=db_file.id,
@@ -104,9 +107,145 @@ class FileService:
             mime_type=db_file.mime_type,
             message="Fichier téléversé avec succès"
         )
+    
+    @staticmethod
+    def instant_upload_challenge(user: CurrentUser, challenge_data: InstantUploadChallengeRequest):
+        """
+        Tire la plage d'octets dont le client devra prouver la possession avant un upload instantané
+        Réponse identique que le contenu soit connu ou non : l'empreinte seule ne révèle rien
+        """
+        FileService._check_file_size(challenge_data.size)
+        
+        length = min(settings.INSTANT_UPLOAD_PROOF_BYTES, challenge_data.size)
+        offset = secrets.randbelow(challenge_data.size - length + 1)
+        nonce = secrets.token_hex(16)
+        
+        # Jeton signé sans "sub" : inutilisable comme jeton d'accès
+        challenge = create_access_token(
+            {
+                "purpose": INSTANT_UPLOAD_PURPOSE,
+                "uid": user.id,
+                "digest": challenge_data.digest,
+                "size": challenge_data.size,
+                "offset": offset,
+                "length": length,
+                "nonce": nonce
+            },
+            datetime.timedelta(seconds=settings.INSTANT_UPLOAD_CHALLENGE_TTL_SECONDS)
+        )
+        
+        return InstantUploadChallenge(
+            challenge=challenge,
+            nonce=nonce,
+            offset=offset,
+            length=length,
+            expires_in=settings.INSTANT_UPLOAD_CHALLENGE_TTL_SECONDS
+        )
+    
+    @staticmethod
+    def _range_proof(path: str, nonce: str, offset: int, length: int):
+        # SHA-256 du nonce (octets) suivi de la plage demandée : calcul identique côté client
+        proof = hashlib.sha256(bytes.fromhex(nonce))
+        if path is None:
+            # Contenu inconnu : plage fictive de même longueur, hachée de la même façon
+            proof.update(bytes(length))
+            return proof.hexdigest()
+        
+        with open(path, "rb") as f:
+            f.seek(offset)
+            proof.update(f.read(length))
+        return proof.hexdigest()
+    
+    @staticmethod
+    async def instant_upload(db: AsyncSession, user: CurrentUser, upload_data: InstantUploadRequest):
+        """
+        Crée un fichier sans transfert si le serveur détient déjà un contenu de même empreinte et taille
+        et que le client prouve le détenir (hachage de la plage tirée par instant_upload_challenge)
+        Retourne None si le contenu est inconnu ou la preuve fausse : le client doit alors envoyer les octets
+        """
+        claims = decode_access_token(upload_data.challenge)
+        
+        if (not claims
+                or claims.get("purpose") != INSTANT_UPLOAD_PURPOSE
+                or claims.get("uid") != user.id
+                or claims.get("digest") != upload_data.digest
+                or claims.get("size") != upload_data.size):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Défi d'upload instantané invalide ou expiré"
+            )
+        
+        blob = (await db.execute(
+            select(Blob).where(
+                Blob.digest == upload_data.digest,
+                Blob.size == upload_data.size
+            )
+        )).scalar_one_or_none()
+        
+        known = blob is not None and os.path.exists(blob.storage_path)
+        
+        # Preuve calculée dans les deux cas (plage fictive si le contenu est inconnu) : même requête,
+        # même passage par le pool de threads et même hachage. Seule la lecture de la plage sur disque
+        # distingue encore un contenu connu (écart résiduel : au plus INSTANT_UPLOAD_PROOF_BYTES octets lus)
+        try:
+            expected = await run_in_threadpool(
+                FileService._range_proof, blob.storage_path if known else None,
+                claims["nonce"], claims["offset"], claims["length"]
+            )
+        except OSError:
+            return None
+        
+        # Preuve fausse traitée comme un contenu inconnu : même réponse
+        if not hmac.compare_digest(expected, upload_data.proof) or not known:
+            return None
+        
+        FileService._check_file_size(blob.size)
+        await FileService._check_target_folder(db, user.id, upload_data.folder_id)
+        
+        # Référence ajoutée de façon atomique : le blob ne peut plus être libéré entre-temps
+        if not await BlobStore._add_reference(db, blob.digest):
+            await db.rollback()
+            return None
+        
+        mime_type = await detect_mime_type(upload_data.name, blob.digest, path=blob.storage_path)
+        
+        return await FileService._create_file_from_blob(db, user, upload_data.name, blob, mime_type, upload_data.folder_id)
+    
+    @staticmethod
+    async def upload_file(db: AsyncSession, user: CurrentUser, file: UploadFile, folder_id: int = None):
+        # Taille annoncée (fichier spoolé) pour rejet rapide avant toute écriture
+        file.file.seek(0, 2)
+        file_size = file.file.tell()
+        file.file.seek(0)
+        
+        FileService._check_file_size(file_size)
+        await FileService._check_target_folder(db, user.id, folder_id)
+        
+        # Espace réservé et validé avant l'écriture : les uploads simultanés ne peuvent pas dépasser le quota ensemble
+        reservation_id = await QuotaService.reserve(db, user.id, file_size)
+        await db.commit()
+        
+        temp_path = BlobStore.new_temp_path()
+        
+        try:
+            # Écriture par blocs avec hachage : mémoire bornée quelle que soit la taille du fichier
+            file_size, digest, prefix = await StorageService.write_upload_stream(
+                file,
+                temp_path,
+                max_file_size=settings.MAX_FILE_SIZE,
+                quota_remaining=file_size
+            )
+            
+            return await FileService._create_file_record(db, user, file.filename, file_size, temp_path, digest, folder_id, prefix, reservation_id)
+        except BaseException:
+            # Upload refusé ou interrompu : réservation rendue immédiatement plutôt qu'à son expiration
+            await db.rollback()
+            await QuotaService.release(db, [reservation_id])
+            await db.commit()
+            raise
                    
     @staticmethod
-    async def get_user_files(db: Session, user_id: int, folder_id: int = None, show_deleted: bool = False):
+    async def get_user_files(db: AsyncSession, user_id: int, folder_id: int = None, show_deleted: bool = False):
         # Construction requête avec filtres sur utilisateur et corbeille
         query = select(File).where(File.user_id == user_id)
         
@@ -118,35 +257,38 @@ class FileService:
         else:
             query = query.where(File.folder_id.is_(None))
             
-        files = db.execute(query).scalars().all()
+        files = (await db.execute(query)).scalars().all()
         return files
     
     @staticmethod
-    async def get_file(db: Session, file_id: int, user_id: int):
+    async def get_file(db: AsyncSession, file_id: int, user_id: int):
         # Vérification propriété pour éviter accès non autorisé
-        file = db.execute(
+        file = (await db.execute(
             select(File).where(
                 File.id == file_id,
                 File.user_id == user_id
             )
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         return file
     
     @staticmethod
-    async def get_file_with_path(db: Session, file_id: int, user_id: int):
+    async def get_file_with_path(db: AsyncSession, file_id: int, user_id: int):
         # Validation métadonnées ET existence physique du fichier
         file = await FileService.get_file(db, file_id, user_id)
         if not file:
             return None
         
-        if not os.path.exists(file.storage_path):
+        # Blob déplacé entre la lecture de la ligne et l'accès disque : chemin résolu sans modifier la ligne
+        path = BlobStore.resolve_path(file.storage_path, file.content_hash)
+        if not os.path.exists(path):
             return None
+        set_committed_value(file, "storage_path", path)
             
         return file
     
     @staticmethod
-    async def update_file(db: Session, file_id: int, file_data: FileUpdate, user_id: int):
+    async def update_file(db: AsyncSession, file_id: int, file_data: FileUpdate, user_id: int):
         file = await FileService.get_file(db, file_id, user_id)
         if not file:
             return None
@@ -157,13 +299,13 @@ class FileService:
                 file.folder_id = None
             else:
                 # Validation dossier de destination
-                folder = db.execute(
+                folder = (await db.execute(
                     select(Folder).where(
                         Folder.id == file_data.folder_id,
                         Folder.user_id == user_id,
                         Folder.is_deleted == False
                     )
-                ).scalar_one_or_none()
+                )).scalar_one_or_none()
                 
                 if not folder:
                     raise HTTPException(
@@ -176,112 +318,87 @@ class FileService:
         if file_data.name:
             file.name = file_data.name
             
-        db.commit()
-        db.refresh(file)
+        await db.commit()
+        await db.refresh(file)
         
         return file
     
     @staticmethod
-    async def delete_file(db: Session, file_id: int, user_id: int, permanent: bool = False):
+    async def delete_file(db: AsyncSession, file_id: int, user_id: int, permanent: bool = False):
         file = await FileService.get_file(db, file_id, user_id)
         if not file:
             return False
         
+        purge = None
+        
         if permanent:
-            # Suppression physique du fichier
-            if os.path.exists(file.storage_path):
-                os.remove(file.storage_path)
-            
-            # Libération quota utilisateur
-            user = db.execute(select(User).where(User.id == user_id)).scalar_one()
-            user.storage_used = max(0, user.storage_used - file.size)
-                
-            db.delete(file)
-        else:
+            # Le blob n'est libéré qu'à la disparition de sa dernière référence (partages supprimés avec le fichier)
+            purge = await PurgeService.purge(db, user_id, [File.id == file_id])
+        elif not file.is_deleted:
             # Déplacement corbeille avec horodatage
+            await StatsService.apply(db, user_id, StatsService.file_delta(file.mime_type, file.size).moved(trashed=True))
             file.is_deleted = True
             file.deleted_at = datetime.datetime.now(datetime.timezone.utc)
             
-        db.commit()
+        await db.commit()
+        
+        # Suppression physique après validation de la transaction, hors de la boucle d'événements
+        if purge:
+            PurgeService.schedule_unlink(purge)
         return True
     
     @staticmethod
-    async def restore_file(db: Session, file_id: int, user_id: int):
+    async def restore_file(db: AsyncSession, file_id: int, user_id: int):
         # Récupération depuis corbeille uniquement
-        file = db.execute(
+        file = (await db.execute(
             select(File).where(
                 File.id == file_id,
                 File.user_id == user_id,
                 File.is_deleted == True
             )
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         if not file:
             return False
         
         # Vérification dossier parent toujours existant
         if file.folder_id:
-            folder = db.execute(
+            folder = (await db.execute(
                 select(Folder).where(
                     Folder.id == file.folder_id,
                     Folder.is_deleted == False
                 )
-            ).scalar_one_or_none()
+            )).scalar_one_or_none()
             
             # Déplacement racine si parent supprimé
             if not folder:
                 file.folder_id = None
         
+        await StatsService.apply(db, user_id, StatsService.file_delta(file.mime_type, file.size, trashed=True).moved(trashed=False))
         file.is_deleted = False
         file.deleted_at = None
-        db.commit()
+        await db.commit()
         
         return True
     
     @staticmethod
-    async def get_trashed_files(db: Session, user_id: int):
-        files = db.execute(
+    async def get_trashed_files(db: AsyncSession, user_id: int):
+        files = (await db.execute(
             select(File).where(
                 File.user_id == user_id,
                 File.is_deleted == True
             )
-        ).scalars().all()
+        )).scalars().all()
         
         return files
     
     @staticmethod
-    async def empty_trash(db: Session, user_id: int):
-        trashed_files = await FileService.get_trashed_files(db, user_id)
-        
-        space_freed = 0
-        for file in trashed_files:
-            # Suppression physique
-            if os.path.exists(file.storage_path):
-                os.remove(file.storage_path)
-                
-            space_freed += file.size
-            db.delete(file)
+    async def empty_trash(db: AsyncSession, user_id: int):
+        # Purge en lot : agrégats, DELETE ensemblistes et un seul ajustement du quota
+        purge = await PurgeService.purge(db, user_id, [File.is_deleted == True])
+        await db.commit()
         
-        # Libération quota cumulé
-        if space_freed > 0:
-            user = db.execute(select(User).where(User.id == user_id)).scalar_one()
-            user.storage_used = max(0, user.storage_used - space_freed)
-            
-        db.commit()
+        # Suppression physique des blobs sans référence restante
+        PurgeService.schedule_unlink(purge)
         
-        return len(trashed_files)
-    
-    @staticmethod
-    async def search_files(db: Session, user_id: int, search_term: str, folder_id: int = None):
-        # Recherche insensible à la casse avec ILIKE
-        query = select(File).where(
-            File.user_id == user_id,
-            File.is_deleted == False,
-            File.name.ilike(f"%{search_term}%")
-        )
-        
-        if folder_id is not None:
-            query = query.where(File.folder_id == folder_id)
-            
-        files = db.execute(query).scalars().all()
-        return files
\ No newline at end of file
+        return purge.file_count
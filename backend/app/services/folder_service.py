@@ -1,10 +1,14 @@
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from app.models.folder import Folder
 from app.models.file import File
 from app.models.user import User
 from app.schemas.file import FolderCreate
+from app.services.purge_service import PurgeService
+from app.services.tree_service import TreeService
+from app.services.stats_service import StatsService
+from app.utils.pagination import PageParams, fetch_page
 import os
 import datetime
 from pathlib import Path
@@ -12,19 +16,19 @@ from pathlib import Path
 class FolderService:
     
     @staticmethod
-    async def create_folder(db: Session, folder_data: FolderCreate, user_id: int):
+    async def create_folder(db: AsyncSession, folder_data: FolderCreate, user_id: int):
         """
         Crée un nouveau dossier
         """
         # Validation parent si spécifié pour éviter dossiers orphelins
         if folder_data.parent_id:
-            parent = db.execute(
+            parent = (await db.execute(
                 select(Folder).where(
                     Folder.id == folder_data.parent_id,
                     Folder.user_id == user_id,
                     Folder.is_deleted == False
                 )
-            ).scalar_one_or_none()
+            )).scalar_one_or_none()
             
             if not parent:
                 raise HTTPException(
@@ -40,13 +44,14 @@ class FolderService:
         )
         
         db.add(db_folder)
-        db.commit()
-        db.refresh(db_folder)
+        await StatsService.apply(db, user_id, StatsService.folder_delta())
+        await db.commit()
+        await db.refresh(db_folder)
         
         return db_folder
     
     @staticmethod
-    async def get_user_folders(db: Session, user_id: int, parent_id: int | None = None, show_deleted: bool = False):
+    async def get_user_folders(db: AsyncSession, user_id: int, parent_id: int | None = None, show_deleted: bool = False):
         """
         Récupère les dossiers de l'utilisateur, éventuellement filtrés par dossier parent
         """
@@ -61,25 +66,68 @@ class FolderService:
         else:
             query = query.where(Folder.parent_id.is_(None))
                 
-        folders = db.execute(query).scalars().all()
+        folders = (await db.execute(query)).scalars().all()
         return folders
     
     @staticmethod
-    async def get_folder(db: Session, folder_id: int, user_id: int):
+    async def list_directory(db: AsyncSession, user_id: int, folder_id: int | None, page: PageParams):
+        """
+        Une page du contenu d'un dossier : sous-dossiers puis fichiers, dans l'ordre de tri demandé
+        Chaque phase est lue par clé (keyset) : coût constant quelle que soit la position dans le dossier
+        """
+        if folder_id is not None:
+            folder = await FolderService.get_folder(db, folder_id, user_id)
+            if not folder or folder.is_deleted:
+                return None
+        
+        page.check_phase("folders", "files")
+        limit = page.page_size
+        folders, files, next_cursor = [], [], None
+        
+        # Phase dossiers tant que le curseur n'est pas passé aux fichiers
+        if page.phase != "files":
+            folders, next_cursor = await fetch_page(
+                db,
+                select(Folder).where(
+                    Folder.user_id == user_id,
+                    Folder.parent_id == folder_id if folder_id is not None else Folder.parent_id.is_(None),
+                    Folder.is_deleted == False
+                ),
+                Folder, page, "folders", limit=limit, after=page.after("folders")
+            )
+            
+            if next_cursor:
+                return {"folders": folders, "files": files, "next_cursor": next_cursor}
+        
+        # Page complétée par les premiers fichiers (limite 0 : curseur placé au début des fichiers s'il en existe)
+        files, next_cursor = await fetch_page(
+            db,
+            select(File).where(
+                File.user_id == user_id,
+                File.folder_id == folder_id if folder_id is not None else File.folder_id.is_(None),
+                File.is_deleted == False
+            ),
+            File, page, "files", limit=limit - len(folders), after=page.after("files")
+        )
+        
+        return {"folders": folders, "files": files, "next_cursor": next_cursor}
+    
+    @staticmethod
+    async def get_folder(db: AsyncSession, folder_id: int, user_id: int):
         """
         Récupère un dossier par ID, vérifie qu'il appartient à l'utilisateur
         """
-        folder = db.execute(
+        folder = (await db.execute(
             select(Folder).where(
                 Folder.id == folder_id,
                 Folder.user_id == user_id
             )
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         return folder
     
     @staticmethod
-    async def update_folder(db: Session, folder_id: int, folder_data: dict, user_id: int):
+    async def update_folder(db: AsyncSession, folder_id: int, folder_data: dict, user_id: int):
         """
         Met à jour un dossier (renommage, déplacement)
         """
@@ -100,13 +148,13 @@ class FolderService:
                     )
                     
                 # Détection cycle : empêche A->B->C->A
-                def is_descendant(parent_id, child_id):
+                async def is_descendant(parent_id, child_id):
                     if parent_id is None:
                         return False
                         
-                    child = db.execute(
+                    child = (await db.execute(
                         select(Folder).where(Folder.id == child_id)
-                    ).scalar_one_or_none()
+                    )).scalar_one_or_none()
                     
                     if child is None:
                         return False
@@ -117,21 +165,21 @@ class FolderService:
                     if child.parent_id is None:
                         return False
                         
-                    return is_descendant(parent_id, child.parent_id)
+                    return await is_descendant(parent_id, child.parent_id)
                 
-                if is_descendant(folder_id, folder_data['parent_id']):
+                if await is_descendant(folder_id, folder_data['parent_id']):
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST,
                         detail="Un dossier ne peut pas être déplacé vers l'un de ses sous-dossiers"
                     )
                 
-                parent = db.execute(
+                parent = (await db.execute(
                     select(Folder).where(
                         Folder.id == folder_data['parent_id'],
                         Folder.user_id == user_id,
                         Folder.is_deleted == False
                     )
-                ).scalar_one_or_none()
+                )).scalar_one_or_none()
                 
                 if not parent:
                     raise HTTPException(
@@ -145,61 +193,43 @@ class FolderService:
         if folder_data.get('name'):
             folder.name = folder_data['name']
             
-        db.commit()
-        db.refresh(folder)
+        await db.commit()
+        await db.refresh(folder)
         
         return folder
     
     @staticmethod
-    async def delete_folder(db: Session, folder_id: int, user_id: int, permanent: bool = False, recursive: bool = True):
+    async def delete_folder(db: AsyncSession, folder_id: int, user_id: int, permanent: bool = False, recursive: bool = True):
         """
         Supprime un dossier et éventuellement son contenu (corbeille ou définitif)
         """
         folder = await FolderService.get_folder(db, folder_id, user_id)
         if not folder:
             return False
+        
+        purge = None
             
         if permanent:
             
             if recursive:
-                # Récupération récursive contenu avant suppression
-                files, subfolders = await FolderService._get_folder_contents_recursive(db, folder_id)
-                
-                # Suppression physique fichiers + libération quota
-                for file in files:
-                    if os.path.exists(file.storage_path):
-                        os.remove(file.storage_path)
-                        
-                    
-                    db.execute(
-                        update(User)
-                        .where(User.id == user_id)
-                        .values(storage_used=User.storage_used - file.size)
-                    )
-                    
-                    db.delete(file)
-                
-                # Suppression cascade dossiers
-                for subfolder in subfolders:
-                    db.delete(subfolder)
-                    
-                
-                db.delete(folder)
+                # Purge en lot du sous-arbre (fichiers de tout état, dossiers racine incluse)
+                subtree = await TreeService.subtree_ids(db, folder_id)
+                purge = await PurgeService.purge(db, user_id, [File.folder_id.in_(subtree)], subtree)
             else:
                 
-                files = db.execute(
+                files = (await db.execute(
                     select(File).where(
                         File.folder_id == folder_id,
                         File.is_deleted == False
                     )
-                ).scalars().all()
+                )).scalars().all()
                 
-                subfolders = db.execute(
+                subfolders = (await db.execute(
                     select(Folder).where(
                         Folder.parent_id == folder_id,
                         Folder.is_deleted == False
                     )
-                ).scalars().all()
+                )).scalars().all()
                 
                 if files or subfolders:
                     raise HTTPException(
@@ -208,234 +238,142 @@ class FolderService:
                     )
                     
                 
-                db.delete(folder)
+                # Sous-dossiers déjà en corbeille détachés (restaurés à la racine), comme le faisait l'ORM
+                await db.execute(
+                    update(Folder)
+                    .where(Folder.parent_id == folder_id)
+                    .values(parent_id=None),
+                    execution_options={"synchronize_session": False}
+                )
+                # Fichiers en corbeille purgés comme ailleurs : blobs, quota, statistiques et sessions d'upload
+                purge = await PurgeService.purge(db, user_id, [File.folder_id == folder_id], [folder_id])
         else:
+            now = datetime.datetime.now(datetime.timezone.utc)
             
             if recursive:
-                
-                await FolderService._mark_as_deleted_recursive(db, folder_id)
-            
-            now = datetime.datetime.now(datetime.timezone.utc)
-            db.execute(
-                update(Folder)
-                .where(Folder.id == folder_id)
-                .values(is_deleted=True, deleted_at=now)
-            )
+                # Deux UPDATE ensemblistes : contenu puis dossiers (racine incluse)
+                await FolderService._mark_as_deleted_recursive(db, user_id, folder_id, now)
+            elif not folder.is_deleted:
+                await StatsService.apply(db, user_id, StatsService.folder_delta().moved(trashed=True))
+                await db.execute(
+                    update(Folder)
+                    .where(Folder.id == folder_id)
+                    .values(is_deleted=True, deleted_at=now)
+                )
             
-        db.commit()
+        await db.commit()
+        
+        if purge:
+            PurgeService.schedule_unlink(purge)
         return True
     
     @staticmethod
-    async def restore_folder(db: Session, folder_id: int, user_id: int, recursive: bool = True):
+    async def restore_folder(db: AsyncSession, folder_id: int, user_id: int, recursive: bool = True):
         """
         Restaure un dossier depuis la corbeille
         """
-        folder = db.execute(
+        folder = (await db.execute(
             select(Folder).where(
                 Folder.id == folder_id,
                 Folder.user_id == user_id,
                 Folder.is_deleted == True
             )
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         if not folder:
             return False
             
         # Vérification parent toujours actif
         if folder.parent_id is not None:
-            parent = db.execute(
+            parent = (await db.execute(
                 select(Folder).where(
                     Folder.id == folder.parent_id,
                     Folder.is_deleted == False
                 )
-            ).scalar_one_or_none()
+            )).scalar_one_or_none()
             
             # Déplacement racine si parent supprimé
             if not parent:
-                db.execute(
+                await db.execute(
                     update(Folder)
                     .where(Folder.id == folder_id)
                     .values(parent_id=None)
                 )
                 
-        db.execute(
-            update(Folder)
-            .where(Folder.id == folder_id)
-            .values(is_deleted=False, deleted_at=None)
-        )
-        
-        # Restauration cascade contenu
+        # Restauration cascade contenu (racine incluse dans l'UPDATE des dossiers)
         if recursive:
-            
-            await FolderService._restore_contents_recursive(db, folder_id)
-        
-        db.commit()
-        return True
-    
-    @staticmethod
-    async def get_folder_contents_for_download(db: Session, folder_id: int, user_id: int):
-        """
-        Récupère tous les fichiers et sous-dossiers pour le téléchargement ZIP
-        """
-        folder = await FolderService.get_folder(db, folder_id, user_id)
-        if not folder:
-            return None
-            
-        
-        result = {
-            "id": folder.id,
-            "name": folder.name,
-            "files": {}  
-        }
-        
-        # Construction récursive arborescence pour ZIP
-        await FolderService._add_folder_contents_to_result(db, folder_id, result["files"], "")
-        
-        return result
-    
-    @staticmethod
-    async def _add_folder_contents_to_result(db: Session, folder_id: int, files_dict: dict, current_path: str):
-        """
-        Fonction auxiliaire récursive pour construire la structure de téléchargement
-        """
-        # Parcours récursif avec préservation chemins relatifs
-        files = db.execute(
-            select(File).where(
-                File.folder_id == folder_id,
-                File.is_deleted == False
-            )
-        ).scalars().all()
-        
-        
-        for file in files:
-            file_path = os.path.join(current_path, str(file.name))
-            files_dict[file_path] = {
-                "name": file.name,
-                "path": file.storage_path,
-                "size": file.size,
-                "mime_type": file.mime_type
-            }
-        
-        # Descente récursive sous-dossiers
-        subfolders = db.execute(
-            select(Folder).where(
-                Folder.parent_id == folder_id,
-                Folder.is_deleted == False
+            await FolderService._restore_contents_recursive(db, user_id, folder_id)
+        else:
+            await StatsService.apply(db, user_id, StatsService.folder_delta(trashed=True).moved(trashed=False))
+            await db.execute(
+                update(Folder)
+                .where(Folder.id == folder_id)
+                .values(is_deleted=False, deleted_at=None)
             )
-        ).scalars().all()
-        
         
-        for subfolder in subfolders:
-            subfolder_path = os.path.join(current_path, str(subfolder.name))
-            await FolderService._add_folder_contents_to_result(db, subfolder.id, files_dict, subfolder_path)
+        await db.commit()
+        return True
     
     @staticmethod
-    async def _get_folder_contents_recursive(db: Session, folder_id: int):
+    async def _get_folder_contents_recursive(db: AsyncSession, folder_id: int):
         """
         Récupère tous les fichiers et sous-dossiers de manière récursive
         """
-        files = []
-        folders = []
-        
-        
-        folder_files = db.execute(
-            select(File).where(File.folder_id == folder_id)
-        ).scalars().all()
-        
-        files.extend(folder_files)
-        
-        
-        subfolders = db.execute(
-            select(Folder).where(Folder.parent_id == folder_id)
-        ).scalars().all()
-        
-        folders.extend(subfolders)
+        tree = await TreeService.load_subtree(db, folder_id)
         
-        
-        for subfolder in subfolders:
-            subfolder_files, subfolder_folders = await FolderService._get_folder_contents_recursive(db, subfolder.id)
-            files.extend(subfolder_files)
-            folders.extend(subfolder_folders)
-            
-        return files, folders
+        return tree.files, tree.descendants
     
     @staticmethod
-    async def _mark_as_deleted_recursive(db: Session, folder_id: int):
+    async def _mark_as_deleted_recursive(db: AsyncSession, user_id: int, folder_id: int, now: datetime.datetime):
         """
-        Marque tous les fichiers et sous-dossiers comme supprimés
+        Marque le dossier, ses sous-dossiers actifs et leurs fichiers comme supprimés
+        Un UPDATE pour les fichiers, un pour les dossiers ; les identifiants restent côté base
         """
-        now = datetime.datetime.now(datetime.timezone.utc)
+        # Descente limitée aux sous-dossiers actifs : ceux déjà en corbeille gardent leur date
+        subtree = await TreeService.subtree_ids(db, folder_id, deleted=False)
         
+        # Statistiques : éléments actifs du sous-arbre comptés avant leur passage en corbeille
+        moved = await StatsService.count_files(db, [File.folder_id.in_(subtree), File.is_deleted == False])
+        moved.update(await StatsService.count_folders(db, [Folder.id.in_(subtree), Folder.is_deleted == False]))
+        await StatsService.apply(db, user_id, moved.moved(trashed=True))
         
-        db.execute(
+        # Fichiers d'abord : la sous-requête voit encore l'état des dossiers avant mise à jour
+        await db.execute(
             update(File)
-            .where(File.folder_id == folder_id, File.is_deleted == False)
+            .where(File.folder_id.in_(subtree), File.is_deleted == False)
             .values(is_deleted=True, deleted_at=now)
+            .execution_options(synchronize_session=False)
         )
         
-        
-        subfolders = db.execute(
-            select(Folder).where(
-                Folder.parent_id == folder_id,
-                Folder.is_deleted == False
-            )
-        ).scalars().all()
-        
-        
-        for subfolder in subfolders:
-            db.execute(
-                update(Folder)
-                .where(Folder.id == subfolder.id)
-                .values(is_deleted=True, deleted_at=now)
-            )
-            
-            
-            await FolderService._mark_as_deleted_recursive(db, subfolder.id)
+        await db.execute(
+            update(Folder)
+            .where(Folder.id.in_(subtree))
+            .values(is_deleted=True, deleted_at=now)
+            .execution_options(synchronize_session=False)
+        )
     
     @staticmethod
-    async def _restore_contents_recursive(db: Session, folder_id: int):
+    async def _restore_contents_recursive(db: AsyncSession, user_id: int, folder_id: int):
         """
-        Restaure tous les fichiers et sous-dossiers d'un dossier
+        Restaure le dossier, ses sous-dossiers en corbeille et leurs fichiers
         """
+        # Descente limitée aux sous-dossiers en corbeille
+        subtree = await TreeService.subtree_ids(db, folder_id, deleted=True)
         
-        db.execute(
+        moved = await StatsService.count_files(db, [File.folder_id.in_(subtree), File.is_deleted == True])
+        moved.update(await StatsService.count_folders(db, [Folder.id.in_(subtree), Folder.is_deleted == True]))
+        await StatsService.apply(db, user_id, moved.moved(trashed=False))
+        
+        await db.execute(
             update(File)
-            .where(File.folder_id == folder_id, File.is_deleted == True)
+            .where(File.folder_id.in_(subtree), File.is_deleted == True)
             .values(is_deleted=False, deleted_at=None)
+            .execution_options(synchronize_session=False)
         )
         
-        
-        subfolders = db.execute(
-            select(Folder).where(
-                Folder.parent_id == folder_id,
-                Folder.is_deleted == True
-            )
-        ).scalars().all()
-        
-        
-        for subfolder in subfolders:
-            db.execute(
-                update(Folder)
-                .where(Folder.id == subfolder.id)
-                .values(is_deleted=False, deleted_at=None)
-            )
-            
-            
-            await FolderService._restore_contents_recursive(db, subfolder.id)
-    
-    @staticmethod
-    async def search_folders(db: Session, user_id: int, search_term: str, folder_id: int = None):
-        """
-        Recherche des dossiers par nom
-        """
-        query = select(Folder).where(
-            Folder.user_id == user_id,
-            Folder.is_deleted == False,
-            Folder.name.ilike(f"%{search_term}%")
+        await db.execute(
+            update(Folder)
+            .where(Folder.id.in_(subtree))
+            .values(is_deleted=False, deleted_at=None)
+            .execution_options(synchronize_session=False)
         )
-        
-        if folder_id is not None:
-            query = query.where(Folder.parent_id == folder_id)
-            
-        folders = db.execute(query).scalars().all()
-        return folders
\ No newline at end of file
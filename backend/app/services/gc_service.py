@@ -0,0 +1,283 @@
+from sqlalchemy import select, func
+from app.models.blob import Blob
+from app.models.file import File
+from app.database import SessionLocal
+from app.config import settings
+from app.utils.executors import get_executor
+import asyncio
+import os
+import re
+import time
+
+# Répertoires gérés par leur propre nettoyage : sessions d'upload (expiration) et rendus (éviction LRU)
+SKIPPED_DIRS = {".sessions", ".renditions"}
+
+DIGEST_NAME = re.compile(r"[0-9a-f]{64}")
+
+# Suffixe d'un orphelin mis de côté le temps de la dernière vérification
+QUARANTINE_SUFFIX = ".gc"
+
+class GCReport:
+    """
+    Bilan d'un passage : fichiers parcourus, orphelins trouvés et supprimés, références sans fichier physique
+    """
+
+    def __init__(self, dry_run: bool = False):
+        self.dry_run = dry_run
+        self.scanned = 0
+        self.recent = 0
+        self.orphans = 0
+        self.deleted = 0
+        self.bytes_freed = 0
+        self.errors = 0
+        self.missing_count = 0
+        self.missing = []
+
+    def add_missing(self, kind: str, key, path: str):
+        self.missing_count += 1
+        if len(self.missing) < settings.GC_MAX_REPORTED_MISSING:
+            self.missing.append((kind, key, path))
+
+    def summary(self):
+        action = "à supprimer" if self.dry_run else "supprimés"
+        return (
+            f"Fichiers parcourus: {self.scanned}, récents ignorés: {self.recent}, "
+            f"orphelins {action}: {self.orphans} ({self.bytes_freed} octets), "
+            f"erreurs: {self.errors}, références sans fichier: {self.missing_count}"
+        )
+
+
+class _Throttle:
+    """Limite le nombre d'opérations disque par seconde (0 : sans limite)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(self.next_at, now) + self.interval
+
+
+class GarbageCollector:
+    """
+    Nettoyage des fichiers orphelins de UPLOAD_DIR et signalement des références sans fichier physique
+    Mémoire bornée quel que soit le volume : parcours en flux (os.scandir), vérification en base par lots
+    Exécution bloquante : à lancer hors de la boucle d'événements (CLI, pool dédié)
+    """
+
+    def __init__(self, dry_run: bool = False, grace_period: int = None, batch_size: int = None, rate: float = None):
+        self.dry_run = dry_run
+        self.grace_period = settings.GC_GRACE_PERIOD_SECONDS if grace_period is None else grace_period
+        self.batch_size = batch_size or settings.GC_BATCH_SIZE
+        self.throttle = _Throttle(settings.GC_MAX_OPS_PER_SECOND if rate is None else rate)
+        self.report = GCReport(dry_run)
+
+    def run(self, check_missing: bool = True):
+        if not self.dry_run and not self._paths_match_upload_dir():
+            print("Chemins enregistrés hors de UPLOAD_DIR (configuration modifiée ?) : nettoyage limité au signalement")
+            self.dry_run = self.report.dry_run = True
+
+        self.collect_orphans()
+        if check_missing:
+            self.find_missing()
+        return self.report
+
+    def _paths_match_upload_dir(self):
+        """
+        Les chemins en base doivent être écrits comme ceux du parcours : sinon un fichier référencé
+        (UPLOAD_DIR déplacé ou écrit autrement) passerait pour orphelin
+        """
+        prefix = os.path.join(settings.UPLOAD_DIR, "")
+        db = SessionLocal()
+        try:
+            foreign_blobs = db.execute(
+                select(func.count()).select_from(Blob).where(~Blob.storage_path.startswith(prefix, autoescape=True))
+            ).scalar()
+            foreign_files = db.execute(
+                select(func.count()).select_from(File).where(
+                    File.content_hash.is_(None),
+                    ~File.storage_path.startswith(prefix, autoescape=True)
+                )
+            ).scalar()
+        finally:
+            db.close()
+
+        return not foreign_blobs and not foreign_files
+
+    def _walk(self, path: str):
+        """Fichiers réguliers sous path, en flux : aucune liste complète en mémoire"""
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if current != path or entry.name not in SKIPPED_DIRS:
+                                stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry
+            except FileNotFoundError:
+                continue
+
+    def collect_orphans(self):
+        cutoff = time.time() - self.grace_period
+        batch = []
+
+        for entry in self._walk(settings.UPLOAD_DIR):
+            self.throttle.wait()
+            self.report.scanned += 1
+
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+
+            # Période de grâce : upload en cours d'écriture ou blob tout juste créé
+            if stat.st_mtime > cutoff:
+                self.report.recent += 1
+                continue
+
+            batch.append((entry.path, stat.st_size))
+            if len(batch) >= self.batch_size:
+                self._process_batch(batch, cutoff)
+                batch = []
+
+        if batch:
+            self._process_batch(batch, cutoff)
+
+    def _referenced(self, db, paths):
+        """Chemins du lot référencés par un blob (recherche par empreinte) ou un fichier antérieur à la déduplication"""
+        digests = [os.path.basename(path) for path in paths if DIGEST_NAME.fullmatch(os.path.basename(path))]
+
+        referenced = set()
+        if digests:
+            referenced.update(db.execute(
+                select(Blob.storage_path).where(Blob.digest.in_(digests))
+            ).scalars().all())
+
+        referenced.update(db.execute(
+            select(File.storage_path).where(File.content_hash.is_(None), File.storage_path.in_(paths))
+        ).scalars().all())
+
+        return referenced
+
+    def _process_batch(self, batch, cutoff: float):
+        db = SessionLocal()
+        try:
+            referenced = self._referenced(db, [path for path, _ in batch])
+            orphans = [(path, size) for path, size in batch if path not in referenced]
+
+            self.report.orphans += len(orphans)
+            if self.dry_run:
+                self.report.bytes_freed += sum(size for _, size in orphans)
+                return
+
+            for path, size in orphans:
+                self.throttle.wait()
+                if self._remove(db, path, cutoff):
+                    self.report.deleted += 1
+                    self.report.bytes_freed += size
+        finally:
+            db.close()
+
+    def _remove(self, db, path: str, cutoff: float):
+        """
+        Suppression sûre face à un upload concurrent du même contenu : le fichier est d'abord mis de côté,
+        puis la référence et la date sont revérifiées ; il est remis en place si un blob l'a adopté entre-temps
+        """
+        quarantine = path + QUARANTINE_SUFFIX
+        try:
+            os.rename(path, quarantine)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print(f"Erreur lors de la suppression du fichier orphelin {path}: {str(e)}")
+            self.report.errors += 1
+            return False
+
+        try:
+            db.rollback()
+            adopted = path in self._referenced(db, [path]) or os.stat(quarantine).st_mtime > cutoff
+        except Exception as e:
+            print(f"Erreur lors de la vérification du fichier orphelin {path}: {str(e)}")
+            adopted = True
+
+        try:
+            if adopted:
+                # Contenu adressé par empreinte : un fichier recréé entre-temps au même chemin est identique
+                if os.path.exists(path):
+                    os.remove(quarantine)
+                else:
+                    os.rename(quarantine, path)
+                self.report.orphans -= 1
+                return False
+
+            os.remove(quarantine)
+            return True
+        except OSError as e:
+            print(f"Erreur lors de la suppression du fichier orphelin {path}: {str(e)}")
+            self.report.errors += 1
+            return False
+
+    def find_missing(self):
+        """Blobs et fichiers antérieurs à la déduplication dont le fichier physique a disparu (signalés, jamais modifiés)"""
+        last_digest = ""
+        while True:
+            db = SessionLocal()
+            try:
+                rows = db.execute(
+                    select(Blob.digest, Blob.storage_path)
+                    .where(Blob.digest > last_digest)
+                    .order_by(Blob.digest)
+                    .limit(self.batch_size)
+                ).all()
+            finally:
+                db.close()
+
+            if not rows:
+                break
+
+            for digest, path in rows:
+                self.throttle.wait()
+                if not os.path.exists(path):
+                    self.report.add_missing("blob", digest, path)
+            last_digest = rows[-1][0]
+
+        last_id = 0
+        while True:
+            db = SessionLocal()
+            try:
+                rows = db.execute(
+                    select(File.id, File.storage_path)
+                    .where(File.content_hash.is_(None), File.id > last_id)
+                    .order_by(File.id)
+                    .limit(self.batch_size)
+                ).all()
+            finally:
+                db.close()
+
+            if not rows:
+                break
+
+            for file_id, path in rows:
+                self.throttle.wait()
+                if not os.path.exists(path):
+                    self.report.add_missing("file", file_id, path)
+            last_id = rows[-1][0]
+
+        return self.report.missing
+
+async def collect_garbage():
+    """Tâche périodique : nettoyage dans un thread dédié, la boucle d'événements reste libre"""
+    executor = get_executor("gc", 1)
+    report = await asyncio.get_running_loop().run_in_executor(executor, GarbageCollector().run)
+
+    print(f"Nettoyage du stockage : {report.summary()}")
+    for kind, key, path in report.missing:
+        print(f"Fichier physique manquant ({kind} {key}) : {path}")
@@ -0,0 +1,102 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, func, case
+from app.models.file import File
+from app.models.folder import Folder
+from app.models.share import Share
+from app.models.user import User
+from app.models.upload_session import UploadSession
+from app.services.blob_store import BlobStore
+from app.services.search_service import SearchService
+from app.services.quota_service import QuotaService
+from app.services.stats_service import StatsService
+
+class PurgeResult:
+    """
+    Bilan d'une purge : nombre de fichiers, octets libérés et chemins physiques à supprimer
+    """
+
+    def __init__(self, file_count: int = 0, space_freed: int = 0, released=None):
+        self.file_count = file_count
+        self.space_freed = space_freed
+        self.released = released or []
+
+
+class PurgeService:
+    """
+    Suppression définitive en lot : nombre de requêtes constant quel que soit le volume
+    Les DELETE ensemblistes contournent les cascades ORM, les dépendances sont donc supprimées explicitement
+    """
+
+    @staticmethod
+    async def purge(db: AsyncSession, user_id: int, file_criteria, folder_ids=None):
+        """
+        Supprime les fichiers de l'utilisateur correspondant aux critères et, si fournis, les dossiers folder_ids
+        (liste ou sous-requête d'identifiants). Ne valide pas la transaction : appeler schedule_unlink après le commit
+        """
+        criteria = [File.user_id == user_id, *file_criteria]
+
+        # Agrégats calculés par la base : aucune ligne File chargée en mémoire
+        file_count, space_freed = (await db.execute(
+            select(func.count(File.id), func.coalesce(func.sum(File.size), 0)).where(*criteria)
+        )).one()
+
+        released = []
+        if file_count:
+            removed = await StatsService.count_files(db, criteria)
+            counts = dict((await db.execute(
+                select(File.content_hash, func.count(File.id))
+                .where(*criteria, File.content_hash.is_not(None))
+                .group_by(File.content_hash)
+            )).all())
+
+            # Fichiers antérieurs à la déduplication : chemin propre à chaque ligne
+            legacy_paths = (await db.execute(
+                select(File.storage_path).where(*criteria, File.content_hash.is_(None))
+            )).scalars().all()
+
+            await db.execute(
+                delete(Share).where(Share.file_id.in_(select(File.id).where(*criteria))),
+                execution_options={"synchronize_session": False}
+            )
+            await SearchService.forget(db, "file", select(File.id).where(*criteria))
+            await db.execute(delete(File).where(*criteria), execution_options={"synchronize_session": False})
+
+            released = [(None, path) for path in legacy_paths]
+            released.extend(await BlobStore.release_counts(db, counts))
+
+            # Un seul ajustement du quota pour l'ensemble de la purge
+            await db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(storage_used=case(
+                    (User.storage_used > space_freed, User.storage_used - space_freed),
+                    else_=0
+                )),
+                execution_options={"synchronize_session": False}
+            )
+            await StatsService.apply(db, user_id, removed.negated())
+
+        if folder_ids is not None:
+            # Sessions d'upload visant un dossier supprimé : quota réservé rendu, morceaux nettoyés à expiration
+            session_ids = (await db.execute(
+                select(UploadSession.id).where(UploadSession.folder_id.in_(folder_ids))
+            )).scalars().all()
+            await QuotaService.release(db, session_ids)
+            await db.execute(
+                delete(UploadSession).where(UploadSession.folder_id.in_(folder_ids)),
+                execution_options={"synchronize_session": False}
+            )
+            await SearchService.forget(db, "folder", folder_ids)
+            removed = await StatsService.count_folders(db, [Folder.user_id == user_id, Folder.id.in_(folder_ids)])
+            await StatsService.apply(db, user_id, removed.negated())
+            await db.execute(
+                delete(Folder).where(Folder.user_id == user_id, Folder.id.in_(folder_ids)),
+                execution_options={"synchronize_session": False}
+            )
+
+        return PurgeResult(file_count, space_freed, released)
+
+    @staticmethod
+    def schedule_unlink(result: PurgeResult):
+        """Suppression physique en arrière-plan, après validation de la transaction"""
+        return BlobStore.schedule_unlink(result.released)
@@ -0,0 +1,156 @@
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, case
+from app.models.user import User
+from app.models.quota_reservation import QuotaReservation
+from app.database import AsyncSessionLocal
+from app.config import settings
+import datetime
+import uuid
+
+def _quota_exceeded():
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="Quota de stockage dépassé"
+    )
+
+def _fits(size: int):
+    # Condition évaluée par la base sur la ligne verrouillée par l'UPDATE : aucune fenêtre entre lecture et écriture
+    return User.storage_used + User.storage_reserved + size <= User.storage_quota
+
+class QuotaService:
+    """
+    Quota des uploads concurrents : l'espace est réservé avant l'écriture des octets par un UPDATE conditionnel,
+    puis converti en espace utilisé à la création du fichier ou libéré en cas d'échec
+    storage_used + storage_reserved ne dépasse jamais storage_quota, quel que soit le nombre d'uploads simultanés
+    """
+
+    @staticmethod
+    def _expiry():
+        return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=settings.QUOTA_RESERVATION_TTL_SECONDS)
+
+    @staticmethod
+    async def reserve(db: AsyncSession, user_id: int, size: int, reservation_id: str = None, expires_at: datetime.datetime = None):
+        """
+        Réserve size octets sur le quota ; HTTPException 413 si l'espace libre ne suffit pas
+        À valider par l'appelant (db.commit) avant d'écrire les octets : le verrou de la ligne utilisateur est alors relâché
+        """
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id, _fits(size))
+            .values(storage_reserved=User.storage_reserved + size)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            await db.rollback()
+            raise _quota_exceeded()
+
+        reservation = QuotaReservation(
+            id=reservation_id or str(uuid.uuid4()),
+            user_id=user_id,
+            size=size,
+            expires_at=expires_at or QuotaService._expiry()
+        )
+        db.add(reservation)
+
+        return reservation.id
+
+    @staticmethod
+    async def charge(db: AsyncSession, user_id: int, size: int):
+        """Impute size octets sans réservation préalable (contenu déjà stocké), sous la même condition de quota"""
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id, _fits(size))
+            .values(storage_used=User.storage_used + size)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            raise _quota_exceeded()
+
+    @staticmethod
+    async def consume(db: AsyncSession, reservation_id: str, user_id: int, size: int):
+        """
+        Convertit la réservation en espace utilisé (taille réelle) dans la transaction qui crée le fichier
+        Réservation déjà expirée et libérée : imputation conditionnelle, comme un contenu sans réservation
+        """
+        # DELETE ... RETURNING : une seule des transactions concurrentes (validation, libération, expiration) l'obtient
+        reserved = (await db.execute(
+            delete(QuotaReservation)
+            .where(QuotaReservation.id == reservation_id)
+            .returning(QuotaReservation.size)
+        )).scalar_one_or_none()
+
+        if reserved is None:
+            await QuotaService.charge(db, user_id, size)
+            return
+
+        await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(
+                storage_used=User.storage_used + size,
+                storage_reserved=case(
+                    (User.storage_reserved > reserved, User.storage_reserved - reserved),
+                    else_=0
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def release(db: AsyncSession, reservation_ids):
+        """Libère des réservations (upload échoué, abandonné ou expiré) ; validation par l'appelant"""
+        released = 0
+
+        for reservation_id in reservation_ids:
+            row = (await db.execute(
+                delete(QuotaReservation)
+                .where(QuotaReservation.id == reservation_id)
+                .returning(QuotaReservation.user_id, QuotaReservation.size)
+            )).one_or_none()
+
+            # Déjà convertie ou libérée par une autre transaction
+            if row is None:
+                continue
+
+            user_id, size = row
+            await db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(storage_reserved=case(
+                    (User.storage_reserved > size, User.storage_reserved - size),
+                    else_=0
+                ))
+                .execution_options(synchronize_session=False)
+            )
+            released += 1
+
+        return released
+
+    @staticmethod
+    async def extend(db: AsyncSession, reservation_id: str, expires_at: datetime.datetime):
+        """Prolonge une réservation encore active (upload reprenable qui reçoit des morceaux)"""
+        await db.execute(
+            update(QuotaReservation)
+            .where(QuotaReservation.id == reservation_id)
+            .values(expires_at=expires_at)
+        )
+
+    @staticmethod
+    async def release_expired(db: AsyncSession):
+        """Libère les réservations dont l'upload a été interrompu sans nettoyage (arrêt du processus, client parti)"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        expired_ids = (await db.execute(
+            select(QuotaReservation.id).where(QuotaReservation.expires_at <= now)
+        )).scalars().all()
+
+        released = await QuotaService.release(db, expired_ids)
+        await db.commit()
+
+        return released
+
+async def release_expired_quota_reservations():
+    """Tâche périodique : session dédiée hors requête"""
+    async with AsyncSessionLocal() as db:
+        await QuotaService.release_expired(db)
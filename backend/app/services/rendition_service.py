@@ -0,0 +1,162 @@
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from PIL import Image, UnidentifiedImageError
+from app.models.file import File
+from app.config import settings
+from app.utils.executors import get_executor
+from app.utils.imaging import SUPPORTED_TYPES, render
+import asyncio
+import hashlib
+import os
+
+# Rendus proposés : côté maximal en pixels et qualité d'encodage
+RENDITIONS = {
+    "small": (128, 75),
+    "medium": (256, 75),
+    "large": (512, 80),
+    "preview": (1920, 85),
+}
+
+# Rendus en cours de génération (chemin -> future) : une seule génération par rendu manquant
+_inflight = {}
+
+# Taille estimée du cache (None : pas encore mesurée) ; l'éviction la recalcule
+_cache = {"bytes": None}
+
+class RenditionService:
+    """
+    Miniatures et aperçu web des images, générés à la demande dans un pool de processus
+    Cache disque sous UPLOAD_DIR/.renditions, par empreinte de contenu et taille, évincé par ancienneté d'accès (LRU)
+    """
+
+    @staticmethod
+    def cache_dir():
+        return os.path.join(settings.UPLOAD_DIR, ".renditions")
+
+    @staticmethod
+    def content_key(file: File):
+        # Fichier antérieur à la déduplication : clé dérivée de son chemin et de sa taille
+        if file.content_hash:
+            return file.content_hash
+        return hashlib.sha256(f"{file.storage_path}:{file.size}".encode()).hexdigest()
+
+    @staticmethod
+    def rendition_path(key: str, name: str):
+        return os.path.join(RenditionService.cache_dir(), key[:2], f"{key}-{name}.{settings.RENDITION_FORMAT}")
+
+    @staticmethod
+    def media_type():
+        return f"image/{settings.RENDITION_FORMAT}"
+
+    @staticmethod
+    def is_supported(mime_type: str):
+        return mime_type in SUPPORTED_TYPES
+
+    @staticmethod
+    async def get_rendition(file: File, name: str):
+        """Chemin du rendu demandé, généré s'il est absent du cache"""
+        if name not in RENDITIONS:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Rendu inconnu (disponibles : {', '.join(RENDITIONS)})"
+            )
+
+        if not RenditionService.is_supported(file.mime_type):
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Aperçu non disponible pour ce type de fichier"
+            )
+
+        path = RenditionService.rendition_path(RenditionService.content_key(file), name)
+
+        try:
+            # Accès marqué par la date de modification (atime souvent désactivé) : ordre d'éviction LRU
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        future = _inflight.get(path)
+        if future is None:
+            future = asyncio.ensure_future(RenditionService._generate(file.storage_path, path, name))
+            _inflight[path] = future
+            future.add_done_callback(lambda _: _inflight.pop(path, None))
+
+        # shield : une requête annulée (client parti) n'interrompt pas la génération attendue par les autres
+        return await asyncio.shield(future)
+
+    @staticmethod
+    async def _generate(source: str, path: str, name: str):
+        max_size, quality = RENDITIONS[name]
+        executor = get_executor("renditions", settings.RENDITION_WORKERS, kind="process")
+
+        try:
+            size = await asyncio.get_running_loop().run_in_executor(
+                executor, render, source, path, max_size, settings.RENDITION_FORMAT, quality
+            )
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as e:
+            print(f"Erreur lors de la génération du rendu {name} de {source}: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Image illisible : aperçu impossible"
+            )
+
+        await RenditionService._account(size)
+        return path
+
+    @staticmethod
+    async def _account(size: int):
+        if _cache["bytes"] is None:
+            _cache["bytes"] = await run_in_threadpool(RenditionService.evict)
+        else:
+            _cache["bytes"] += size
+
+        if _cache["bytes"] > settings.RENDITION_CACHE_MAX_BYTES:
+            _cache["bytes"] = await run_in_threadpool(RenditionService.evict)
+
+    @staticmethod
+    def evict(max_bytes: int = None):
+        """
+        Supprime les rendus les moins récemment servis jusqu'à repasser sous 90 % du budget
+        Renvoie la taille du cache restante (parcours complet : à appeler hors de la boucle d'événements)
+        """
+        max_bytes = settings.RENDITION_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        entries = []
+        total = 0
+
+        for root, _, names in os.walk(RenditionService.cache_dir()):
+            for entry_name in names:
+                entry_path = os.path.join(root, entry_name)
+                try:
+                    stat = os.stat(entry_path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+                total += stat.st_size
+
+        if total <= max_bytes:
+            return total
+
+        # Marge sous le budget : pas d'éviction à chaque nouveau rendu
+        target = max_bytes * 0.9
+        for _, size, entry_path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(entry_path)
+                total -= size
+            except FileNotFoundError:
+                total -= size
+            except OSError as e:
+                print(f"Erreur lors de la suppression du rendu {entry_path}: {str(e)}")
+
+        return total
+
+    @staticmethod
+    def discard(key: str):
+        """Supprime les rendus d'un contenu disparu (blob libéré)"""
+        for name in RENDITIONS:
+            try:
+                os.remove(RenditionService.rendition_path(key, name))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,257 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, delete, event, func, case, inspect, intersect
+from app.models.file import File
+from app.models.folder import Folder
+from app.models.search_gram import SearchGram
+from app.models.content_index import ContentTerm
+from app.services.tree_service import TreeService
+from app.config import settings
+from app.utils.text_extract import tokenize
+import re
+
+# Séparateurs de mots pour le bonus « début de mot » (rapport_final, 2024-bilan.pdf...)
+WORD_START = r"(^|[\s._-])"
+
+# Nombre maximal de termes pris en compte dans une requête, et de n-grammes recherchés (repli sans pg_trgm)
+MAX_TERMS = 8
+MAX_GRAM_LOOKUPS = 16
+
+def normalize(text: str):
+    """Forme comparée : casse repliée, espaces consécutifs réduits"""
+    return " ".join(text.casefold().split())
+
+def _like_escape(term: str):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _trigram_set(text: str):
+    # Trigrammes à la manière de pg_trgm : mots alphanumériques complétés par deux espaces devant, un derrière
+    grams = set()
+    for word in re.findall(r"\w+", text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class SearchService:
+    """
+    Recherche par nom indexée, classée et paginée
+    PostgreSQL : index GIN pg_trgm sur le nom (ILIKE servi par l'index, similarity() pour le classement)
+    Autres bases : index n-grammes calculé en Python (table search_grams), tenu à jour par événements ORM
+    """
+
+    @staticmethod
+    def uses_trigram_index(dialect_name: str):
+        return dialect_name == "postgresql"
+
+    @staticmethod
+    def name_grams(name: str):
+        """N-grammes indexés : un par position, le nom étant complété par des espaces (préfixes des termes courts)"""
+        text = normalize(name) + "  "
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    @staticmethod
+    def similarity(name: str, query: str):
+        """Similarité trigrammes (coefficient de Jaccard), équivalent Python de similarity() de pg_trgm"""
+        a, b = _trigram_set(name), _trigram_set(query)
+        union = a | b
+        return len(a & b) / len(union) if union else 0.0
+
+    @staticmethod
+    def rank(name: str, query: str):
+        # 3 : nom exact, 2 : préfixe du nom, 1 : début d'un mot, 0 : sous-chaîne
+        if name == query:
+            return 3
+        if name.startswith(query):
+            return 2
+        if re.search(WORD_START + re.escape(query), name):
+            return 1
+        return 0
+
+    @staticmethod
+    def _gram_candidates(kind: str, user_id: int, terms):
+        """
+        Identifiants des éléments contenant les n-grammes de tous les termes : une recherche d'index par n-gramme,
+        intersectées (moins de 3 caractères : un n-gramme qui commence par le terme)
+        """
+        lookups = []
+        for term in terms:
+            lookup = select(SearchGram.item_id).where(SearchGram.user_id == user_id, SearchGram.kind == kind)
+
+            grams = sorted({term[i:i + 3] for i in range(len(term) - 2)})
+            if grams:
+                lookups.extend(lookup.where(SearchGram.gram == gram) for gram in grams)
+            else:
+                # Intervalle plutôt que LIKE : parcours de l'index quelle que soit la collation
+                lookups.append(lookup.where(SearchGram.gram >= term, SearchGram.gram < term + "\U0010ffff").distinct())
+
+        # Au-delà, l'intersection ne réduit plus guère les candidats (vérifiés ensuite en Python)
+        lookups = lookups[:MAX_GRAM_LOOKUPS]
+        return intersect(*lookups) if len(lookups) > 1 else lookups[0]
+
+    @staticmethod
+    def match_query(dialect_name: str, kind: str, model, user_id: int, terms):
+        """Sélection indexée des éléments dont le nom contient chaque terme (candidats à vérifier hors PostgreSQL)"""
+        if SearchService.uses_trigram_index(dialect_name):
+            return select(model).where(*[model.name.ilike(f"%{_like_escape(term)}%", escape="\\") for term in terms])
+
+        # Jointure plutôt que IN : les lignes sont lues par clé primaire depuis les candidats
+        candidates = SearchService._gram_candidates(kind, user_id, terms).subquery()
+        return select(model).join(candidates, model.id == candidates.c.item_id)
+
+    @staticmethod
+    async def _matches(db: AsyncSession, kind: str, model, user_id: int, query: str, terms, criteria, window: int):
+        """Les window meilleurs éléments d'un type : (rang, score, type, élément)"""
+        dialect_name = db.get_bind().dialect.name
+        matches = SearchService.match_query(dialect_name, kind, model, user_id, terms).where(*criteria)
+
+        if SearchService.uses_trigram_index(dialect_name):
+            # Classement calculé par la base, seule la fenêtre demandée est lue
+            name = func.lower(model.name)
+            rank = case(
+                (name == query, 3),
+                (name.like(f"{_like_escape(query)}%", escape="\\"), 2),
+                (name.op("~")(WORD_START + re.escape(query)), 1),
+                else_=0
+            )
+            score = func.similarity(model.name, query)
+
+            rows = (await db.execute(
+                matches.add_columns(rank, score)
+                .order_by(rank.desc(), score.desc(), name, model.id)
+                .limit(window)
+            )).all()
+            return [(item_rank, item_score, kind, item) for item, item_rank, item_score in rows]
+
+        # Repli : candidats issus de l'index n-grammes, vérifiés et classés en Python
+        hits = []
+        for item in (await db.execute(matches)).scalars().all():
+            name = normalize(item.name)
+            if all(term in name for term in terms):
+                hits.append((SearchService.rank(name, query), SearchService.similarity(name, query), kind, item))
+
+        hits.sort(key=SearchService._sort_key)
+        return hits[:window]
+
+    @staticmethod
+    def content_query(terms):
+        """Fichiers dont le contenu indexé contient tous les mots, avec leur nombre total d'occurrences"""
+        occurrences = func.sum(ContentTerm.frequency)
+
+        return (
+            select(File, occurrences)
+            .join(ContentTerm, ContentTerm.digest == File.content_hash)
+            .where(ContentTerm.term.in_(terms))
+            .group_by(File.id)
+            .having(func.count(ContentTerm.term) == len(terms))
+            .order_by(occurrences.desc(), File.id)
+        )
+
+    @staticmethod
+    async def _content_matches(db: AsyncSession, terms, criteria, window: int, exclude):
+        # Rang -1 : toujours après les correspondances de nom ; les fichiers déjà trouvés par leur nom sont ignorés
+        rows = (await db.execute(
+            SearchService.content_query(terms).where(*criteria).limit(window + len(exclude))
+        )).all()
+
+        hits = [(-1, occurrences, "file", item) for item, occurrences in rows if item.id not in exclude]
+        return hits[:window]
+
+    @staticmethod
+    def _sort_key(hit):
+        rank, score, kind, item = hit
+        return (-rank, -score, item.name.casefold(), kind, item.id)
+
+    @staticmethod
+    async def search(db: AsyncSession, user_id: int, q: str, folder_id: int = None, limit: int = None, offset: int = 0, content: bool = False):
+        """
+        Fichiers et dossiers dont le nom contient tous les termes, les plus pertinents d'abord
+        folder_id restreint la recherche à tout le sous-arbre du dossier ; None si ce dossier n'existe pas
+        content ajoute les fichiers dont le texte indexé contient tous les mots de la requête
+        """
+        limit = limit or settings.SEARCH_PAGE_SIZE
+        query = normalize(q)
+        terms = list(dict.fromkeys(query.split()))[:MAX_TERMS]
+
+        subtree = None
+        if folder_id is not None:
+            folder = (await db.execute(
+                select(Folder.id).where(
+                    Folder.id == folder_id,
+                    Folder.user_id == user_id,
+                    Folder.is_deleted == False
+                )
+            )).scalar_one_or_none()
+
+            if folder is None:
+                return None
+
+            subtree = TreeService.subtree_ids_query(folder_id, deleted=False)
+
+        hits = []
+        if terms:
+            # Fenêtre commune aux deux types : la page est extraite de leur fusion classée
+            window = offset + limit + 1
+
+            for kind, model, parent in (("folder", Folder, Folder.parent_id), ("file", File, File.folder_id)):
+                criteria = [model.user_id == user_id, model.is_deleted == False]
+                if subtree is not None:
+                    criteria.append(parent.in_(subtree))
+
+                hits.extend(await SearchService._matches(db, kind, model, user_id, query, terms, criteria, window))
+
+            # Mots entiers, découpés comme à l'indexation
+            words = list(tokenize(query))[:MAX_TERMS]
+            if content and words:
+                criteria = [File.user_id == user_id, File.is_deleted == False]
+                if subtree is not None:
+                    criteria.append(File.folder_id.in_(subtree))
+
+                found = {item.id for _, _, kind, item in hits if kind == "file"}
+                hits.extend(await SearchService._content_matches(db, words, criteria, window, found))
+
+        hits.sort(key=SearchService._sort_key)
+        page = hits[offset:offset + limit]
+
+        return {
+            "folders": [item for _, _, kind, item in page if kind == "folder"],
+            "files": [item for _, _, kind, item in page if kind == "file"],
+            "next_offset": offset + limit if len(hits) > offset + limit else None
+        }
+
+    @staticmethod
+    async def forget(db: AsyncSession, kind: str, item_ids):
+        """Retire de l'index n-grammes des éléments supprimés en lot (liste ou sous-requête d'identifiants)"""
+        if SearchService.uses_trigram_index(db.get_bind().dialect.name):
+            return
+
+        await db.execute(
+            delete(SearchGram).where(SearchGram.kind == kind, SearchGram.item_id.in_(item_ids)),
+            execution_options={"synchronize_session": False}
+        )
+
+
+def _index_name(connection, kind: str, target, replace: bool):
+    # Exécuté dans la transaction du flush : l'index reste cohérent avec la ligne indexée
+    if SearchService.uses_trigram_index(connection.dialect.name):
+        return
+
+    grams = SearchGram.__table__
+    if replace:
+        connection.execute(delete(grams).where(grams.c.kind == kind, grams.c.item_id == target.id))
+
+    connection.execute(insert(grams), [
+        {"kind": kind, "item_id": target.id, "gram": gram, "user_id": target.user_id}
+        for gram in SearchService.name_grams(target.name)
+    ])
+
+def _register(model, kind: str):
+    @event.listens_for(model, "after_insert")
+    def index_created(mapper, connection, target):
+        _index_name(connection, kind, target, replace=False)
+
+    @event.listens_for(model, "after_update")
+    def index_renamed(mapper, connection, target):
+        if inspect(target).attrs.name.history.has_changes():
+            _index_name(connection, kind, target, replace=True)
+
+_register(File, "file")
+_register(Folder, "folder")
@@ -1,5 +1,5 @@
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.share import Share
 from app.models.file import File
@@ -9,17 +9,17 @@ import datetime
 class ShareService:
     
     @staticmethod
-    async def create_share(db: Session, file_id: int, share_data: ShareCreate):
+    async def create_share(db: AsyncSession, file_id: int, share_data: ShareCreate):
         """
         Crée un lien de partage pour un fichier
         """
         
-        file = db.execute(
+        file = (await db.execute(
             select(File).where(
                 File.id == file_id,
                 File.is_deleted == False
             )
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         if not file:
             raise HTTPException(
@@ -38,13 +38,13 @@ class ShareService:
         )
         
         db.add(db_share)
-        db.commit()
-        db.refresh(db_share)
+        await db.commit()
+        await db.refresh(db_share)
         
         return db_share
     
     @staticmethod
-    async def get_user_shares(db: Session, user_id: int, file_id: int = None):
+    async def get_user_shares(db: AsyncSession, user_id: int, file_id: int = None):
         """
         Récupère les liens de partage de l'utilisateur
         """
@@ -53,40 +53,40 @@ class ShareService:
         if file_id:
             query = query.where(Share.file_id == file_id)
             
-        shares = db.execute(query).scalars().all()
+        shares = (await db.execute(query)).scalars().all()
         return shares
     
     @staticmethod
-    async def delete_share(db: Session, share_id: int, user_id: int):
+    async def delete_share(db: AsyncSession, share_id: int, user_id: int):
         """
         Supprime un lien de partage
         """
         
-        share = db.execute(
+        share = (await db.execute(
             select(Share)
             .join(File)
             .where(
                 Share.id == share_id,
                 File.user_id == user_id
             )
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         if not share:
             return False
             
-        db.delete(share)
-        db.commit()
+        await db.delete(share)
+        await db.commit()
         
         return True
     
     @staticmethod
-    async def get_share_by_token(db: Session, token: str):
+    async def get_share_by_token(db: AsyncSession, token: str):
         """
         Récupère un partage par son token
         """
-        share = db.execute(
+        share = (await db.execute(
             select(Share).where(Share.token == token)
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         if not share:
             return None
@@ -94,16 +94,16 @@ class ShareService:
         
         if share.expires_at and share.expires_at < datetime.datetime.now(datetime.timezone.utc):
             share.is_active = False
-            db.commit()
+            await db.commit()
             return None
             
         
-        file = db.execute(
+        file = (await db.execute(
             select(File).where(
                 File.id == share.file_id,
                 File.is_deleted == False
             )
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         if not file:
             return None
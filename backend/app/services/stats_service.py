@@ -0,0 +1,240 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import IntegrityError
+from app.models.file import File
+from app.models.folder import Folder
+from app.models.user import User
+from app.models.storage_stat import StorageStat
+from app.database import AsyncSessionLocal
+
+# Catégories de fichiers : type MIME principal (image/png -> image), "other" pour un type absent ou inconnu
+TOP_LEVEL_TYPES = {"application", "audio", "font", "image", "model", "text", "video"}
+FOLDER = "folder"
+
+def category(mime_type: str):
+    top_level = (mime_type or "").partition("/")[0].lower()
+    return top_level if top_level in TOP_LEVEL_TYPES else "other"
+
+class StatsDelta(dict):
+    """
+    Variations à appliquer aux statistiques : (catégorie, corbeille) -> [nombre, octets]
+    """
+
+    def add(self, category_name: str, trashed: bool, count: int, size: int = 0):
+        entry = self.setdefault((category_name, bool(trashed)), [0, 0])
+        entry[0] += count
+        entry[1] += size
+        return self
+
+    def negated(self):
+        result = StatsDelta()
+        for (category_name, trashed), (count, size) in self.items():
+            result.add(category_name, trashed, -count, -size)
+        return result
+
+    def moved(self, trashed: bool):
+        """Éléments comptés ici passés dans l'état trashed (mise en corbeille ou restauration)"""
+        result = StatsDelta()
+        for (category_name, _), (count, size) in self.items():
+            result.add(category_name, not trashed, -count, -size)
+            result.add(category_name, trashed, count, size)
+        return result
+
+
+class StatsService:
+    """
+    Statistiques de stockage par utilisateur (octets, fichiers et dossiers, par type et corbeille à part)
+    Lecture en O(1) : les services appliquent les variations dans la transaction de chaque modification,
+    la réconciliation périodique corrige une éventuelle dérive à partir des tables files et folders
+    """
+
+    @staticmethod
+    def file_delta(mime_type: str, size: int, trashed: bool = False, count: int = 1):
+        return StatsDelta().add(category(mime_type), trashed, count, count * size)
+
+    @staticmethod
+    def folder_delta(trashed: bool = False, count: int = 1):
+        return StatsDelta().add(FOLDER, trashed, count)
+
+    @staticmethod
+    async def count_files(db: AsyncSession, criteria):
+        """Fichiers correspondant aux critères, par type et état : à appeler avant de les modifier"""
+        rows = (await db.execute(
+            select(File.mime_type, File.is_deleted, func.count(File.id), func.coalesce(func.sum(File.size), 0))
+            .where(*criteria)
+            .group_by(File.mime_type, File.is_deleted)
+        )).all()
+
+        delta = StatsDelta()
+        for mime_type, is_deleted, count, size in rows:
+            delta.add(category(mime_type), is_deleted, count, size)
+        return delta
+
+    @staticmethod
+    async def count_folders(db: AsyncSession, criteria):
+        rows = (await db.execute(
+            select(Folder.is_deleted, func.count(Folder.id)).where(*criteria).group_by(Folder.is_deleted)
+        )).all()
+
+        delta = StatsDelta()
+        for is_deleted, count in rows:
+            delta.add(FOLDER, is_deleted, count)
+        return delta
+
+    @staticmethod
+    async def apply(db: AsyncSession, user_id: int, delta: StatsDelta):
+        """
+        Incréments atomiques côté base, ligne créée à la première utilisation d'une catégorie
+        Lignes verrouillées dans un ordre fixe (catégorie, état) : pas d'interblocage entre transactions concurrentes
+        """
+        for (category_name, trashed), (count, size) in sorted(delta.items()):
+            if not count and not size:
+                continue
+
+            key = (StorageStat.user_id == user_id, StorageStat.category == category_name, StorageStat.trashed == trashed)
+            increment = update(StorageStat).where(*key).values(
+                item_count=StorageStat.item_count + count,
+                bytes=StorageStat.bytes + size
+            ).execution_options(synchronize_session=False)
+
+            if (await db.execute(increment)).rowcount:
+                continue
+
+            try:
+                async with db.begin_nested():
+                    db.add(StorageStat(user_id=user_id, category=category_name, trashed=trashed, item_count=count, bytes=size))
+            except IntegrityError:
+                # Ligne créée entre-temps par une transaction concurrente
+                await db.execute(increment)
+
+    @staticmethod
+    async def get_stats(db: AsyncSession, user_id: int):
+        """Statistiques d'un utilisateur : lecture des quelques lignes de sa clé, sans agrégat sur ses fichiers"""
+        rows = (await db.execute(
+            select(StorageStat).where(StorageStat.user_id == user_id)
+        )).scalars().all()
+
+        stats = {
+            "file_count": 0,
+            "folder_count": 0,
+            "active_bytes": 0,
+            "trash_file_count": 0,
+            "trash_folder_count": 0,
+            "trash_bytes": 0,
+            "by_type": {}
+        }
+
+        for row in rows:
+            prefix = "trash_" if row.trashed else ""
+            if row.category == FOLDER:
+                stats[f"{prefix}folder_count"] += row.item_count
+                continue
+
+            stats[f"{prefix}file_count"] += row.item_count
+            stats["trash_bytes" if row.trashed else "active_bytes"] += row.bytes
+            if not row.trashed and row.item_count:
+                stats["by_type"][row.category] = {"file_count": row.item_count, "bytes": row.bytes}
+
+        return stats
+
+    @staticmethod
+    async def reconcile(db: AsyncSession, user_id: int, fix: bool = True):
+        """
+        Recalcule les statistiques et l'espace utilisé d'un utilisateur depuis files et folders
+        Renvoie les écarts constatés (corrigés si fix) ; la transaction reste à valider par l'appelant
+        """
+        # Verrous pris avant les agrégats, dans l'ordre des modifications (utilisateur puis statistiques) :
+        # une modification concurrente attend la correction puis applique sa variation par-dessus
+        user = (await db.execute(
+            select(User.storage_used).where(User.id == user_id).with_for_update()
+        )).one_or_none()
+        if user is None:
+            return []
+        storage_used = user.storage_used or 0
+
+        stored = {
+            (row.category, row.trashed): row
+            for row in (await db.execute(
+                select(StorageStat)
+                .where(StorageStat.user_id == user_id)
+                .order_by(StorageStat.category, StorageStat.trashed)
+                .with_for_update()
+            )).scalars().all()
+        }
+
+        actual = await StatsService.count_files(db, [File.user_id == user_id])
+        actual.update(await StatsService.count_folders(db, [Folder.user_id == user_id]))
+
+        corrections = []
+        for key in sorted(set(stored) | set(actual)):
+            row = stored.get(key)
+            current = [row.item_count, row.bytes] if row else [0, 0]
+            expected = actual.get(key, [0, 0])
+            if current == expected:
+                continue
+
+            category_name, trashed = key
+            corrections.append({
+                "user_id": user_id,
+                "category": category_name,
+                "trashed": trashed,
+                "stored": current,
+                "actual": expected
+            })
+            if not fix:
+                continue
+
+            if row is None:
+                db.add(StorageStat(user_id=user_id, category=category_name, trashed=trashed, item_count=expected[0], bytes=expected[1]))
+            elif expected == [0, 0]:
+                await db.delete(row)
+            else:
+                row.item_count, row.bytes = expected
+
+        # Espace compté dans le quota : fichiers actifs et en corbeille
+        used = sum(size for (category_name, _), (_, size) in actual.items() if category_name != FOLDER)
+        if storage_used != used:
+            corrections.append({"user_id": user_id, "category": "storage_used", "trashed": None, "stored": storage_used, "actual": used})
+            if fix:
+                await db.execute(
+                    update(User).where(User.id == user_id).values(storage_used=used),
+                    execution_options={"synchronize_session": False}
+                )
+
+        return corrections
+
+    @staticmethod
+    async def reconcile_all(user_id: int = None, fix: bool = True, batch_size: int = 100):
+        """
+        Réconcilie tous les utilisateurs (ou un seul), une transaction courte par utilisateur
+        Renvoie la liste des écarts constatés
+        """
+        corrections = []
+        last_id = 0
+
+        while True:
+            async with AsyncSessionLocal() as db:
+                query = select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+                if user_id is not None:
+                    query = query.where(User.id == user_id)
+                user_ids = (await db.execute(query)).scalars().all()
+
+            if not user_ids:
+                return corrections
+
+            for current_id in user_ids:
+                async with AsyncSessionLocal() as db:
+                    corrections.extend(await StatsService.reconcile(db, current_id, fix))
+                    if fix:
+                        await db.commit()
+
+            last_id = user_ids[-1]
+
+async def reconcile_storage_stats():
+    """Tâche périodique : corrige la dérive des statistiques et signale ce qui a été corrigé"""
+    corrections = await StatsService.reconcile_all()
+    for correction in corrections:
+        print(
+            f"Statistiques de stockage corrigées (utilisateur {correction['user_id']}, {correction['category']}"
+            f"{', corbeille' if correction['trashed'] else ''}) : {correction['stored']} -> {correction['actual']}"
+        )
@@ -1,112 +1,126 @@
 from fastapi import UploadFile, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from app.models.file import File
 from app.models.folder import Folder
+from app.models.user import User
 from app.config import settings
 from app.utils.security import create_folder_structure
+from app.utils.zipstream import iter_zip
+from app.utils.compression import member_compression
+from app.utils.executors import get_executor
+from app.services.tree_service import TreeService
+from app.services.stats_service import StatsService
+from app.services.blob_store import BlobStore
 import os
 import uuid
 import aiofiles
 import shutil
 import zipfile
 import io
+import hashlib
 from pathlib import Path
 import datetime
 
 class StorageService:
     @staticmethod
-    async def get_user_storage_info(db: Session, user_id: int):
+    async def write_upload_stream(file: UploadFile, destination: str, max_file_size: int, quota_remaining: int, chunk_size: int = None):
+        """
+        Copie un UploadFile sur disque par blocs de taille fixe en calculant son empreinte SHA-256
+        Vérifie la taille maximale et le quota au fil de l'eau, supprime le fichier partiel en cas d'échec
+        Renvoie (taille, empreinte, premiers octets) : le début sert à la détection du type sans relire le fichier
+        """
+        chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+        written = 0
+        digest = hashlib.sha256()
+        prefix = bytearray()
+
+        try:
+            async with aiofiles.open(destination, 'wb') as out:
+                while True:
+                    chunk = await file.read(chunk_size)
+                    if not chunk:
+                        break
+
+                    written += len(chunk)
+
+                    # Arrêt immédiat dès qu'une limite est franchie (pas d'écriture superflue)
+                    if written > max_file_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Le fichier est trop volumineux (max: {max_file_size // 1024 // 1024} Mo)"
+                        )
+                    if written > quota_remaining:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail="Quota de stockage dépassé"
+                        )
+
+                    digest.update(chunk)
+                    if len(prefix) < settings.MIME_SNIFF_BYTES:
+                        prefix += chunk[:settings.MIME_SNIFF_BYTES - len(prefix)]
+                    await out.write(chunk)
+        except BaseException:
+            if os.path.exists(destination):
+                os.remove(destination)
+            raise
+
+        return written, digest.hexdigest(), bytes(prefix)
+
+    @staticmethod
+    async def get_user_storage_info(db: AsyncSession, user_id: int):
         """
         Récupère les informations de stockage pour un utilisateur
+        Compteurs tenus à jour (table storage_stats) : coût constant quel que soit le nombre de fichiers
         """
-        storage_used_query = select(func.sum(File.size)).where(
-            File.user_id == user_id,
-            File.is_deleted == False
-        )
+        storage_used, storage_reserved, storage_quota = (await db.execute(
+            select(User.storage_used, User.storage_reserved, User.storage_quota).where(User.id == user_id)
+        )).one()
         
-        storage_used = db.execute(storage_used_query).scalar() or 0
-        
-        file_count_query = select(func.count(File.id)).where(
-            File.user_id == user_id,
-            File.is_deleted == False
-        )
-        
-        file_count = db.execute(file_count_query).scalar() or 0
-        
-        folder_count_query = select(func.count(Folder.id)).where(
-            Folder.user_id == user_id,
-            Folder.is_deleted == False
-        )
-        
-        folder_count = db.execute(folder_count_query).scalar() or 0
-        
-        user_query = select(User.storage_quota).where(User.id == user_id)
-        storage_quota = db.execute(user_query).scalar_one() or settings.STORAGE_QUOTA
+        storage_used = storage_used or 0
+        storage_quota = storage_quota or settings.STORAGE_QUOTA
         
         return {
             "storage_used": storage_used,
+            "storage_reserved": storage_reserved,
             "storage_quota": storage_quota,
-            "file_count": file_count,
-            "folder_count": folder_count,
-            "percentage_used": (storage_used / storage_quota) * 100 if storage_quota > 0 else 0
+            "percentage_used": (storage_used / storage_quota) * 100 if storage_quota > 0 else 0,
+            **await StatsService.get_stats(db, user_id)
         }
     
     @staticmethod
-    async def prepare_folder_download(db: Session, folder_id: int, user_id: int):
+    async def prepare_folder_download(db: AsyncSession, folder_id: int, user_id: int):
         """
         Prépare les données pour le téléchargement d'un dossier
         Retourne une structure récursive avec tous les fichiers et sous-dossiers
         """
-        folder = db.execute(
+        folder = (await db.execute(
             select(Folder).where(
                 Folder.id == folder_id,
                 Folder.user_id == user_id,
                 Folder.is_deleted == False
             )
-        ).scalar_one_or_none()
+        )).scalar_one_or_none()
         
         if not folder:
             return None
         
-        def get_folder_contents(folder_id, path=""):
-            result = {"files": {}, "folders": {}}
-            
-            files = db.execute(
-                select(File).where(
-                    File.folder_id == folder_id,
-                    File.is_deleted == False
-                )
-            ).scalars().all()
+        # Sous-arbre actif chargé en nombre constant de requêtes
+        tree = await TreeService.load_subtree(db, folder_id, folder_deleted=False, file_deleted=False)
+        contents = {"files": {}, "folders": {}}
+        
+        for current_folder_id, path, files in tree.walk():
+            if current_folder_id != folder_id:
+                contents["folders"][path] = tree.folders[current_folder_id].name
             
             for file in files:
-                result["files"][os.path.join(path, file.name)] = {
+                contents["files"][os.path.join(path, file.name)] = {
                     "id": file.id,
                     "name": file.name,
-                    "path": file.storage_path,
+                    "path": BlobStore.resolve_path(file.storage_path, file.content_hash),
                     "size": file.size,
                     "mime_type": file.mime_type
                 }
-            
-            subfolders = db.execute(
-                select(Folder).where(
-                    Folder.parent_id == folder_id,
-                    Folder.is_deleted == False
-                )
-            ).scalars().all()
-            
-            for subfolder in subfolders:
-                subfolder_path = os.path.join(path, subfolder.name)
-                result["folders"][subfolder_path] = subfolder.name
-                
-                subfolder_contents = get_folder_contents(subfolder.id, subfolder_path)
-                
-                result["files"].update(subfolder_contents["files"])
-                result["folders"].update(subfolder_contents["folders"])
-                
-            return result
-        
-        contents = get_folder_contents(folder_id)
         
         return {
             "id": folder.id,
@@ -115,45 +129,42 @@ class StorageService:
         }
     
     @staticmethod
-    async def create_zip_from_folder(folder_data):
+    def zip_options():
         """
-        Crée un fichier ZIP à partir des données de dossier
+        Paramètres communs des archives de dossiers (pool de compression parallèle si configuré)
         """
-        zip_io = io.BytesIO()
+        options = {"chunk_size": settings.UPLOAD_CHUNK_SIZE}
         
-        with zipfile.ZipFile(zip_io, mode='w', compression=zipfile.ZIP_DEFLATED) as zip_file:
-            for folder_path, folder_name in folder_data["contents"]["folders"].items():
-                zip_file.writestr(folder_path + "/", "")
-            
-            for file_path, file_info in folder_data["contents"]["files"].items():
-                try:
-                    zip_file.write(file_info["path"], arcname=file_path)
-                except Exception as e:
-                    print(f"Erreur lors de l'ajout du fichier {file_path}: {str(e)}")
+        if settings.ZIP_COMPRESSION_WORKERS > 0:
+            options["executor"] = get_executor(
+                "zip-compression",
+                settings.ZIP_COMPRESSION_WORKERS,
+                settings.ZIP_COMPRESSION_EXECUTOR
+            )
+            options["parallel_max_size"] = settings.ZIP_PARALLEL_MAX_MEMBER_SIZE
+            options["lookahead"] = settings.ZIP_COMPRESSION_WORKERS * 2
         
-        zip_io.seek(0)
-        return zip_io
+        return options
     
     @staticmethod
-    async def cleanup_storage():
+    def create_zip_from_folder(folder_data, compression: str = "auto"):
         """
-        Nettoie les fichiers orphelins du stockage
-        À exécuter périodiquement
+        Crée un flux ZIP à partir des données de dossier
+        Générateur à mémoire constante : à passer tel quel à une StreamingResponse
         """
-        storage_files = []
-        for root, _, files in os.walk(settings.UPLOAD_DIR):
-            for file in files:
-                storage_files.append(os.path.join(root, file))
-                
-        db_files = db.execute(select(File.storage_path)).scalars().all()
-        
-        orphaned_files = set(storage_files) - set(db_files)
+        files = []
+        for file_path, file_info in folder_data["contents"]["files"].items():
+            method, level = member_compression(file_info["mime_type"], compression)
+            files.append({
+                "arcname": file_path,
+                "path": file_info["path"],
+                "size": file_info["size"],
+                "method": method,
+                "level": level
+            })
         
-        for file_path in orphaned_files:
-            try:
-                os.remove(file_path)
-                print(f"Fichier orphelin supprimé: {file_path}")
-            except Exception as e:
-                print(f"Erreur lors de la suppression du fichier {file_path}: {str(e)}")
-                
-        return len(orphaned_files)
\ No newline at end of file
+        return iter_zip(
+            files,
+            directories=list(folder_data["contents"]["folders"]),
+            **StorageService.zip_options()
+        )
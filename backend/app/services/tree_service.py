@@ -0,0 +1,123 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.models.folder import Folder
+from app.models.file import File
+from collections import defaultdict
+import os
+import sqlite3
+
+class FolderTree:
+    """
+    Sous-arbre de dossiers chargé en mémoire (racine exclue des descendants)
+    """
+
+    def __init__(self, root_id: int, folders, files):
+        self.root_id = root_id
+        self.folders = {folder.id: folder for folder in folders}
+        self.files = list(files)
+
+        self.children = defaultdict(list)
+        for folder in folders:
+            self.children[folder.parent_id].append(folder)
+
+        self.files_by_folder = defaultdict(list)
+        for file in self.files:
+            self.files_by_folder[file.folder_id].append(file)
+
+    @property
+    def folder_ids(self):
+        """Identifiants de la racine et de tous les descendants chargés"""
+        return [self.root_id, *self.folders]
+
+    @property
+    def descendants(self):
+        return list(self.folders.values())
+
+    def walk(self):
+        """Parcours en profondeur : (id dossier, chemin relatif à la racine, fichiers du dossier)"""
+        stack = [(self.root_id, "")]
+
+        while stack:
+            folder_id, path = stack.pop()
+            yield folder_id, path, self.files_by_folder.get(folder_id, [])
+
+            for child in reversed(self.children.get(folder_id, [])):
+                stack.append((child.id, os.path.join(path, str(child.name))))
+
+
+class TreeService:
+    """
+    Chargement d'arborescences en nombre constant de requêtes (CTE récursive WITH RECURSIVE)
+    """
+
+    @staticmethod
+    def _supports_recursive_cte(db: AsyncSession):
+        # PostgreSQL et SQLite >= 3.8.3 ; parcours niveau par niveau sinon
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            return sqlite3.sqlite_version_info >= (3, 8, 3)
+        return dialect in ("postgresql", "mysql", "mariadb", "mssql", "oracle")
+
+    @staticmethod
+    def subtree_ids_query(root_id: int, deleted: bool = None):
+        """
+        Requête des identifiants du dossier racine et de ses descendants
+        deleted filtre les descendants (la descente s'arrête aux dossiers qui ne correspondent pas)
+        """
+        tree = select(Folder.id).where(Folder.id == root_id).cte("subtree", recursive=True)
+
+        children = select(Folder.id).join(tree, Folder.parent_id == tree.c.id)
+        if deleted is not None:
+            children = children.where(Folder.is_deleted == deleted)
+
+        tree = tree.union_all(children)
+        return select(tree.c.id)
+
+    @staticmethod
+    async def _descendant_ids_by_level(db: AsyncSession, root_id: int, deleted: bool = None):
+        # Repli portable : une requête par niveau de profondeur
+        ids = []
+        level = [root_id]
+
+        while level:
+            query = select(Folder.id).where(Folder.parent_id.in_(level))
+            if deleted is not None:
+                query = query.where(Folder.is_deleted == deleted)
+
+            level = (await db.execute(query)).scalars().all()
+            ids.extend(level)
+
+        return ids
+
+    @staticmethod
+    async def subtree_ids(db: AsyncSession, root_id: int, deleted: bool = None):
+        """
+        Critère utilisable dans in_() : sous-requête évaluée par la base (CTE) ou liste d'identifiants (repli)
+        Les identifiants ne transitent pas par Python quand la CTE est disponible
+        """
+        if TreeService._supports_recursive_cte(db):
+            return TreeService.subtree_ids_query(root_id, deleted)
+
+        return [root_id, *await TreeService._descendant_ids_by_level(db, root_id, deleted)]
+
+    @staticmethod
+    async def load_subtree(db: AsyncSession, root_id: int, folder_deleted: bool = None, file_deleted: bool = None, with_files: bool = True):
+        """
+        Charge tous les dossiers descendants et leurs fichiers en deux requêtes
+        folder_deleted / file_deleted : filtre sur l'état corbeille (None = tous)
+        """
+        ids_query = await TreeService.subtree_ids(db, root_id, folder_deleted)
+
+        folders = (await db.execute(
+            select(Folder).where(Folder.id.in_(ids_query), Folder.id != root_id).order_by(Folder.id)
+        )).scalars().all()
+
+        files = []
+        if with_files:
+            query = select(File).where(File.folder_id.in_(ids_query))
+            if file_deleted is not None:
+                query = query.where(File.is_deleted == file_deleted)
+
+            files = (await db.execute(query.order_by(File.id))).scalars().all()
+
+        return FolderTree(root_id, folders, files)
@@ -0,0 +1,350 @@
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, update
+from starlette.concurrency import run_in_threadpool
+from app.models.upload_session import UploadSession
+from app.utils.user_cache import CurrentUser
+from app.schemas.file import UploadSessionCreate, UploadSessionResponse
+from app.services.file_service import FileService
+from app.services.blob_store import BlobStore
+from app.services.quota_service import QuotaService
+from app.database import AsyncSessionLocal
+from app.config import settings
+import os
+import uuid
+import shutil
+import aiofiles
+import datetime
+import time
+
+class UploadSessionService:
+
+    @staticmethod
+    def _sessions_dir():
+        return os.path.join(settings.UPLOAD_DIR, ".sessions")
+
+    @staticmethod
+    def _session_dir(session_id: str):
+        return os.path.join(UploadSessionService._sessions_dir(), session_id)
+
+    @staticmethod
+    def _expiry():
+        return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+
+    @staticmethod
+    def _expected_chunk_size(upload: UploadSession, index: int):
+        # Seul le dernier morceau peut être plus court
+        if index == upload.total_chunks - 1:
+            return upload.total_size - index * upload.chunk_size
+        return upload.chunk_size
+
+    @staticmethod
+    def _received_chunks(session_id: str):
+        session_dir = UploadSessionService._session_dir(session_id)
+        if not os.path.isdir(session_dir):
+            return []
+
+        # Les écritures en cours portent un suffixe, seuls les morceaux complets sont comptés
+        return sorted(int(name) for name in os.listdir(session_dir) if name.isdigit())
+
+    @staticmethod
+    def _to_response(upload: UploadSession):
+        received = UploadSessionService._received_chunks(upload.id)
+        received_set = set(received)
+
+        return UploadSessionResponse(
+            id=upload.id,
+            filename=upload.filename,
+            size=upload.total_size,
+            folder_id=upload.folder_id,
+            chunk_size=upload.chunk_size,
+            total_chunks=upload.total_chunks,
+            received_chunks=received,
+            missing_chunks=[i for i in range(upload.total_chunks) if i not in received_set],
+            expires_at=upload.expires_at
+        )
+
+    @staticmethod
+    async def create_session(db: AsyncSession, user: CurrentUser, session_data: UploadSessionCreate):
+        """
+        Ouvre une session d'upload reprenable après validation taille, quota et dossier
+        """
+        FileService._check_file_size(session_data.size)
+        await FileService._check_target_folder(db, user.id, session_data.folder_id)
+
+        chunk_size = session_data.chunk_size or settings.UPLOAD_SESSION_CHUNK_SIZE
+        if not settings.UPLOAD_SESSION_MIN_CHUNK_SIZE <= chunk_size <= settings.UPLOAD_SESSION_MAX_CHUNK_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Taille de morceau invalide (entre {settings.UPLOAD_SESSION_MIN_CHUNK_SIZE} et {settings.UPLOAD_SESSION_MAX_CHUNK_SIZE} octets)"
+            )
+
+        # Un fichier vide reste composé d'un morceau (vide) pour garder un protocole uniforme
+        total_chunks = max(1, -(-session_data.size // chunk_size))
+
+        upload = UploadSession(
+            id=str(uuid.uuid4()),
+            user_id=user.id,
+            folder_id=session_data.folder_id,
+            filename=session_data.filename,
+            total_size=session_data.size,
+            chunk_size=chunk_size,
+            total_chunks=total_chunks,
+            expires_at=UploadSessionService._expiry()
+        )
+
+        # Quota réservé pour toute la durée de la session, sous le même identifiant et avec la même expiration
+        await QuotaService.reserve(db, user.id, upload.total_size, reservation_id=upload.id, expires_at=upload.expires_at)
+
+        os.makedirs(UploadSessionService._session_dir(upload.id), exist_ok=True)
+
+        db.add(upload)
+        await db.commit()
+        await db.refresh(upload)
+
+        return UploadSessionService._to_response(upload)
+
+    @staticmethod
+    async def get_session(db: AsyncSession, session_id: str, user_id: int):
+        """
+        Récupère une session active appartenant à l'utilisateur
+        """
+        upload = (await db.execute(
+            select(UploadSession).where(
+                UploadSession.id == session_id,
+                UploadSession.user_id == user_id,
+                UploadSession.expires_at > datetime.datetime.now(datetime.timezone.utc)
+            )
+        )).scalar_one_or_none()
+
+        return upload
+
+    @staticmethod
+    async def get_session_status(db: AsyncSession, session_id: str, user_id: int):
+        upload = await UploadSessionService.get_session(db, session_id, user_id)
+        if not upload:
+            return None
+
+        return UploadSessionService._to_response(upload)
+
+    @staticmethod
+    async def write_chunk(db: AsyncSession, session_id: str, user_id: int, index: int, stream):
+        """
+        Écrit un morceau reçu en flux ; les morceaux peuvent arriver dans le désordre ou en parallèle
+        """
+        upload = await UploadSessionService.get_session(db, session_id, user_id)
+        if not upload:
+            return None
+
+        if not 0 <= index < upload.total_chunks:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Index de morceau invalide (0 à {upload.total_chunks - 1})"
+            )
+
+        expected_size = UploadSessionService._expected_chunk_size(upload, index)
+        session_dir = UploadSessionService._session_dir(upload.id)
+        os.makedirs(session_dir, exist_ok=True)
+
+        # Fichier temporaire unique puis renommage atomique : un envoi interrompu ne laisse pas de morceau partiel
+        chunk_path = os.path.join(session_dir, str(index))
+        tmp_path = f"{chunk_path}.{uuid.uuid4().hex}.part"
+        written = 0
+
+        try:
+            async with aiofiles.open(tmp_path, 'wb') as out:
+                async for data in stream:
+                    written += len(data)
+                    if written > expected_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Le morceau {index} dépasse la taille attendue ({expected_size} octets)"
+                        )
+                    await out.write(data)
+
+            if written != expected_size:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Le morceau {index} est incomplet ({written}/{expected_size} octets)"
+                )
+
+            try:
+                os.replace(tmp_path, chunk_path)
+            except FileNotFoundError:
+                # Répertoire supprimé pendant l'envoi : session validée ou abandonnée entre-temps
+                return None
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Activité récente : la session et sa réservation de quota restent ouvertes
+        # UPDATE ciblé : la session a pu être validée ou abandonnée pendant l'envoi (ligne supprimée)
+        expires_at = UploadSessionService._expiry()
+        result = await db.execute(
+            update(UploadSession)
+            .where(UploadSession.id == upload.id)
+            .values(expires_at=expires_at),
+            execution_options={"synchronize_session": False}
+        )
+        if result.rowcount != 1:
+            # Morceau orphelin : répertoire nettoyé par le ramasse-miettes au-delà du TTL
+            await db.rollback()
+            return None
+
+        await QuotaService.extend(db, upload.id, expires_at)
+        await db.commit()
+
+        return {"index": index, "size": written}
+
+    @staticmethod
+    def _assemble_chunks(session_id: str, total_chunks: int, destination: str):
+        session_dir = UploadSessionService._session_dir(session_id)
+        digest = BlobStore.new_digest()
+        prefix = bytearray()
+
+        # Concaténation par blocs avec hachage au passage (adressage par contenu) et début conservé pour le type MIME
+        try:
+            with open(destination, 'wb') as out:
+                for index in range(total_chunks):
+                    with open(os.path.join(session_dir, str(index)), 'rb') as chunk:
+                        for data in iter(lambda: chunk.read(settings.UPLOAD_CHUNK_SIZE), b""):
+                            digest.update(data)
+                            if len(prefix) < settings.MIME_SNIFF_BYTES:
+                                prefix += data[:settings.MIME_SNIFF_BYTES - len(prefix)]
+                            out.write(data)
+        except BaseException:
+            if os.path.exists(destination):
+                os.remove(destination)
+            raise
+
+        return digest.hexdigest(), bytes(prefix)
+
+    @staticmethod
+    async def _claim_session(db: AsyncSession, session_id: str, user_id: int):
+        """
+        Retire la session de la base de façon atomique (DELETE ... RETURNING) : parmi des validations
+        ou abandons simultanés, une seule requête l'obtient. Renvoie ses colonnes, None si déjà prise
+        """
+        columns = UploadSession.__table__.columns
+        row = (await db.execute(
+            delete(UploadSession)
+            .where(UploadSession.id == session_id, UploadSession.user_id == user_id)
+            .returning(*columns)
+            .execution_options(synchronize_session=False)
+        )).mappings().one_or_none()
+
+        return dict(row) if row else None
+
+    @staticmethod
+    async def commit_session(db: AsyncSession, session_id: str, user: CurrentUser):
+        """
+        Assemble les morceaux dans le stockage par contenu et crée le fichier comme un upload classique
+        """
+        upload = await UploadSessionService.get_session(db, session_id, user.id)
+        if not upload:
+            return None
+
+        received = UploadSessionService._received_chunks(upload.id)
+        if len(received) != upload.total_chunks:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload incomplet : {upload.total_chunks - len(received)} morceau(x) manquant(s)"
+            )
+
+        # Revalidation du dossier (il a pu être supprimé depuis l'ouverture) ; le quota est déjà réservé
+        await FileService._check_target_folder(db, user.id, upload.folder_id)
+
+        # Session prise et validée avant l'assemblage : une validation simultanée ne crée pas de second fichier
+        claimed = await UploadSessionService._claim_session(db, session_id, user.id)
+        if not claimed:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Session d'upload déjà validée ou annulée"
+            )
+        db.expunge(upload)
+        await db.commit()
+
+        temp_path = BlobStore.new_temp_path()
+        try:
+            digest, prefix = await run_in_threadpool(UploadSessionService._assemble_chunks, session_id, claimed["total_chunks"], temp_path)
+
+            result = await FileService._create_file_record(
+                db, user, claimed["filename"], claimed["total_size"], temp_path, digest, claimed["folder_id"], prefix, reservation_id=session_id
+            )
+        except BaseException:
+            # Échec : session rendue (morceaux et réservation intacts) pour permettre une nouvelle validation
+            await db.rollback()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            db.add(UploadSession(**claimed))
+            await db.commit()
+            raise
+
+        shutil.rmtree(UploadSessionService._session_dir(session_id), ignore_errors=True)
+
+        return result
+
+    @staticmethod
+    async def abort_session(db: AsyncSession, session_id: str, user_id: int):
+        """
+        Abandonne une session et libère ses morceaux et son quota réservé
+        """
+        upload = await UploadSessionService.get_session(db, session_id, user_id)
+        if not upload:
+            return False
+
+        # Session déjà prise par une validation en cours : sa réservation ne doit pas être libérée
+        if not await UploadSessionService._claim_session(db, session_id, user_id):
+            await db.rollback()
+            return False
+
+        await QuotaService.release(db, [session_id])
+        await db.commit()
+
+        shutil.rmtree(UploadSessionService._session_dir(session_id), ignore_errors=True)
+        return True
+
+    @staticmethod
+    def _remove_session_dirs(expired_ids, active_ids):
+        for session_id in expired_ids:
+            shutil.rmtree(UploadSessionService._session_dir(session_id), ignore_errors=True)
+
+        # Répertoires sans session en base (crash entre création et commit) au-delà du TTL
+        sessions_dir = UploadSessionService._sessions_dir()
+        if os.path.isdir(sessions_dir):
+            cutoff = time.time() - settings.UPLOAD_SESSION_TTL_SECONDS
+
+            with os.scandir(sessions_dir) as entries:
+                for entry in entries:
+                    if entry.name not in active_ids and entry.stat().st_mtime < cutoff:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+
+    @staticmethod
+    async def purge_expired_sessions(db: AsyncSession):
+        """
+        Supprime les sessions expirées et les répertoires de morceaux orphelins
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        expired_ids = (await db.execute(
+            select(UploadSession.id).where(UploadSession.expires_at <= now)
+        )).scalars().all()
+
+        if expired_ids:
+            await QuotaService.release(db, expired_ids)
+            await db.execute(delete(UploadSession).where(UploadSession.id.in_(expired_ids)))
+            await db.commit()
+
+        active_ids = set((await db.execute(select(UploadSession.id))).scalars().all())
+
+        # Suppressions disque hors de la boucle d'événements
+        await run_in_threadpool(UploadSessionService._remove_session_dirs, expired_ids, active_ids)
+
+        return len(expired_ids)
+
+async def purge_expired_upload_sessions():
+    """Tâche périodique : session dédiée hors requête"""
+    async with AsyncSessionLocal() as db:
+        await UploadSessionService.purge_expired_sessions(db)
@@ -1,15 +1,16 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from app.schemas.user import UserUpdate
 from app.models.user import User
 from app.utils.security import hash_password, verify_password
+from app.utils.user_cache import user_cache
 
 class UserService:
     
     @staticmethod
-    def get_user_by_id(db: Session, user_id: int):
+    async def get_user_by_id(db: AsyncSession, user_id: int):
         """Obtenir un utilisateur par ID"""
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -18,20 +19,25 @@ class UserService:
         return user
     
     @staticmethod
-    def update_user(db: Session, user_id: int, user_data: UserUpdate):
+    async def update_user(db: AsyncSession, user_id: int, user_data: UserUpdate):
         """Mettre à jour les informations utilisateur"""
-        user = UserService.get_user_by_id(db, user_id)
+        user = await UserService.get_user_by_id(db, user_id)
         
         if user_data.full_name is not None:
             user.full_name = user_data.full_name
         
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
+        
+        user_cache.invalidate(user.id)
         return user
     
     @staticmethod
-    def change_password(db: Session, user: User, current_password: str, new_password: str):
+    async def change_password(db: AsyncSession, user_id: int, current_password: str, new_password: str):
         """Changer le mot de passe utilisateur"""
+        # Chargement en base : l'utilisateur authentifié est une projection sans mot de passe, en lecture seule
+        user = await UserService.get_user_by_id(db, user_id)
+        
         if not user.hashed_password:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -45,12 +51,16 @@ class UserService:
             )
             
         user.hashed_password = hash_password(new_password)
-        db.commit()
+        await db.commit()
+        
+        user_cache.invalidate(user.id)
         return True
     
     @staticmethod
-    def disconnect_oauth(db: Session, user: User, provider: str):
+    async def disconnect_oauth(db: AsyncSession, user_id: int, provider: str):
         """Déconnecter un fournisseur OAuth"""
+        user = await UserService.get_user_by_id(db, user_id)
+        
         if user.oauth_provider != provider:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -66,6 +76,8 @@ class UserService:
         user.oauth_provider = None
         user.oauth_provider_id = None
         
-        db.commit()
-        db.refresh(user)
-        return {"message": f"Déconnecté avec succès de {provider}"}
\ No newline at end of file
+        await db.commit()
+        await db.refresh(user)
+        
+        user_cache.invalidate(user.id)
+        return {"message": f"Déconnecté avec succès de {provider}"}
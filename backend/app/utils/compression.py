@@ -0,0 +1,73 @@
+from app.utils.zipstream import ZIP_STORED, ZIP_DEFLATED
+
+# Niveaux DEFLATE par mode demandé ; "store" désactive toute compression
+COMPRESSION_MODES = {
+    "auto": 6,
+    "fast": 1,
+    "best": 9,
+    "store": None,
+}
+
+# Formats déjà compressés : DEFLATE coûte du CPU sans réduire la taille
+INCOMPRESSIBLE_PREFIXES = (
+    "image/",
+    "video/",
+    "audio/",
+    "application/vnd.openxmlformats-officedocument.",
+    "application/vnd.oasis.opendocument.",
+)
+
+# Exceptions aux préfixes ci-dessus : formats non compressés qui gagnent à être DEFLATE
+COMPRESSIBLE_TYPES = {
+    "image/svg+xml",
+    "image/bmp",
+    "image/x-ms-bmp",
+    "image/tiff",
+    "image/x-icon",
+    "image/vnd.microsoft.icon",
+    "audio/wav",
+    "audio/x-wav",
+    "audio/vnd.wave",
+}
+
+INCOMPRESSIBLE_TYPES = {
+    "application/zip",
+    "application/x-zip-compressed",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/x-lzma",
+    "application/zstd",
+    "application/x-zstd",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/vnd.rar",
+    "application/java-archive",
+    "application/epub+zip",
+    "application/vnd.android.package-archive",
+    "application/x-compress",
+}
+
+def is_compressible(mime_type: str) -> bool:
+    """Indique si un type MIME a des chances de se compresser"""
+    if not mime_type:
+        return True
+    
+    mime_type = mime_type.split(";")[0].strip().lower()
+    
+    if mime_type in COMPRESSIBLE_TYPES:
+        return True
+    if mime_type in INCOMPRESSIBLE_TYPES:
+        return False
+    
+    return not mime_type.startswith(INCOMPRESSIBLE_PREFIXES)
+
+def member_compression(mime_type: str, mode: str = "auto"):
+    """Retourne (méthode, niveau) ZIP pour un membre selon son type MIME et le mode demandé"""
+    level = COMPRESSION_MODES[mode]
+    
+    if level is None or not is_compressible(mime_type):
+        return ZIP_STORED, 0
+    
+    return ZIP_DEFLATED, level
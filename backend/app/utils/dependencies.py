@@ -1,19 +1,21 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from jose import JWTError
-from app.database import get_db
+from app.database import get_async_db
 from app.utils.security import decode_access_token
+from app.utils.user_cache import user_cache, CurrentUser
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
     """
     Récupère l'utilisateur actuellement authentifié à partir du token JWT
+    Projection en lecture seule : les services qui modifient l'utilisateur le rechargent par son id
     """
     from app.models.user import User
     
@@ -28,21 +30,29 @@ async def get_current_user(
     if payload is None:
         raise credentials_exception
     
-    user_id: int = payload.get("sub")
-    
-    if user_id is None:
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
         raise credentials_exception
     
-    user = db.execute(select(User).where(User.id == user_id)).scalar_one_or_none()
+    # Projection mise en cache par (utilisateur, token) : pas de requête users sur chaque appel
+    user = user_cache.get(user_id, token)
+    if user is not None:
+        return user
+    
+    db_user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
     
-    if user is None:
+    if db_user is None:
         raise credentials_exception
     
+    user = CurrentUser.from_user(db_user)
+    user_cache.set(user_id, token, user)
+    
     return user
 
 async def get_current_active_user(
-    current_user = Depends(get_current_user)
-):
+    current_user: CurrentUser = Depends(get_current_user)
+) -> CurrentUser:
     """
     Vérifie que l'utilisateur est actif
     """
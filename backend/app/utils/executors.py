@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+import threading
+
+# Pools partagés par nom, créés à la première utilisation et fermés à l'arrêt de l'application
+_executors = {}
+_lock = threading.Lock()
+
+def get_executor(name: str, workers: int, kind: str = "thread"):
+    """Retourne le pool nommé (thread ou process), en le créant si nécessaire"""
+    with _lock:
+        executor = _executors.get(name)
+        if executor is None:
+            if kind == "process":
+                # spawn : pas de fork d'un processus serveur multi-thread
+                executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+            _executors[name] = executor
+        return executor
+
+def shutdown_executors(wait: bool = True):
+    """Ferme tous les pools partagés"""
+    with _lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    
+    for executor in executors:
+        executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,228 @@
+"""
+Envoi de fichiers stockés avec requêtes partielles et conditionnelles
+
+- ETag fort dérivé des métadonnées stockées (empreinte SHA-256 du blob, sinon taille et date de modification)
+- If-None-Match / If-Modified-Since : 304 sans corps
+- Range : 206 pour une plage (Content-Range) ou plusieurs (multipart/byteranges),
+  416 si aucune plage n'est satisfiable ; If-Range invalide la plage si le contenu a changé
+
+Mode d'envoi (DOWNLOAD_MODE) :
+- stream : corps lu par blocs, mémoire bornée quelle que soit la taille du fichier ou de la plage
+- x-accel-redirect / x-sendfile : l'API ne fait que le contrôle d'accès, le proxy (nginx,
+  Apache, lighttpd) envoie le fichier sans copie et traite lui-même Range et requêtes conditionnelles
+
+Pas d'envoi sans copie depuis l'API : la socket appartient au serveur ASGI (uvicorn ne propose pas
+l'extension http.response.zerocopysend), le mode x-accel-redirect en tient lieu.
+"""
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from email.utils import format_datetime, parsedate_to_datetime
+from urllib.parse import quote
+from app.config import settings
+import aiofiles
+import datetime
+import os
+import secrets
+
+# Au-delà, la requête est servie en entier (RFC 9110 : un serveur peut ignorer Range)
+MAX_RANGES = 16
+
+def _content_disposition(filename: str):
+    # Nom non ASCII : forme encodée RFC 5987 (comme le FileResponse de Starlette)
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+def _etag(stat, digest: str = None):
+    if digest:
+        return f'"{digest}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+def _parse_http_date(value: str):
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    # Date sans fuseau : invalide en HTTP, ignorée
+    return date if date.tzinfo else None
+
+def _etag_matches(header: str, etag: str):
+    # Comparaison faible (If-None-Match) : le préfixe W/ est ignoré
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+def _not_modified(request: Request, etag: str, last_modified: datetime.datetime):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match prime : If-Modified-Since est alors ignoré
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = _parse_http_date(request.headers.get("if-modified-since", ""))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+def _range_applies(request: Request, etag: str, last_modified: datetime.datetime):
+    """If-Range : la plage n'est servie que si le contenu n'a pas changé (comparaison forte)"""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+
+    if_range = if_range.strip()
+    if if_range.startswith(('"', 'W/"')):
+        return if_range == etag
+
+    date = _parse_http_date(if_range)
+    return date is not None and last_modified == date
+
+def parse_range(header: str, size: int):
+    """
+    Plages demandées (début, fin incluse), triées et fusionnées si elles se chevauchent ou se touchent
+    None : en-tête invalide ou trop de plages (servir le fichier entier) ; [] : aucune plage satisfiable (416)
+    """
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs.strip():
+        return None
+
+    ranges = []
+    for spec in specs.split(","):
+        first, dash, last = spec.strip().partition("-")
+        if not dash:
+            return None
+
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if last and end < start:
+                    return None
+            else:
+                # Suffixe : les n derniers octets
+                length = int(last)
+                if length <= 0:
+                    continue
+                start, end = max(size - length, 0), size - 1
+        except ValueError:
+            return None
+
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    if len(merged) > MAX_RANGES:
+        return None
+    return merged
+
+async def _read_range(path: str, start: int, length: int):
+    chunk_size = settings.UPLOAD_CHUNK_SIZE
+
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+async def _read_segments(path: str, segments):
+    for segment in segments:
+        if isinstance(segment, bytes):
+            yield segment
+        else:
+            async for chunk in _read_range(path, *segment):
+                yield chunk
+
+def _offload_header(path: str, mode: str):
+    """En-tête de délégation au proxy, None si le fichier est hors de UPLOAD_DIR (alors servi par l'API)"""
+    if mode == "x-sendfile":
+        return "x-sendfile", os.path.realpath(path)
+
+    upload_dir = os.path.realpath(settings.UPLOAD_DIR)
+    relative = os.path.relpath(os.path.realpath(path), upload_dir)
+    if relative.split(os.sep, 1)[0] == os.pardir:
+        return None
+
+    # URI d'une location interne nginx pointant sur le volume des uploads
+    prefix = settings.DOWNLOAD_ACCEL_PREFIX.rstrip("/")
+    return "x-accel-redirect", f"{prefix}/{quote(relative.replace(os.sep, '/'))}"
+
+def file_response(request: Request, path: str, media_type: str, cache_control: str, filename: str = None, digest: str = None):
+    """
+    Réponse GET d'un fichier stocké : 200, 206, 304 ou 416 selon les en-têtes de la requête
+    filename : téléchargement (Content-Disposition: attachment), sinon affichage dans le navigateur
+    digest : empreinte du contenu, ETag stable même si le fichier physique est recopié
+    """
+    media_type = media_type or "application/octet-stream"
+    mode = settings.DOWNLOAD_MODE
+
+    if mode in ("x-accel-redirect", "x-sendfile"):
+        offload = _offload_header(path, mode)
+        if offload:
+            # Type, disposition et cache sont repris par le proxy ; Range, ETag et 304 sont traités par lui
+            name, value = offload
+            headers = {name: value, "cache-control": cache_control}
+            if filename:
+                headers["content-disposition"] = _content_disposition(filename)
+            return Response(media_type=media_type, headers=headers)
+
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = _etag(stat, digest)
+    last_modified = datetime.datetime.fromtimestamp(int(stat.st_mtime), datetime.timezone.utc)
+
+    headers = {
+        "etag": etag,
+        "last-modified": format_datetime(last_modified, usegmt=True),
+        "cache-control": cache_control,
+        "accept-ranges": "bytes",
+    }
+
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    if filename:
+        headers["content-disposition"] = _content_disposition(filename)
+
+    range_header = request.headers.get("range")
+    ranges = None
+    if range_header and _range_applies(request, etag, last_modified):
+        ranges = parse_range(range_header, size)
+
+    if ranges is not None and not ranges:
+        headers["content-range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    status_code = 206
+    if ranges is None:
+        status_code = 200
+        segments = [(0, size)]
+    elif len(ranges) == 1:
+        start, end = ranges[0]
+        headers["content-range"] = f"bytes {start}-{end}/{size}"
+        segments = [(start, end - start + 1)]
+    else:
+        # Plusieurs plages : une partie par plage, longueur totale connue d'avance
+        boundary = secrets.token_hex(16)
+        segments = []
+        for start, end in ranges:
+            segments.append(f"--{boundary}\r\nContent-Type: {media_type}\r\nContent-Range: bytes {start}-{end}/{size}\r\n\r\n".encode())
+            segments.append((start, end - start + 1))
+            segments.append(b"\r\n")
+        segments.append(f"--{boundary}--\r\n".encode())
+        media_type = f"multipart/byteranges; boundary={boundary}"
+
+    headers["content-length"] = str(sum(len(s) if isinstance(s, bytes) else s[1] for s in segments))
+    return StreamingResponse(
+        _read_segments(path, segments),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
@@ -0,0 +1,65 @@
+"""
+Génération de rendus d'images (miniatures, aperçu web) avec Pillow
+
+Exécuté dans un pool de processus : module sans dépendance à l'application (import rapide
+par les workers « spawn »), fonctions de premier niveau sérialisables.
+"""
+from PIL import Image, ImageOps
+import os
+
+# Types ouverts par Pillow pour lesquels un rendu est proposé
+SUPPORTED_TYPES = {
+    "image/jpeg",
+    "image/png",
+    "image/gif",
+    "image/webp",
+    "image/bmp",
+    "image/tiff",
+}
+
+FORMATS = {
+    "webp": ("WEBP", {"method": 4}),
+    "jpeg": ("JPEG", {"optimize": True, "progressive": True}),
+}
+
+def _flatten(image: Image.Image, keep_alpha: bool):
+    # Palette, niveaux de gris, CMJN... ramenés en RGB ; transparence conservée si le format la gère
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if not has_alpha:
+        return image.convert("RGB") if image.mode != "RGB" else image
+
+    image = image.convert("RGBA")
+    if keep_alpha:
+        return image
+
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+def render(source: str, target: str, max_size: int, image_format: str, quality: int):
+    """
+    Écrit dans target une version de source tenant dans max_size x max_size (jamais agrandie)
+    Écriture atomique (fichier temporaire puis renommage) ; renvoie la taille du rendu en octets
+    """
+    pil_format, options = FORMATS[image_format]
+
+    with Image.open(source) as image:
+        # JPEG : décodage directement à une échelle réduite (1/2, 1/4, 1/8), bien plus rapide
+        image.draft("RGB", (max_size, max_size))
+
+        # Orientation EXIF appliquée : les photos de téléphone ne sont pas affichées couchées
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        image = _flatten(image, keep_alpha=pil_format == "WEBP")
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f"{target}.{os.getpid()}.tmp"
+        try:
+            image.save(temp_path, pil_format, quality=quality, **options)
+            os.replace(temp_path, target)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    return os.path.getsize(target)
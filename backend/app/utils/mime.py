@@ -0,0 +1,112 @@
+"""
+Détection du type MIME des fichiers téléversés
+
+1. Extension connue (types inertes uniquement) : aucune lecture du contenu
+2. Type déjà détecté pour la même empreinte de contenu (mémoïsation)
+3. libmagic sur le début du fichier (capturé pendant l'écriture), dans un pool de threads :
+   la boucle d'événements n'est jamais bloquée par l'analyse
+"""
+from collections import OrderedDict
+from app.config import settings
+from app.utils.executors import get_executor
+import asyncio
+import magic
+import os
+import threading
+
+# Extensions dont le type est fixé sans analyse : libmagic les reconnaît mal (texte, conteneurs ZIP
+# bureautiques) ou n'apporterait rien. Les types actifs (HTML, SVG, JavaScript...) restent détectés
+# sur le contenu : une extension ne suffit pas à faire afficher un fichier comme page web.
+EXTENSION_TYPES = {
+    ".md": "text/markdown",
+    ".markdown": "text/markdown",
+    ".txt": "text/plain",
+    ".csv": "text/csv",
+    ".log": "text/plain",
+    ".json": "application/json",
+    ".pdf": "application/pdf",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+    ".tif": "image/tiff",
+    ".tiff": "image/tiff",
+    ".heic": "image/heic",
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+    ".ogg": "audio/ogg",
+    ".flac": "audio/flac",
+    ".m4a": "audio/mp4",
+    ".mp4": "video/mp4",
+    ".m4v": "video/mp4",
+    ".mov": "video/quicktime",
+    ".webm": "video/webm",
+    ".mkv": "video/x-matroska",
+    ".avi": "video/x-msvideo",
+    ".zip": "application/zip",
+    ".gz": "application/gzip",
+    ".tar": "application/x-tar",
+    ".7z": "application/x-7z-compressed",
+    ".rar": "application/vnd.rar",
+    ".doc": "application/msword",
+    ".xls": "application/vnd.ms-excel",
+    ".ppt": "application/vnd.ms-powerpoint",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    ".odt": "application/vnd.oasis.opendocument.text",
+    ".ods": "application/vnd.oasis.opendocument.spreadsheet",
+    ".odp": "application/vnd.oasis.opendocument.presentation",
+    ".rtf": "application/rtf",
+    ".epub": "application/epub+zip",
+}
+
+# Empreinte -> type détecté par libmagic, les plus anciens évincés au-delà de MIME_CACHE_SIZE
+_detected = OrderedDict()
+
+# Une instance libmagic par thread : python-magic sérialise les appels sur une instance partagée
+_local = threading.local()
+
+def from_extension(filename: str):
+    return EXTENSION_TYPES.get(os.path.splitext(filename or "")[1].lower())
+
+def read_prefix(path: str, size: int = None):
+    with open(path, "rb") as f:
+        return f.read(size or settings.MIME_SNIFF_BYTES)
+
+def sniff(prefix: bytes = None, path: str = None):
+    """Type MIME d'après le contenu (début fourni, sinon lu depuis path) ; appel bloquant"""
+    detector = getattr(_local, "detector", None)
+    if detector is None:
+        detector = _local.detector = magic.Magic(mime=True)
+
+    if prefix is None:
+        prefix = read_prefix(path)
+    return detector.from_buffer(prefix)
+
+def _remember(digest: str, mime_type: str):
+    _detected[digest] = mime_type
+    while len(_detected) > settings.MIME_CACHE_SIZE:
+        _detected.popitem(last=False)
+
+async def detect_mime_type(filename: str, digest: str = None, prefix: bytes = None, path: str = None):
+    """
+    Type MIME d'un fichier : extension, puis type mémorisé pour ce contenu, puis libmagic hors boucle d'événements
+    prefix : premiers octets capturés à l'écriture ; à défaut, path est lu dans le pool
+    """
+    mime_type = from_extension(filename)
+    if mime_type:
+        return mime_type
+
+    if digest in _detected:
+        _detected.move_to_end(digest)
+        return _detected[digest]
+
+    executor = get_executor("mime-sniff", settings.MIME_SNIFF_WORKERS)
+    mime_type = await asyncio.get_running_loop().run_in_executor(executor, sniff, prefix, path)
+
+    if digest:
+        _remember(digest, mime_type)
+    return mime_type
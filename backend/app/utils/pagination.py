@@ -0,0 +1,150 @@
+from fastapi import HTTPException, Query, status
+from sqlalchemy import func, literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.config import settings
+import base64
+import binascii
+import datetime
+import json
+
+# Clés de tri des listings ; l'identifiant départage les ex æquo (ordre total, donc stable)
+SORT_KEYS = ("name", "size", "created_at", "mime_type")
+
+class PageParams:
+    """
+    Paramètres de pagination par clé (keyset) : position décodée du curseur, tri et taille de page
+    Sans limit ni cursor, le listing reste complet (compatibilité des clients existants)
+    """
+
+    def __init__(self, limit: Optional[int] = None, cursor: Optional[str] = None, sort: str = "name", order: str = "asc"):
+        self.limit = limit
+        self.cursor = cursor
+        self.sort = sort
+        self.order = order
+        self.position = decode_cursor(cursor, sort, order) if cursor else None
+
+    @property
+    def paginated(self):
+        return self.limit is not None or self.cursor is not None
+
+    @property
+    def page_size(self):
+        return self.limit or settings.LIST_PAGE_SIZE
+
+    @property
+    def phase(self):
+        """Phase du curseur (folders ou files), None sur la première page"""
+        return self.position["p"] if self.position else None
+
+    def check_phase(self, *phases):
+        # Curseur produit par un autre listing (dossiers seuls, fichiers seuls)
+        if self.phase is not None and self.phase not in phases:
+            raise _invalid_cursor()
+
+    def after(self, phase: str):
+        """Clé (valeur de tri, id) à partir de laquelle reprendre la phase donnée, None pour son début"""
+        if self.phase != phase:
+            return None
+        return self.position["k"]
+
+
+def page_params(
+    limit: Optional[int] = Query(None, ge=1, le=settings.LIST_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: str = Query("name", pattern=f"^({'|'.join(SORT_KEYS)})$"),
+    order: str = Query("asc", pattern="^(asc|desc)$")
+):
+    return PageParams(limit, cursor, sort, order)
+
+
+def _invalid_cursor():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Curseur de pagination invalide"
+    )
+
+def encode_cursor(params: PageParams, phase: str, key):
+    # Curseur opaque : tri, sens, phase (dossiers puis fichiers) et dernière clé servie
+    if key is not None and isinstance(key[0], datetime.datetime):
+        key = (key[0].isoformat(), key[1])
+
+    payload = {"s": params.sort, "o": params.order, "p": phase, "k": key}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(cursor: str, sort: str, order: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        key = payload["k"]
+
+        if key is not None:
+            value, last_id = key
+            if not isinstance(last_id, int):
+                raise ValueError(last_id)
+            if sort == "created_at":
+                value = datetime.datetime.fromisoformat(value)
+            key = (value, last_id)
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise _invalid_cursor()
+
+    # Un curseur n'est valable que pour le tri qui l'a produit
+    if payload.get("s") != sort or payload.get("o") != order or payload.get("p") not in ("folders", "files"):
+        raise _invalid_cursor()
+
+    payload["k"] = key
+    return payload
+
+def sort_key(model, sort: str):
+    """
+    Expression de tri et extraction de la même valeur sur une ligne chargée
+    Les dossiers n'ont ni taille ni type : ils sont alors triés par nom
+    """
+    if sort == "size" and hasattr(model, "size"):
+        return model.size, lambda row: row.size
+    if sort == "mime_type" and hasattr(model, "mime_type"):
+        # NULL remplacé par "" : comparaison par tuple sans cas particulier
+        return func.coalesce(model.mime_type, ""), lambda row: row.mime_type or ""
+    if sort == "created_at":
+        return model.created_at, lambda row: row.created_at
+    return model.name, lambda row: row.name
+
+async def fetch_page(db: AsyncSession, query, model, params: PageParams, phase: str, limit: Optional[int] = None, after=None):
+    """
+    Trie la requête et, si limit est fourni, ne lit que la page suivant la clé after
+    Renvoie (lignes, curseur de la page suivante ou None)
+    """
+    column, value_of = sort_key(model, params.sort)
+    descending = params.order == "desc"
+
+    def comparable(expression):
+        # SQLite stocke les dates en texte, avec ou sans fraction (CURRENT_TIMESTAMP) : comparaison sur une forme normalisée
+        if params.sort == "created_at" and db.get_bind().dialect.name == "sqlite":
+            return func.datetime(expression)
+        return expression
+
+    key_column = comparable(column)
+    query = query.order_by(
+        key_column.desc() if descending else key_column.asc(),
+        model.id.desc() if descending else model.id.asc()
+    )
+
+    if after is not None:
+        # Comparaison de tuples : servie par l'index (…, clé de tri, id), sans OFFSET
+        value, last_id = after
+        current = tuple_(key_column, model.id)
+        bound = tuple_(comparable(literal(value, column.type)), literal(last_id))
+        query = query.where(current < bound if descending else current > bound)
+
+    if limit is None:
+        return (await db.execute(query)).scalars().all(), None
+
+    # Une ligne de plus que demandé : indique s'il reste une page sans COUNT(*)
+    rows = (await db.execute(query.limit(limit + 1))).scalars().all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    key = (value_of(rows[-1]), rows[-1].id) if rows else after
+    return rows, encode_cursor(params, phase, key)
@@ -0,0 +1,151 @@
+from sqlalchemy import exc
+from starlette.datastructures import MutableHeaders
+from contextvars import ContextVar
+import bisect
+import heapq
+import threading
+import time
+
+# Bornes supérieures (secondes) de l'histogramme des attentes de connexion
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Requête HTTP en cours : libellé et attente cumulée, renseignés par le middleware
+current_request = ContextVar("current_request", default=None)
+
+class PoolWaitMiddleware:
+    """
+    Middleware ASGI : attente de connexion imputée à chaque requête, renvoyée dans l'en-tête Server-Timing
+    Ajouté au message http.response.start : les réponses en flux passent sans être réencapsulées
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = {"label": f"{scope['method']} {scope['path']}", "db_wait": 0.0}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f"db-pool;dur={state['db_wait'] * 1000:.2f}")
+            await send(message)
+
+        token = current_request.set(state)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+
+class PoolMetrics:
+    """
+    Statistiques d'attente à l'obtention d'une connexion (thread-safe)
+    """
+
+    def __init__(self, name: str, slowest_size: int = 20):
+        self.name = name
+        self.slowest_size = slowest_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.buckets = [0] * (len(WAIT_BUCKETS) + 1)
+            self._slowest = []
+
+    def record(self, duration: float, timed_out: bool = False):
+        request = current_request.get()
+        if request is not None:
+            request["db_wait"] += duration
+
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += duration
+            self.max_wait = max(self.max_wait, duration)
+            self.buckets[bisect.bisect_left(WAIT_BUCKETS, duration)] += 1
+
+            # Tas borné : les attentes les plus longues avec la requête concernée
+            entry = (duration, time.time(), request["label"] if request else None, timed_out)
+            if len(self._slowest) < self.slowest_size:
+                heapq.heappush(self._slowest, entry)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def snapshot(self):
+        with self._lock:
+            count = self.checkouts + self.timeouts
+            histogram = [
+                {"le": bound, "count": n}
+                for bound, n in zip(WAIT_BUCKETS + ("+Inf",), self.buckets)
+            ]
+            slowest = [
+                {"wait_ms": round(duration * 1000, 3), "at": at, "request": label, "timed_out": timed_out}
+                for duration, at, label, timed_out in sorted(self._slowest, reverse=True)
+            ]
+
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / count * 1000, 3) if count else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "wait_histogram": histogram,
+                "slowest_checkouts": slowest
+            }
+
+_metrics = {}
+
+def get_pool_metrics(name: str):
+    """Métriques nommées, créées à la première utilisation"""
+    metrics = _metrics.get(name)
+    if metrics is None:
+        metrics = _metrics.setdefault(name, PoolMetrics(name))
+    return metrics
+
+def timed_pool_class(base, name: str):
+    """
+    Sous-classe du pool mesurant l'attente de chaque obtention de connexion
+    Les métriques sont portées par la classe : elles survivent à Pool.recreate()
+    """
+    metrics = get_pool_metrics(name)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except exc.TimeoutError:
+            metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+
+        metrics.record(time.perf_counter() - start)
+        return connection
+
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get, "metrics": metrics})
+
+def pool_status(pool):
+    """État instantané d'un pool à file d'attente (connexions ouvertes, prêtées, débordement)"""
+    status = {"class": type(pool).__name__}
+
+    for key in ("size", "checkedin", "checkedout", "overflow", "timeout"):
+        method = getattr(pool, key, None)
+        if callable(method):
+            status[key] = method()
+
+    # QueuePool compte un débordement négatif tant que le pool n'est pas rempli
+    if "overflow" in status:
+        status["overflow"] = max(0, status["overflow"])
+
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+
+    return status
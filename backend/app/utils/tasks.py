@@ -0,0 +1,33 @@
+import asyncio
+
+# Tâches de fond lancées au démarrage de l'application
+_background_tasks = []
+
+def start_periodic(job, interval: int, name: str = None, delay: int = 0):
+    """Exécute une coroutine périodiquement tant que l'application tourne (première exécution après delay secondes)"""
+    async def runner():
+        await asyncio.sleep(delay)
+        while True:
+            try:
+                await job()
+            except Exception as e:
+                print(f"Erreur lors de la tâche périodique {name or job.__name__}: {str(e)}")
+            await asyncio.sleep(interval)
+    
+    task = asyncio.create_task(runner(), name=name or job.__name__)
+    _background_tasks.append(task)
+    return task
+
+def start_task(coroutine, name: str):
+    """Lance une coroutine de fond (boucle de travail), annulée à l'arrêt de l'application"""
+    task = asyncio.create_task(coroutine, name=name)
+    _background_tasks.append(task)
+    return task
+
+async def stop_all():
+    """Annule les tâches de fond à l'arrêt de l'application"""
+    for task in _background_tasks:
+        task.cancel()
+    
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
@@ -0,0 +1,123 @@
+from xml.etree import ElementTree
+from collections import Counter
+import os
+import re
+import zipfile
+
+# Extraction PDF optionnelle : sans pypdf, les PDF sont marqués non pris en charge
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+TEXT_TYPES = {"text/plain", "text/markdown"}
+
+# Parties XML portant le texte des formats bureautiques (archives ZIP)
+OFFICE_PARTS = {
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": r"word/document\.xml",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": r"xl/sharedStrings\.xml",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation": r"ppt/slides/slide\d+\.xml",
+    "application/vnd.oasis.opendocument.text": r"content\.xml",
+    "application/vnd.oasis.opendocument.spreadsheet": r"content\.xml",
+    "application/vnd.oasis.opendocument.presentation": r"content\.xml",
+}
+
+# libmagic ne reconnaît pas toujours ces formats (application/zip, application/octet-stream) : repli sur l'extension
+EXTENSION_TYPES = {
+    ".txt": "text/plain",
+    ".md": "text/markdown",
+    ".markdown": "text/markdown",
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    ".odt": "application/vnd.oasis.opendocument.text",
+    ".ods": "application/vnd.oasis.opendocument.spreadsheet",
+    ".odp": "application/vnd.oasis.opendocument.presentation",
+}
+
+# Éléments XML de fin de bloc (paragraphe, titre, chaîne partagée, ligne) : séparent les mots de deux blocs
+BLOCK_TAGS = {"p", "h", "si", "tr", "br", "tab"}
+
+# Termes indexés : mots de 2 à 64 caractères
+TERM_PATTERN = re.compile(r"\w{2,64}")
+
+def indexable_type(mime_type: str, filename: str):
+    """Type dont le texte peut être extrait (par type MIME puis par extension), None sinon"""
+    if mime_type in TEXT_TYPES or mime_type in OFFICE_PARTS:
+        return mime_type
+    if mime_type == "application/pdf":
+        return mime_type if PdfReader is not None else None
+
+    extension_type = EXTENSION_TYPES.get(os.path.splitext(filename or "")[1].lower())
+    if extension_type == "application/pdf" and PdfReader is None:
+        return None
+    return extension_type
+
+def _decode(data: bytes):
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # Caractère multi-octets coupé par la limite de lecture : seul le dernier caractère est perdu
+        if e.start >= len(data) - 3:
+            return data[:e.start].decode("utf-8", errors="replace")
+        return data.decode("latin-1")
+
+def _extract_plain(path: str, max_bytes: int):
+    with open(path, "rb") as f:
+        return _decode(f.read(max_bytes))
+
+def _extract_pdf(path: str, max_bytes: int):
+    parts, size = [], 0
+    for page in PdfReader(path).pages:
+        text = page.extract_text() or ""
+        parts.append(text)
+        size += len(text)
+        if size >= max_bytes:
+            break
+    return "\n".join(parts)[:max_bytes]
+
+def _extract_office(path: str, part_pattern: str, max_bytes: int):
+    parts, size = [], 0
+    pattern = re.compile(part_pattern)
+
+    with zipfile.ZipFile(path) as archive:
+        for name in sorted(n for n in archive.namelist() if pattern.fullmatch(n)):
+            # Lecture en flux : taille décompressée bornée (archives piégées)
+            with archive.open(name) as member:
+                for event, element in ElementTree.iterparse(member, events=("end",)):
+                    if element.text:
+                        parts.append(element.text)
+                        size += len(element.text)
+                    if element.tag.rsplit("}", 1)[-1] in BLOCK_TAGS:
+                        parts.append("\n")
+                    if element.tail:
+                        parts.append(element.tail)
+                    element.clear()
+
+                    if size >= max_bytes:
+                        return "".join(parts)
+
+    return "".join(parts)
+
+def extract_text(path: str, mime_type: str, filename: str, max_bytes: int):
+    """
+    Texte d'un fichier, borné à max_bytes caractères environ ; None si le type n'est pas pris en charge
+    Les erreurs de lecture (fichier corrompu, archive invalide) sont propagées à l'appelant
+    """
+    kind = indexable_type(mime_type, filename)
+
+    if kind is None:
+        return None
+    if kind in TEXT_TYPES:
+        return _extract_plain(path, max_bytes)
+    if kind == "application/pdf":
+        return _extract_pdf(path, max_bytes)
+    return _extract_office(path, OFFICE_PARTS[kind], max_bytes)
+
+def tokenize(text: str, max_terms: int = None):
+    """Fréquence des termes (casse repliée), limitée aux max_terms plus fréquents"""
+    counts = Counter(TERM_PATTERN.findall(text.casefold()))
+    if max_terms is not None and len(counts) > max_terms:
+        return dict(counts.most_common(max_terms))
+    return dict(counts)
@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from app.config import settings
+import threading
+import time
+
+class CurrentUser:
+    """
+    Projection en lecture seule de l'utilisateur authentifié, détachée de toute session
+    storage_used n'est qu'un instantané : les contrôles de quota relisent la base
+    """
+
+    FIELDS = (
+        "id", "email", "full_name", "is_active", "is_verified",
+        "storage_used", "storage_quota", "oauth_provider", "oauth_provider_id", "created_at"
+    )
+
+    __slots__ = FIELDS
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            object.__setattr__(self, field, values.get(field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CurrentUser est en lecture seule : recharger l'utilisateur en base pour le modifier")
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(**{field: getattr(user, field) for field in cls.FIELDS})
+
+    def __repr__(self):
+        return f"<CurrentUser {self.email}>"
+
+
+class UserCache:
+    """
+    Cache TTL/LRU des utilisateurs authentifiés, indexé par (identifiant, token)
+    Propre au processus : entre workers, une modification n'est visible qu'à expiration du TTL
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, user_id: int, token: str):
+        if not self.enabled:
+            return None
+
+        key = (user_id, token)
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id: int, token: str, user: CurrentUser):
+        if not self.enabled:
+            return
+
+        key = (user_id, token)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, user_id: int):
+        """Oublie toutes les sessions d'un utilisateur (profil, mot de passe, OAuth ou activation modifiés)"""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+user_cache = UserCache(settings.USER_CACHE_TTL_SECONDS, settings.USER_CACHE_MAX_ENTRIES)
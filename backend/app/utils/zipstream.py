@@ -0,0 +1,361 @@
+"""
+Écriture d'archives ZIP en flux
+
+L'archive est produite morceau par morceau sans jamais être matérialisée :
+chaque membre est lu par blocs depuis le disque, compressé à la volée, et ses
+CRC/tailles sont écrits après les données (descripteur de données, bit 3).
+Les extensions ZIP64 sont utilisées dès qu'un membre, un offset ou le nombre
+d'entrées dépasse les limites du format ZIP classique.
+
+Les petits membres peuvent être compressés en parallèle sur un pool (threads ou
+processus) puis écrits dans l'ordre ; les gros membres restent compressés en
+flux pour garder une mémoire bornée.
+"""
+from collections import deque
+import os
+import struct
+import time
+import zlib
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+# Même marge que zipfile : un membre proche de 2 Go passe en ZIP64 (la compression peut grossir les données)
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_MAX_VALUE = 0xFFFFFFFF
+ZIP_MAX_ENTRIES = 0xFFFF
+
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+VERSION_DEFAULT = 20
+VERSION_ZIP64 = 45
+CREATE_SYSTEM_UNIX = 3
+
+STRUCT_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+STRUCT_CENTRAL_DIR = struct.Struct("<4s4B4HL2L5H2L")
+STRUCT_END_ARCHIVE = struct.Struct("<4s4H2LH")
+STRUCT_END_ARCHIVE64 = struct.Struct("<4sQ2H2L4Q")
+STRUCT_END_ARCHIVE64_LOCATOR = struct.Struct("<4sLQL")
+
+SIG_LOCAL_HEADER = b"PK\003\004"
+SIG_CENTRAL_DIR = b"PK\001\002"
+SIG_END_ARCHIVE = b"PK\005\006"
+SIG_END_ARCHIVE64 = b"PK\006\006"
+SIG_END_ARCHIVE64_LOCATOR = b"PK\006\007"
+SIG_DATA_DESCRIPTOR = 0x08074b50
+
+DEFAULT_CHUNK_SIZE = 1048576
+DEFAULT_FLUSH_SIZE = 65536
+
+
+def _dos_datetime(timestamp: float):
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    dos_date = (year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday
+    dos_time = t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+    return dos_time, dos_date
+
+
+class _Entry:
+    __slots__ = ("arcname", "flags", "method", "dos_time", "dos_date", "crc",
+                 "compress_size", "file_size", "offset", "external_attr", "zip64")
+
+    def __init__(self, arcname, method, timestamp, external_attr, zip64):
+        self.arcname = arcname.encode("utf-8")
+        self.flags = FLAG_DATA_DESCRIPTOR | FLAG_UTF8
+        self.method = method
+        self.dos_time, self.dos_date = _dos_datetime(timestamp)
+        self.crc = 0
+        self.compress_size = 0
+        self.file_size = 0
+        self.offset = 0
+        self.external_attr = external_attr
+        self.zip64 = zip64
+
+
+class ZipStreamWriter:
+    """
+    Producteur d'archive ZIP séquentiel : chaque méthode renvoie un générateur d'octets
+    à consommer dans l'ordre (write_directory / write_file ... puis finish)
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._entries = []
+        self._offset = 0
+
+    def _emit(self, data: bytes):
+        self._offset += len(data)
+        return data
+
+    def _local_header(self, entry: _Entry):
+        extra = b""
+        size_field = 0
+
+        # Tailles inconnues à ce stade : placeholder ZIP64 rempli par le descripteur de données
+        if entry.zip64:
+            extra = struct.pack("<HHQQ", 1, 16, 0, 0)
+            size_field = ZIP_MAX_VALUE
+
+        header = STRUCT_LOCAL_HEADER.pack(
+            SIG_LOCAL_HEADER,
+            VERSION_ZIP64 if entry.zip64 else VERSION_DEFAULT, 0,
+            entry.flags, entry.method, entry.dos_time, entry.dos_date,
+            0, size_field, size_field,
+            len(entry.arcname), len(extra)
+        )
+        return header + entry.arcname + extra
+
+    def _data_descriptor(self, entry: _Entry):
+        if entry.zip64:
+            return struct.pack("<LLQQ", SIG_DATA_DESCRIPTOR, entry.crc, entry.compress_size, entry.file_size)
+        return struct.pack("<LLLL", SIG_DATA_DESCRIPTOR, entry.crc, entry.compress_size, entry.file_size)
+
+    def write_directory(self, arcname: str, timestamp: float = None):
+        if not arcname.endswith("/"):
+            arcname += "/"
+
+        entry = _Entry(arcname, ZIP_STORED, timestamp or time.time(), (0o40775 << 16) | 0x10, False)
+        entry.offset = self._offset
+        self._entries.append(entry)
+
+        yield self._emit(self._local_header(entry))
+        yield self._emit(self._data_descriptor(entry))
+
+    def write_file(self, path: str, arcname: str, method: int = ZIP_DEFLATED, level: int = 6, fileobj=None):
+        """
+        Ajoute un fichier du disque en le lisant par blocs
+        Le fichier est ouvert avant l'écriture de l'en-tête : un fichier illisible lève OSError sans corrompre l'archive
+        """
+        source = fileobj or open(path, "rb")
+
+        try:
+            stat = os.fstat(source.fileno())
+            entry = _Entry(
+                arcname, method, stat.st_mtime, (0o100644 << 16),
+                stat.st_size * 1.05 > ZIP64_LIMIT
+            )
+            entry.offset = self._offset
+            self._entries.append(entry)
+
+            yield self._emit(self._local_header(entry))
+
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -15) if method == ZIP_DEFLATED else None
+            crc = 0
+
+            for chunk in iter(lambda: source.read(self.chunk_size), b""):
+                entry.file_size += len(chunk)
+                crc = zlib.crc32(chunk, crc)
+
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                    if not chunk:
+                        continue
+
+                entry.compress_size += len(chunk)
+                yield self._emit(chunk)
+
+            if compressor:
+                tail = compressor.flush()
+                entry.compress_size += len(tail)
+                yield self._emit(tail)
+
+            entry.crc = crc
+
+            # Fichier grossi pendant la lecture au-delà de ce qu'autorise un en-tête 32 bits
+            if not entry.zip64 and max(entry.file_size, entry.compress_size) > ZIP_MAX_VALUE:
+                raise RuntimeError(f"Membre {arcname} trop volumineux pour un en-tête ZIP non ZIP64")
+
+            yield self._emit(self._data_descriptor(entry))
+        finally:
+            if fileobj is None:
+                source.close()
+
+    def write_compressed(self, arcname: str, method: int, crc: int, file_size: int, data: bytes, timestamp: float):
+        """Ajoute un membre déjà compressé (compression parallèle hors de ce générateur)"""
+        entry = _Entry(arcname, method, timestamp, (0o100644 << 16), file_size * 1.05 > ZIP64_LIMIT)
+        entry.offset = self._offset
+        entry.crc = crc
+        entry.file_size = file_size
+        entry.compress_size = len(data)
+        self._entries.append(entry)
+
+        yield self._emit(self._local_header(entry))
+        yield self._emit(data)
+        yield self._emit(self._data_descriptor(entry))
+
+    def finish(self):
+        """Écrit le répertoire central et les enregistrements de fin (ZIP64 si nécessaire)"""
+        central_dir_offset = self._offset
+
+        for entry in self._entries:
+            extra_values = []
+            file_size, compress_size, offset = entry.file_size, entry.compress_size, entry.offset
+
+            if file_size > ZIP_MAX_VALUE:
+                extra_values.append(file_size)
+                file_size = ZIP_MAX_VALUE
+            if compress_size > ZIP_MAX_VALUE:
+                extra_values.append(compress_size)
+                compress_size = ZIP_MAX_VALUE
+            if offset > ZIP_MAX_VALUE:
+                extra_values.append(offset)
+                offset = ZIP_MAX_VALUE
+
+            extra = b""
+            if extra_values:
+                extra = struct.pack(f"<HH{len(extra_values)}Q", 1, 8 * len(extra_values), *extra_values)
+
+            version = VERSION_ZIP64 if (entry.zip64 or extra_values) else VERSION_DEFAULT
+
+            header = STRUCT_CENTRAL_DIR.pack(
+                SIG_CENTRAL_DIR,
+                version, CREATE_SYSTEM_UNIX, version, 0,
+                entry.flags, entry.method, entry.dos_time, entry.dos_date,
+                entry.crc, compress_size, file_size,
+                len(entry.arcname), len(extra), 0,
+                0, 0, entry.external_attr, offset
+            )
+            yield self._emit(header + entry.arcname + extra)
+
+        central_dir_size = self._offset - central_dir_offset
+        count = len(self._entries)
+
+        if count > ZIP_MAX_ENTRIES or central_dir_offset > ZIP_MAX_VALUE or central_dir_size > ZIP_MAX_VALUE:
+            end64_offset = self._offset
+            yield self._emit(STRUCT_END_ARCHIVE64.pack(
+                SIG_END_ARCHIVE64, STRUCT_END_ARCHIVE64.size - 12,
+                VERSION_ZIP64, VERSION_ZIP64, 0, 0,
+                count, count, central_dir_size, central_dir_offset
+            ))
+            yield self._emit(STRUCT_END_ARCHIVE64_LOCATOR.pack(
+                SIG_END_ARCHIVE64_LOCATOR, 0, end64_offset, 1
+            ))
+
+        yield self._emit(STRUCT_END_ARCHIVE.pack(
+            SIG_END_ARCHIVE, 0, 0,
+            min(count, ZIP_MAX_ENTRIES), min(count, ZIP_MAX_ENTRIES),
+            min(central_dir_size, ZIP_MAX_VALUE), min(central_dir_offset, ZIP_MAX_VALUE), 0
+        ))
+
+
+def _coalesce(chunks, flush_size: int):
+    # Regroupe les petits fragments (en-têtes, sorties zlib) pour limiter le nombre d'envois
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= flush_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def compress_member(path: str, method: int = ZIP_DEFLATED, level: int = 6, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Compresse un fichier entier en mémoire ; exécutée dans un pool de threads ou de processus
+    Retourne (crc, taille, données compressées, date de modification)
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15) if method == ZIP_DEFLATED else None
+    parts = []
+    crc = 0
+    size = 0
+
+    with open(path, "rb") as source:
+        mtime = os.fstat(source.fileno()).st_mtime
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            size += len(chunk)
+            crc = zlib.crc32(chunk, crc)
+            parts.append(compressor.compress(chunk) if compressor else chunk)
+
+    if compressor:
+        parts.append(compressor.flush())
+
+    return crc, size, b"".join(parts), mtime
+
+
+def iter_zip(files, directories=(), chunk_size: int = DEFAULT_CHUNK_SIZE, flush_size: int = DEFAULT_FLUSH_SIZE,
+             executor=None, parallel_max_size: int = 16777216, lookahead: int = 8):
+    """
+    Générateur d'archive ZIP à mémoire constante
+
+    - files : itérable de dicts {"arcname", "path"} (clés optionnelles "method", "level", "size")
+    - directories : noms de dossiers à créer explicitement (dossiers vides)
+    - executor : pool optionnel ; les membres DEFLATE d'au plus parallel_max_size octets y sont
+      compressés en avance (au plus lookahead membres en vol), l'écriture reste dans l'ordre
+    """
+    writer = ZipStreamWriter(chunk_size=chunk_size)
+
+    def stream_member(member):
+        try:
+            source = open(member["path"], "rb")
+        except OSError as e:
+            print(f"Erreur lors de l'ajout du fichier {member['arcname']}: {str(e)}")
+            return
+
+        with source:
+            yield from writer.write_file(
+                member["path"],
+                member["arcname"],
+                method=member.get("method", ZIP_DEFLATED),
+                level=member.get("level", 6),
+                fileobj=source
+            )
+
+    def schedule(member):
+        # Seuls les petits membres compressés partent dans le pool (mémoire bornée par la fenêtre)
+        if executor is None or member.get("method", ZIP_DEFLATED) != ZIP_DEFLATED:
+            return None
+
+        size = member.get("size")
+        if size is None:
+            try:
+                size = os.path.getsize(member["path"])
+            except OSError:
+                return None
+
+        if size > parallel_max_size:
+            return None
+
+        return executor.submit(compress_member, member["path"], ZIP_DEFLATED, member.get("level", 6), chunk_size)
+
+    def generate():
+        for arcname in directories:
+            yield from writer.write_directory(arcname)
+
+        members = iter(files)
+        pending = deque()
+
+        try:
+            while True:
+                for member in members:
+                    pending.append((member, schedule(member)))
+                    if len(pending) >= lookahead:
+                        break
+
+                if not pending:
+                    break
+
+                member, future = pending.popleft()
+
+                if future is None:
+                    yield from stream_member(member)
+                    continue
+
+                try:
+                    crc, size, data, mtime = future.result()
+                except Exception as e:
+                    print(f"Erreur lors de l'ajout du fichier {member['arcname']}: {str(e)}")
+                    continue
+
+                yield from writer.write_compressed(member["arcname"], ZIP_DEFLATED, crc, size, data, mtime)
+        finally:
+            # Téléchargement interrompu : les compressions en attente sont abandonnées
+            for _, future in pending:
+                if future is not None:
+                    future.cancel()
+
+        yield from writer.finish()
+
+    return _coalesce(generate(), flush_size)
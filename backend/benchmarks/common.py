@@ -0,0 +1,66 @@
+"""
+Outils communs des benchmarks (environnement, jeux de données, mesures isolées)
+
+Les benchmarks se lancent depuis backend/ : python -m benchmarks.<nom> --help
+Sans DATABASE_URL / UPLOAD_DIR, une base SQLite et un répertoire temporaires sont utilisés.
+"""
+import multiprocessing
+import os
+import resource
+import tempfile
+
+WORK_DIR = os.path.join(tempfile.gettempdir(), "supfile-bench")
+
+def setup_env():
+    """Variables minimales pour importer l'application ; à appeler avant tout import de app.*"""
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}")
+    os.environ.setdefault("UPLOAD_DIR", os.path.join(WORK_DIR, "uploads"))
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("ENVIRONMENT", "benchmark")
+    os.makedirs(WORK_DIR, exist_ok=True)
+    os.makedirs(os.environ["UPLOAD_DIR"], exist_ok=True)
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus courant (Mo)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def make_file(path: str, size: int, compressible: bool = True):
+    """Fichier de test : lignes de journal (compressible) ou octets aléatoires"""
+    line = b"2024-01-01T00:00:00 INFO request handled path=/api/v1/files status=200 duration=12ms\n"
+    block = (line * (1048576 // len(line) + 1))[:1048576]
+
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            n = min(remaining, len(block))
+            f.write(block[:n] if compressible else os.urandom(n))
+            remaining -= n
+    return path
+
+def _child(queue, target, args):
+    setup_env()
+    try:
+        queue.put(target(*args))
+    except BaseException as e:
+        queue.put({"error": repr(e)})
+
+def isolated(target, *args):
+    """
+    Exécute target(*args) dans un processus neuf (spawn) et renvoie son résultat
+    Le pic RSS mesuré par target ne dépend ainsi que de l'implémentation testée
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(queue, target, args))
+    process.start()
+    result = queue.get()
+    process.join()
+
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result
+
+def print_table(headers, rows):
+    widths = [max(len(str(v)) for v in column) for column in zip(headers, *rows)]
+    for values in [headers, *rows]:
+        print("  ".join(str(v).rjust(w) for v, w in zip(values, widths)))
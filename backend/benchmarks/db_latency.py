@@ -0,0 +1,149 @@
+"""
+Latence sous charge : Session synchrone dans les handlers async (ancienne conception) contre AsyncSession
+
+Usage : python -m benchmarks.db_latency [--duration 10] [--concurrency 20] [--slow-clients 2] [--slow-rows 300000] [--port 8765]
+
+Une petite application FastAPI expose, pour chaque conception, une requête rapide et une requête
+lente (listing coûteux simulé côté base). Elle tourne sous uvicorn (un worker) dans un processus
+séparé ; des clients HTTP enchaînent les requêtes rapides pendant que d'autres enchaînent les
+lentes. Les percentiles de latence des requêtes rapides montrent si une requête lente bloque la
+boucle d'événements. Base de DATABASE_URL (SQLite ou PostgreSQL).
+"""
+from benchmarks.common import setup_env, print_table
+import argparse
+import asyncio
+import multiprocessing
+import time
+
+# Requête lente : comptage d'une série générée par la base, sans table
+SLOW_QUERIES = {
+    "sqlite": "WITH RECURSIVE serie(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM serie WHERE x < :rows) SELECT count(*) FROM serie",
+    "postgresql": "SELECT count(*) FROM generate_series(1, :rows)",
+}
+
+def build_app(design: str, slow_rows: int):
+    from fastapi import FastAPI
+    from sqlalchemy import text
+    from app.database import engine, SessionLocal, AsyncSessionLocal
+
+    app = FastAPI()
+    fast_query = text("SELECT 1")
+    slow_query = text(SLOW_QUERIES[engine.dialect.name]).bindparams(rows=slow_rows)
+
+    if design == "sync":
+        def run(query):
+            db = SessionLocal()
+            try:
+                return db.execute(query).scalar()
+            finally:
+                db.close()
+
+        @app.get("/fast")
+        async def fast():
+            return {"value": run(fast_query)}
+
+        @app.get("/slow")
+        async def slow():
+            return {"value": run(slow_query)}
+    else:
+        async def run(query):
+            async with AsyncSessionLocal() as db:
+                return (await db.execute(query)).scalar()
+
+        @app.get("/fast")
+        async def fast():
+            return {"value": await run(fast_query)}
+
+        @app.get("/slow")
+        async def slow():
+            return {"value": await run(slow_query)}
+
+    return app
+
+def percentile(values, fraction: float):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def serve(design: str, slow_rows: int, port: int):
+    import uvicorn
+
+    setup_env()
+    uvicorn.run(build_app(design, slow_rows), host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+async def load(base_url: str, duration: float, concurrency: int, slow_clients: int):
+    import httpx
+
+    latencies = []
+    slow_count = 0
+    limits = httpx.Limits(max_connections=concurrency + slow_clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        # Attente du serveur, connexions et pools ouverts hors mesure
+        for _ in range(100):
+            try:
+                (await client.get("/fast")).raise_for_status()
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        (await client.get("/slow")).raise_for_status()
+
+        deadline = time.perf_counter() + duration
+
+        async def fast_client():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                (await client.get("/fast")).raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        async def slow_client():
+            nonlocal slow_count
+            while time.perf_counter() < deadline:
+                (await client.get("/slow")).raise_for_status()
+                slow_count += 1
+
+        await asyncio.gather(
+            *(fast_client() for _ in range(concurrency)),
+            *(slow_client() for _ in range(slow_clients))
+        )
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "slow": slow_count,
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        "max": latencies[-1]
+    }
+
+def measure(design: str, args):
+    server = multiprocessing.get_context("spawn").Process(target=serve, args=(design, args.slow_rows, args.port))
+    server.start()
+    try:
+        return asyncio.run(load(f"http://127.0.0.1:{args.port}", args.duration, args.concurrency, args.slow_clients))
+    finally:
+        server.terminate()
+        server.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de latence des accès base sous charge")
+    parser.add_argument("--duration", type=float, default=10, help="Durée de chaque mesure (secondes)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Clients enchaînant les requêtes rapides")
+    parser.add_argument("--slow-clients", type=int, default=2, help="Clients enchaînant les requêtes lentes")
+    parser.add_argument("--slow-rows", type=int, default=300000, help="Taille de la série comptée par la requête lente")
+    parser.add_argument("--port", type=int, default=8765, help="Port local du serveur de test")
+    args = parser.parse_args()
+
+    setup_env()
+
+    rows = []
+    for design in ("sync", "async"):
+        result = measure(design, args)
+        rows.append((
+            design, result["requests"], result["slow"],
+            f"{result['p50'] * 1000:.1f}", f"{result['p99'] * 1000:.1f}", f"{result['max'] * 1000:.1f}"
+        ))
+
+    print(f"{args.concurrency} clients rapides, {args.slow_clients} clients lents, {args.duration:.0f} s par conception")
+    print_table(("conception", "rapides", "lentes", "p50 (ms)", "p99 (ms)", "max (ms)"), rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Mémoire consommée par un upload : lecture intégrale (ancienne implémentation) contre copie par blocs
+
+Usage : python -m benchmarks.upload_memory [--size-mb 512] [--chunk-size 65536 1048576 8388608]
+
+Chaque mesure tourne dans un processus neuf : la hausse du pic RSS pendant la copie
+de l'UploadFile vers UPLOAD_DIR est attribuable à la seule implémentation testée.
+"""
+from benchmarks.common import setup_env, make_file, isolated, peak_rss_mb, print_table, WORK_DIR
+import argparse
+import asyncio
+import hashlib
+import os
+import time
+
+async def legacy_upload(file, destination: str):
+    """Ancien FileService.upload_file : tout le contenu en mémoire avant l'écriture"""
+    import aiofiles
+
+    async with aiofiles.open(destination, 'wb') as f:
+        content = await file.read()
+        await f.write(content)
+    return len(content), hashlib.sha256(content).hexdigest()
+
+async def chunked_upload(file, destination: str, chunk_size: int):
+    from app.services.storage_service import StorageService
+
+    size, digest, _ = await StorageService.write_upload_stream(file, destination, 1 << 62, 1 << 62, chunk_size)
+    return size, digest
+
+def measure(mode: str, source: str, chunk_size: int):
+    from starlette.datastructures import UploadFile
+    from app.services import storage_service  # noqa: F401 (imports hors mesure)
+    import aiofiles  # noqa: F401
+
+    destination = os.path.join(WORK_DIR, f"upload-{mode}-{chunk_size}")
+    before = peak_rss_mb()
+    started = time.perf_counter()
+
+    with open(source, "rb") as f:
+        file = UploadFile(f, filename="bench.bin")
+        if mode == "legacy":
+            size, digest = asyncio.run(legacy_upload(file, destination))
+        else:
+            size, digest = asyncio.run(chunked_upload(file, destination, chunk_size))
+
+    elapsed = time.perf_counter() - started
+    os.remove(destination)
+
+    return {"size": size, "digest": digest, "rss": peak_rss_mb() - before, "seconds": elapsed}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mémoire de l'upload")
+    parser.add_argument("--size-mb", type=int, default=512, help="Taille du fichier téléversé (Mo)")
+    parser.add_argument("--chunk-size", type=int, nargs="+", default=[65536, 1048576, 8388608], help="Tailles de bloc testées (octets)")
+    args = parser.parse_args()
+
+    setup_env()
+    source = make_file(os.path.join(WORK_DIR, "upload-source"), args.size_mb * 1048576, compressible=False)
+
+    runs = [("legacy", 0)] + [("chunked", size) for size in args.chunk_size]
+    rows = []
+    digests = set()
+
+    try:
+        for mode, chunk_size in runs:
+            result = isolated(measure, mode, source, chunk_size)
+            digests.add(result["digest"])
+            rows.append((
+                mode, chunk_size or "-", f"{result['rss']:.1f}",
+                f"{result['seconds']:.2f}", f"{result['size'] / 1048576 / result['seconds']:.0f}"
+            ))
+    finally:
+        os.remove(source)
+
+    print(f"Fichier de {args.size_mb} Mo")
+    print_table(("mode", "bloc", "pic RSS (Mo)", "durée (s)", "Mo/s"), rows)
+
+    if len(digests) != 1:
+        print("Erreur : les implémentations n'écrivent pas le même contenu")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Téléchargement de dossier en ZIP : archive construite en mémoire (ancienne implémentation) contre flux
+
+Usage : python -m benchmarks.zip_download [--files 8] [--size-mb 512] [--compression auto] [--text]
+
+Chaque mesure tourne dans un processus neuf : pic RSS, délai avant le premier octet
+et durée totale de consommation de l'archive, comme le ferait une StreamingResponse.
+Par défaut les fichiers sont aléatoires (archive aussi grosse que le dossier) ; --text
+utilise des journaux très compressibles.
+"""
+from benchmarks.common import setup_env, make_file, isolated, peak_rss_mb, print_table, WORK_DIR
+import argparse
+import io
+import os
+import time
+import zipfile
+
+def legacy_zip(folder_data):
+    """Ancien StorageService.create_zip_from_folder : archive complète dans un BytesIO"""
+    zip_io = io.BytesIO()
+
+    with zipfile.ZipFile(zip_io, mode='w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for folder_path in folder_data["contents"]["folders"]:
+            zip_file.writestr(folder_path + "/", "")
+
+        for file_path, file_info in folder_data["contents"]["files"].items():
+            zip_file.write(file_info["path"], arcname=file_path)
+
+    zip_io.seek(0)
+    return iter(lambda: zip_io.read(1048576), b"")
+
+def measure(mode: str, folder_data, compression: str):
+    from app.services.storage_service import StorageService
+
+    before = peak_rss_mb()
+    started = time.perf_counter()
+    first_byte = None
+    total = 0
+
+    if mode == "legacy":
+        chunks = legacy_zip(folder_data)
+    else:
+        chunks = StorageService.create_zip_from_folder(folder_data, compression)
+
+    for chunk in chunks:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        total += len(chunk)
+
+    return {
+        "rss": peak_rss_mb() - before,
+        "ttfb": first_byte,
+        "seconds": time.perf_counter() - started,
+        "bytes": total
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du téléchargement de dossier en ZIP")
+    parser.add_argument("--files", type=int, default=8, help="Nombre de fichiers du dossier")
+    parser.add_argument("--size-mb", type=int, default=512, help="Taille totale du dossier (Mo)")
+    parser.add_argument("--compression", choices=["auto", "fast", "best", "store"], default="auto")
+    parser.add_argument("--text", action="store_true", help="Fichiers texte compressibles plutôt qu'aléatoires")
+    args = parser.parse_args()
+
+    setup_env()
+    source_dir = os.path.join(WORK_DIR, "zip-source")
+    os.makedirs(source_dir, exist_ok=True)
+
+    size = args.size_mb * 1048576 // args.files
+    files = {}
+    # Type texte dans tous les cas : les deux implémentations compressent alors chaque membre (DEFLATE)
+    for i in range(args.files):
+        path = make_file(os.path.join(source_dir, f"{i:04d}.dat"), size, compressible=args.text)
+        files[f"data/{i:04d}.dat"] = {"path": path, "size": size, "mime_type": "text/plain"}
+    folder_data = {"id": 0, "name": "bench", "contents": {"files": files, "folders": {"data": "data"}}}
+
+    rows = []
+    try:
+        for mode in ("legacy", "stream"):
+            result = isolated(measure, mode, folder_data, args.compression)
+            rows.append((
+                mode, f"{result['rss']:.1f}", f"{result['ttfb'] * 1000:.1f}",
+                f"{result['seconds']:.2f}", f"{result['bytes'] / 1048576:.1f}"
+            ))
+    finally:
+        for info in files.values():
+            os.remove(info["path"])
+
+    print(f"{args.files} fichiers, {args.size_mb} Mo au total")
+    print_table(("mode", "pic RSS (Mo)", "premier octet (ms)", "durée (s)", "archive (Mo)"), rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Débit des archives de dossiers selon le nombre de workers de compression
+
+Usage : python -m benchmarks.zip_parallel [--files 64] [--size-mb 256] [--workers 1 2 4 8] [--executor thread process]
+
+Dossier de journaux texte (membres DEFLATE sous ZIP_PARALLEL_MAX_MEMBER_SIZE) : 0 worker
+correspond à la compression séquentielle dans le flux, sans pool.
+"""
+from benchmarks.common import setup_env, make_file, print_table, WORK_DIR
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import argparse
+import multiprocessing
+import os
+import time
+
+def run(files, executor, workers: int):
+    from app.config import settings
+    from app.utils.zipstream import iter_zip
+
+    options = {}
+    if executor is not None:
+        options = {
+            "executor": executor,
+            "parallel_max_size": settings.ZIP_PARALLEL_MAX_MEMBER_SIZE,
+            "lookahead": workers * 2
+        }
+
+    started = time.perf_counter()
+    total = sum(len(chunk) for chunk in iter_zip(files, chunk_size=settings.UPLOAD_CHUNK_SIZE, **options))
+    return time.perf_counter() - started, total
+
+def make_executor(kind: str, workers: int):
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return ThreadPoolExecutor(max_workers=workers)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la compression ZIP parallèle")
+    parser.add_argument("--files", type=int, default=64, help="Nombre de fichiers du dossier")
+    parser.add_argument("--size-mb", type=int, default=256, help="Taille totale du dossier (Mo)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Nombres de workers testés")
+    parser.add_argument("--executor", choices=["thread", "process"], nargs="+", default=["thread", "process"])
+    args = parser.parse_args()
+
+    setup_env()
+    source_dir = os.path.join(WORK_DIR, "zip-parallel")
+    os.makedirs(source_dir, exist_ok=True)
+
+    size = args.size_mb * 1048576 // args.files
+    files = [
+        {"arcname": f"logs/{i:04d}.log", "path": make_file(os.path.join(source_dir, f"{i:04d}.log"), size), "size": size}
+        for i in range(args.files)
+    ]
+
+    try:
+        baseline, archive_size = run(files, None, 0)
+        rows = [("-", 0, f"{baseline:.2f}", f"{args.size_mb / baseline:.0f}", "1.00")]
+
+        for kind in args.executor:
+            for workers in args.workers:
+                executor = make_executor(kind, workers)
+                try:
+                    # Démarrage des workers hors mesure
+                    list(executor.map(abs, range(workers)))
+                    elapsed, total = run(files, executor, workers)
+                finally:
+                    executor.shutdown()
+
+                if total != archive_size:
+                    print(f"Erreur : archive de {total} octets au lieu de {archive_size} ({kind}, {workers} workers)")
+                    raise SystemExit(1)
+
+                rows.append((kind, workers, f"{elapsed:.2f}", f"{args.size_mb / elapsed:.0f}", f"{baseline / elapsed:.2f}"))
+    finally:
+        for member in files:
+            os.remove(member["path"])
+
+    print(f"{args.files} fichiers, {args.size_mb} Mo au total, {os.cpu_count()} CPU")
+    print_table(("pool", "workers", "durée (s)", "Mo/s", "accélération"), rows)
+
+if __name__ == "__main__":
+    main()
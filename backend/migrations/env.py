@@ -0,0 +1,59 @@
+from logging.config import fileConfig
+from alembic import context
+from app.config import settings
+from app.database import Base, engine, import_models
+
+import_models()
+
+config = context.config
+
+# Pas de reconfiguration des logs quand les migrations sont lancées par l'application (init_db)
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Index propres à un dialecte (info["dialect"], ex. trigrammes PostgreSQL) ignorés ailleurs par l'autogénération
+    dialect = object.info.get("dialect") if type_ == "index" and not reflected else None
+    return dialect is None or dialect == context.get_context().dialect.name
+
+def run_migrations_offline():
+    """Génère le SQL sans connexion (alembic upgrade head --sql)"""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+        render_as_batch=settings.DATABASE_URL.startswith("sqlite")
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    # Connexion fournie par init_db, sinon connexion dédiée sur le moteur de l'application
+    connection = config.attributes.get("connection")
+
+    if connection is None:
+        with engine.connect() as connection:
+            _run_with_connection(connection)
+    else:
+        _run_with_connection(connection)
+
+def _run_with_connection(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        render_as_batch=connection.dialect.name == "sqlite"
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,107 @@
+"""Stockage adressé par contenu et sessions d'upload, ajoutés avant Alembic
+
+- table blobs, colonne files.content_hash et son index
+- unicité de files.storage_path retirée (plusieurs fichiers partagent un blob)
+- table upload_sessions
+
+Une base antérieure à Alembic peut déjà contenir tout ou partie de ces éléments (create_all) :
+seuls les éléments manquants sont ajoutés.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18 00:42:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# Nom donné par batch_alter_table (SQLite) à la contrainte d'unicité anonyme de create_all
+NAMING_CONVENTION = {"uq": "uq_%(table_name)s_%(column_0_name)s"}
+
+
+def _schema():
+    # Génération SQL hors connexion (--sql) : schéma de la révision 0001
+    if op.get_context().as_sql:
+        return {"users", "folders", "files", "shares"}, set(), set(), [{"name": None}]
+
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    columns = {column["name"] for column in inspector.get_columns("files")}
+    indexes = {index["name"] for index in inspector.get_indexes("files")}
+    unique = [
+        constraint for constraint in inspector.get_unique_constraints("files")
+        if constraint["column_names"] == ["storage_path"]
+    ]
+    return tables, columns, indexes, unique
+
+
+def _unique_name(constraint):
+    if constraint["name"]:
+        return constraint["name"]
+    # Nom implicite de PostgreSQL, nom de la convention ci-dessus sous SQLite
+    if op.get_context().dialect.name == "postgresql":
+        return "files_storage_path_key"
+    return "uq_files_storage_path"
+
+
+def upgrade():
+    tables, columns, indexes, unique = _schema()
+
+    if 'blobs' not in tables:
+        op.create_table(
+            'blobs',
+            sa.Column('digest', sa.String(length=64), nullable=False),
+            sa.Column('size', sa.BigInteger(), nullable=False),
+            sa.Column('storage_path', sa.String(), nullable=False),
+            sa.Column('ref_count', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint('digest'),
+            sa.UniqueConstraint('storage_path')
+        )
+
+    if unique or 'content_hash' not in columns:
+        with op.batch_alter_table('files', naming_convention=NAMING_CONVENTION) as batch_op:
+            for constraint in unique:
+                batch_op.drop_constraint(_unique_name(constraint), type_='unique')
+
+            if 'content_hash' not in columns:
+                batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+                batch_op.create_foreign_key('fk_files_content_hash_blobs', 'blobs', ['content_hash'], ['digest'])
+
+    if 'ix_files_content_hash' not in indexes:
+        op.create_index('ix_files_content_hash', 'files', ['content_hash'])
+
+    if 'upload_sessions' not in tables:
+        op.create_table(
+            'upload_sessions',
+            sa.Column('id', sa.String(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('folder_id', sa.Integer(), nullable=True),
+            sa.Column('filename', sa.String(), nullable=False),
+            sa.Column('total_size', sa.BigInteger(), nullable=False),
+            sa.Column('chunk_size', sa.Integer(), nullable=False),
+            sa.Column('total_chunks', sa.Integer(), nullable=False),
+            sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(['folder_id'], ['folders.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_upload_sessions_id', 'upload_sessions', ['id'])
+
+
+def downgrade():
+    op.drop_index('ix_upload_sessions_id', table_name='upload_sessions')
+    op.drop_table('upload_sessions')
+    op.drop_index('ix_files_content_hash', table_name='files')
+
+    with op.batch_alter_table('files') as batch_op:
+        batch_op.drop_column('content_hash')
+        batch_op.create_unique_constraint('files_storage_path_key', ['storage_path'])
+
+    op.drop_table('blobs')
@@ -0,0 +1,66 @@
+"""Index composites et partiels des requêtes les plus fréquentes
+
+- listing d'un dossier : (user_id, folder_id | parent_id, is_deleted), racine incluse (IS NULL)
+- corbeille : index partiels réduits aux lignes supprimées
+- parcours d'arborescence (CTE) et purge : (parent_id | folder_id, is_deleted)
+- partages d'un fichier, expiration des sessions d'upload
+
+Sous PostgreSQL les index sont créés avec CONCURRENTLY : pas de verrou d'écriture sur les grosses tables
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-18 00:45:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001a'
+branch_labels = None
+depends_on = None
+
+TRASH_PREDICATE = {
+    "postgresql_where": sa.text("is_deleted = true"),
+    "sqlite_where": sa.text("is_deleted = 1"),
+}
+
+INDEXES = [
+    ("ix_files_user_folder_deleted", "files", ["user_id", "folder_id", "is_deleted"], {}),
+    ("ix_files_folder_deleted", "files", ["folder_id", "is_deleted"], {}),
+    ("ix_files_user_trash", "files", ["user_id", "deleted_at"], TRASH_PREDICATE),
+    ("ix_folders_user_parent_deleted", "folders", ["user_id", "parent_id", "is_deleted"], {}),
+    ("ix_folders_parent_deleted", "folders", ["parent_id", "is_deleted"], {}),
+    ("ix_folders_user_trash", "folders", ["user_id", "deleted_at"], TRASH_PREDICATE),
+    ("ix_shares_file_id", "shares", ["file_id"], {}),
+    ("ix_upload_sessions_expires_at", "upload_sessions", ["expires_at"], {}),
+]
+
+
+def _existing_indexes(table):
+    # Génération SQL hors connexion (--sql) : rien à inspecter
+    if op.get_context().as_sql:
+        return set()
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    concurrently = op.get_bind().dialect.name == "postgresql"
+
+    # Hors transaction : CREATE INDEX CONCURRENTLY l'exige
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            # Base migrée depuis create_all : l'index peut déjà exister
+            if name in _existing_indexes(table):
+                continue
+
+            op.create_index(name, table, columns, postgresql_concurrently=concurrently, **options)
+
+
+def downgrade():
+    concurrently = op.get_bind().dialect.name == "postgresql"
+
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            if name in _existing_indexes(table):
+                op.drop_index(name, table_name=table, postgresql_concurrently=concurrently)
@@ -0,0 +1,63 @@
+"""Index de listing étendus à la clé de tri par défaut (name, id)
+
+La pagination par curseur lit le dossier dans l'ordre (name, id) : l'index
+(user_id, folder_id | parent_id, is_deleted, name, id) sert à la fois le filtre,
+le tri et la reprise après curseur, sans tri de tout le dossier à chaque page.
+Il remplace l'index de listing de 0002 dont il reprend le préfixe.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 02:10:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# (ancien index, nouvel index, table, colonnes du nouvel index, colonnes de l'ancien)
+REPLACEMENTS = [
+    (
+        "ix_files_user_folder_deleted", "ix_files_user_folder_name", "files",
+        ["user_id", "folder_id", "is_deleted", "name", "id"],
+        ["user_id", "folder_id", "is_deleted"]
+    ),
+    (
+        "ix_folders_user_parent_deleted", "ix_folders_user_parent_name", "folders",
+        ["user_id", "parent_id", "is_deleted", "name", "id"],
+        ["user_id", "parent_id", "is_deleted"]
+    ),
+]
+
+
+def _existing_indexes(table):
+    # Génération SQL hors connexion (--sql) : rien à inspecter
+    if op.get_context().as_sql:
+        return set()
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _swap(table, drop_name, create_name, columns):
+    concurrently = op.get_bind().dialect.name == "postgresql"
+
+    # Nouvel index créé avant la suppression de l'ancien : le listing reste indexé pendant la migration
+    if create_name not in _existing_indexes(table):
+        op.create_index(create_name, table, columns, postgresql_concurrently=concurrently)
+
+    if drop_name in _existing_indexes(table):
+        op.drop_index(drop_name, table_name=table, postgresql_concurrently=concurrently)
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for old, new, table, new_columns, _ in REPLACEMENTS:
+            _swap(table, old, new, new_columns)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for old, new, table, _, old_columns in REPLACEMENTS:
+            _swap(table, new, old, old_columns)
@@ -0,0 +1,97 @@
+"""Index de recherche par nom : pg_trgm (GIN) sous PostgreSQL, table search_grams ailleurs
+
+PostgreSQL : extension pg_trgm et index GIN gin_trgm_ops sur files.name et
+folders.name, qui servent ILIKE '%terme%' sans parcourir les fichiers de l'utilisateur.
+Autres bases (SQLite) : index n-grammes calculé en Python, alimenté ici pour les
+noms existants puis tenu à jour par l'application (app.services.search_service).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 03:20:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+TRIGRAM_INDEXES = [
+    ("ix_files_name_trgm", "files"),
+    ("ix_folders_name_trgm", "folders"),
+]
+
+BATCH_SIZE = 1000
+
+
+def _name_grams(name):
+    # Copie figée de SearchService.name_grams : la migration ne dépend pas des évolutions du service
+    text = " ".join(name.casefold().split()) + "  "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _backfill(kind, table):
+    bind = op.get_bind()
+    grams = sa.table(
+        "search_grams",
+        sa.column("kind"), sa.column("item_id"), sa.column("gram"), sa.column("user_id")
+    )
+    source = sa.table(table, sa.column("id"), sa.column("user_id"), sa.column("name"))
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(source.c.id, source.c.user_id, source.c.name)
+            .where(source.c.id > last_id)
+            .order_by(source.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+
+        bind.execute(grams.insert(), [
+            {"kind": kind, "item_id": item_id, "gram": gram, "user_id": user_id}
+            for item_id, user_id, name in rows
+            for gram in _name_grams(name)
+        ])
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    op.create_table(
+        'search_grams',
+        sa.Column('kind', sa.String(length=6), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('gram', sa.String(length=3), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('kind', 'item_id', 'gram')
+    )
+    op.create_index('ix_search_grams_user_gram', 'search_grams', ['user_id', 'kind', 'gram', 'item_id'])
+
+    if op.get_bind().dialect.name != "postgresql":
+        _backfill("folder", "folders")
+        _backfill("file", "files")
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        for name, table in TRIGRAM_INDEXES:
+            op.create_index(
+                name, table, ["name"],
+                postgresql_using="gin",
+                postgresql_ops={"name": "gin_trgm_ops"},
+                postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table in TRIGRAM_INDEXES:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+    op.drop_index('ix_search_grams_user_gram', table_name='search_grams')
+    op.drop_table('search_grams')
@@ -0,0 +1,44 @@
+"""Index inversé du contenu des documents (content_documents, content_terms)
+
+Postings par empreinte de blob : un contenu dédupliqué n'est indexé qu'une fois,
+renommer, déplacer ou restaurer un fichier ne demande aucune réindexation.
+Les blobs existants sont indexés après la migration par le rattrapage périodique
+(app.services.content_index_service).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 05:10:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'content_documents',
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('term_count', sa.Integer(), nullable=False),
+        sa.Column('indexed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('digest')
+    )
+    op.create_table(
+        'content_terms',
+        sa.Column('term', sa.String(length=64), nullable=False),
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('frequency', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('term', 'digest')
+    )
+    op.create_index('ix_content_terms_digest', 'content_terms', ['digest'])
+
+
+def downgrade():
+    op.drop_index('ix_content_terms_digest', table_name='content_terms')
+    op.drop_table('content_terms')
+    op.drop_table('content_documents')
@@ -0,0 +1,43 @@
+"""Réservations de quota des uploads en cours (users.storage_reserved, quota_reservations)
+
+L'espace d'un upload est réservé avant l'écriture des octets par un UPDATE conditionnel
+(storage_used + storage_reserved + taille <= storage_quota), puis converti en espace utilisé
+à la création du fichier ou libéré en cas d'échec, d'abandon ou d'expiration.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 09:40:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('storage_reserved', sa.BigInteger(), server_default='0', nullable=False))
+
+    op.create_table(
+        'quota_reservations',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_quota_reservations_expires_at', 'quota_reservations', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_quota_reservations_expires_at', table_name='quota_reservations')
+    op.drop_table('quota_reservations')
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('storage_reserved')
@@ -0,0 +1,68 @@
+"""Statistiques de stockage par utilisateur (storage_stats)
+
+Compteurs par catégorie (type MIME principal des fichiers, "folder") et par état
+(actif ou corbeille), tenus à jour par les services dans la transaction de chaque
+modification. Remplis ici depuis files et folders ; la réconciliation périodique
+(app.services.stats_service) corrige ensuite toute dérive.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 11:20:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+# Figé à la date de la migration (voir app.services.stats_service.category)
+TOP_LEVEL_TYPES = {"application", "audio", "font", "image", "model", "text", "video"}
+
+
+def _category(mime_type):
+    top_level = (mime_type or "").partition("/")[0].lower()
+    return top_level if top_level in TOP_LEVEL_TYPES else "other"
+
+
+def upgrade():
+    storage_stats = op.create_table(
+        'storage_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=16), nullable=False),
+        sa.Column('trashed', sa.Boolean(), nullable=False),
+        sa.Column('item_count', sa.BigInteger(), nullable=False),
+        sa.Column('bytes', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'category', 'trashed')
+    )
+
+    # Un agrégat par table : regroupement par type MIME complet, catégorie calculée en Python
+    connection = op.get_bind()
+    stats = {}
+
+    for user_id, mime_type, is_deleted, count, size in connection.execute(sa.text(
+        "SELECT user_id, mime_type, is_deleted, COUNT(*), COALESCE(SUM(size), 0) "
+        "FROM files GROUP BY user_id, mime_type, is_deleted"
+    )):
+        entry = stats.setdefault((user_id, _category(mime_type), bool(is_deleted)), [0, 0])
+        entry[0] += count
+        entry[1] += size
+
+    for user_id, is_deleted, count in connection.execute(sa.text(
+        "SELECT user_id, is_deleted, COUNT(*) FROM folders GROUP BY user_id, is_deleted"
+    )):
+        entry = stats.setdefault((user_id, "folder", bool(is_deleted)), [0, 0])
+        entry[0] += count
+
+    if stats:
+        op.bulk_insert(storage_stats, [
+            {"user_id": user_id, "category": category, "trashed": trashed, "item_count": count, "bytes": size}
+            for (user_id, category, trashed), (count, size) in stats.items()
+        ])
+
+
+def downgrade():
+    op.drop_table('storage_stats')
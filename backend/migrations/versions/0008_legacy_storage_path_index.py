@@ -0,0 +1,42 @@
+"""Index partiel des chemins des fichiers antérieurs à la déduplication
+
+Le nettoyage des orphelins (app.services.gc_service) vérifie par lots si un chemin
+du stockage est encore référencé : les blobs par empreinte (clé primaire), les
+fichiers sans empreinte par leur chemin. L'index est limité à ces derniers
+(content_hash IS NULL) : aucun coût d'écriture pour les nouveaux uploads.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 13:05:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+LEGACY_PREDICATE = {
+    "postgresql_where": sa.text("content_hash IS NULL"),
+    "sqlite_where": sa.text("content_hash IS NULL"),
+}
+
+
+def upgrade():
+    concurrently = op.get_bind().dialect.name == "postgresql"
+
+    # Hors transaction : CREATE INDEX CONCURRENTLY l'exige
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_files_legacy_storage_path", "files", ["storage_path"],
+            postgresql_concurrently=concurrently, **LEGACY_PREDICATE
+        )
+
+
+def downgrade():
+    concurrently = op.get_bind().dialect.name == "postgresql"
+
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_files_legacy_storage_path", table_name="files", postgresql_concurrently=concurrently)
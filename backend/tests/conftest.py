@@ -0,0 +1,71 @@
+"""
+Configuration des tests : base SQLite et UPLOAD_DIR temporaires, fixés avant l'import de l'application
+
+Usage : cd backend && python -m pytest
+TEST_DATABASE_URL : base à utiliser à la place de SQLite (PostgreSQL dédiée aux tests, migrée au démarrage)
+"""
+import os
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp(prefix="supfile-tests-")
+
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{os.path.join(_tmp_dir, 'supfile.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(_tmp_dir, "uploads")
+os.environ["SECRET_KEY"] = "test-secret-key"
+os.environ["ENVIRONMENT"] = "test"
+os.environ["GC_INTERVAL"] = "0"
+os.environ["CONTENT_INDEX_ENABLED"] = "false"
+
+import uuid
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from app.main import app
+from app.database import AsyncSessionLocal
+from app.models.user import User
+
+os.makedirs(os.environ["UPLOAD_DIR"], exist_ok=True)
+
+@pytest.fixture(scope="session")
+def app_client():
+    """
+    Application démarrée (migrations comprises) une fois pour toute la session : une seule boucle
+    d'événements (portal du client), à laquelle le pool de connexions asynchrones reste lié
+    """
+    with TestClient(app) as test_client:
+        yield test_client
+
+def _new_user():
+    # Utilisateur neuf par test : aucune remise à zéro de la base entre les tests
+    return {"email": f"{uuid.uuid4().hex[:12]}@example.com", "password": "secret123", "full_name": "Test"}
+
+def register_user(client):
+    """Inscrit un utilisateur neuf et authentifie le client en son nom"""
+    response = client.post("/api/v1/auth/register", json=_new_user())
+    assert response.status_code == 201, response.text
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    client.user_id = client.get("/api/v1/users/me").json()["id"]
+    return client
+
+@pytest.fixture
+def client(app_client):
+    """Client HTTP authentifié (utilisateur dédié au test)"""
+    return register_user(app_client)
+
+def run_async(client, coroutine_function, *args):
+    """Exécute une coroutine dans la boucle de l'application (celle du pool de connexions)"""
+    return client.portal.call(coroutine_function, *args)
+
+async def async_client():
+    """Client asynchrone sur l'application (requêtes réellement concurrentes), authentifié"""
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    response = await client.post("/api/v1/auth/register", json=_new_user())
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    client.user_id = (await client.get("/api/v1/users/me")).json()["id"]
+    return client
+
+async def set_quota(user_id: int, quota: int):
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(User).where(User.id == user_id).values(storage_quota=quota))
+        await db.commit()
@@ -0,0 +1,34 @@
+import hashlib
+import os
+from sqlalchemy import select
+from app.database import AsyncSessionLocal
+from app.models.blob import Blob
+from app.models.folder import Folder
+from tests.conftest import run_async
+
+async def _blob_exists(digest: str):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(Blob.digest).where(Blob.digest == digest))).scalar_one_or_none() is not None
+
+async def _parent_id(folder_id: int):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(Folder.parent_id).where(Folder.id == folder_id))).scalar_one()
+
+def test_permanent_non_recursive_delete_purges_trashed_files(client):
+    content = os.urandom(1000)
+    digest = hashlib.sha256(content).hexdigest()
+
+    folder_id = client.post("/api/v1/folders/", json={"name": "vide"}).json()["id"]
+    child_id = client.post("/api/v1/folders/", json={"name": "enfant", "parent_id": folder_id}).json()["id"]
+    response = client.post("/api/v1/files/upload", data={"folder_id": folder_id}, files={"file": ("f.bin", content)})
+    assert response.status_code == 201, response.text
+    assert client.delete(f"/api/v1/files/{response.json()['id']}").status_code == 200
+    assert client.delete(f"/api/v1/folders/{child_id}?recursive=false").status_code == 200
+
+    response = client.delete(f"/api/v1/folders/{folder_id}?permanent=true&recursive=false")
+
+    assert response.status_code == 200, response.text
+    assert client.get("/api/v1/users/me").json()["storage_used"] == 0
+    assert not run_async(client, _blob_exists, digest)
+    # Sous-dossier en corbeille conservé, détaché du dossier supprimé
+    assert run_async(client, _parent_id, child_id) is None
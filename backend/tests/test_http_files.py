@@ -0,0 +1,226 @@
+import asyncio
+import pytest
+from email.utils import format_datetime
+from starlette.requests import Request
+from app.config import settings
+from app.utils.http_files import parse_range, file_response, MAX_RANGES
+import datetime
+
+CACHE_CONTROL = "private, max-age=0"
+
+def _request(headers: dict):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    return Request(scope)
+
+def get(path: str, headers: dict = None, digest: str = None):
+    """Réponse de file_response envoyée dans un faux serveur ASGI : (statut, en-têtes, corps)"""
+    request = _request(headers or {})
+    response = file_response(request, path, "text/plain", CACHE_CONTROL, digest=digest)
+    messages = []
+
+    async def receive():
+        # Client toujours connecté : la réponse est envoyée en entier
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(response(request.scope, receive, send))
+
+    start = messages[0]
+    response_headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], response_headers, body
+
+@pytest.fixture
+def content(tmp_path):
+    data = bytes(range(256)) * 4
+    path = tmp_path / "file.bin"
+    path.write_bytes(data)
+    return str(path), data
+
+# parse_range
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", [(0, 99)]),
+    ("bytes=100-", [(100, 999)]),
+    ("bytes=-100", [(900, 999)]),
+    ("bytes=-5000", [(0, 999)]),
+    ("bytes=900-5000", [(900, 999)]),
+    ("bytes=0-10, 5-20, 30-40", [(0, 20), (30, 40)]),
+    ("bytes=10-19,0-9", [(0, 19)]),
+    ("BYTES = 0-0", [(0, 0)]),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5000-6000", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    assert parse_range(header, 1000) == []
+
+@pytest.mark.parametrize("header", ["items=0-1", "bytes=", "bytes=5-1", "bytes=a-b", "bytes=0", "bytes=-x"])
+def test_parse_range_invalid(header):
+    assert parse_range(header, 1000) is None
+
+def test_parse_range_too_many_ranges():
+    header = "bytes=" + ",".join(f"{i * 10}-{i * 10 + 1}" for i in range(MAX_RANGES + 1))
+    assert parse_range(header, 1000) is None
+
+def test_parse_range_at_largest_file_size():
+    size = settings.MAX_FILE_SIZE
+    assert parse_range("bytes=-1", size) == [(size - 1, size - 1)]
+    assert parse_range(f"bytes={size - 10}-", size) == [(size - 10, size - 1)]
+    assert parse_range(f"bytes={size}-", size) == []
+
+# Réponses
+
+def test_full_response(content):
+    path, data = content
+    status, headers, body = get(path)
+
+    assert status == 200
+    assert body == data
+    assert headers["accept-ranges"] == "bytes"
+    assert headers["content-length"] == str(len(data))
+    assert headers["cache-control"] == CACHE_CONTROL
+    assert headers["etag"].startswith('"')
+
+def test_etag_from_digest(content):
+    path, _ = content
+    _, headers, _ = get(path, digest="abc123")
+    assert headers["etag"] == '"abc123"'
+
+def test_single_range(content):
+    path, data = content
+    status, headers, body = get(path, {"Range": "bytes=10-19"})
+
+    assert status == 206
+    assert body == data[10:20]
+    assert headers["content-range"] == f"bytes 10-19/{len(data)}"
+    assert headers["content-length"] == "10"
+
+def test_multiple_ranges(content):
+    path, data = content
+    status, headers, body = get(path, {"Range": "bytes=0-4,100-104"})
+
+    assert status == 206
+    media_type, _, boundary = headers["content-type"].partition("; boundary=")
+    assert media_type == "multipart/byteranges"
+    assert headers["content-length"] == str(len(body))
+
+    parts = body.split(f"--{boundary}".encode())
+    assert parts[-1] == b"--\r\n"
+    assert f"Content-Range: bytes 0-4/{len(data)}".encode() in parts[1]
+    assert parts[1].endswith(b"\r\n\r\n" + data[0:5] + b"\r\n")
+    assert f"Content-Range: bytes 100-104/{len(data)}".encode() in parts[2]
+    assert parts[2].endswith(b"\r\n\r\n" + data[100:105] + b"\r\n")
+
+def test_unsatisfiable_range(content):
+    path, data = content
+    status, headers, body = get(path, {"Range": f"bytes={len(data)}-"})
+
+    assert status == 416
+    assert headers["content-range"] == f"bytes */{len(data)}"
+    assert body == b""
+
+def test_invalid_range_serves_full_file(content):
+    path, data = content
+    status, _, body = get(path, {"Range": "bytes=5-1"})
+    assert status == 200
+    assert body == data
+
+# Requêtes conditionnelles
+
+@pytest.mark.parametrize("if_none_match", ['{etag}', 'W/{etag}', '"other", {etag}', "*"])
+def test_if_none_match_not_modified(content, if_none_match):
+    path, _ = content
+    _, headers, _ = get(path)
+
+    status, not_modified_headers, body = get(path, {"If-None-Match": if_none_match.format(etag=headers["etag"])})
+    assert status == 304
+    assert body == b""
+    assert not_modified_headers["etag"] == headers["etag"]
+
+def test_if_none_match_changed(content):
+    path, data = content
+    status, _, body = get(path, {"If-None-Match": '"other"'})
+    assert status == 200
+    assert body == data
+
+def test_if_modified_since(content):
+    path, data = content
+    _, headers, _ = get(path)
+
+    assert get(path, {"If-Modified-Since": headers["last-modified"]})[0] == 304
+
+    past = format_datetime(datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc), usegmt=True)
+    status, _, body = get(path, {"If-Modified-Since": past})
+    assert status == 200
+    assert body == data
+
+    # Date invalide : ignorée
+    assert get(path, {"If-Modified-Since": "hier"})[0] == 200
+
+def test_if_none_match_takes_precedence_over_if_modified_since(content):
+    path, _ = content
+    _, headers, _ = get(path)
+
+    status, _, _ = get(path, {"If-None-Match": '"other"', "If-Modified-Since": headers["last-modified"]})
+    assert status == 200
+
+def test_if_range(content):
+    path, data = content
+    _, headers, _ = get(path)
+
+    # Contenu inchangé (ETag ou date) : la plage est servie
+    assert get(path, {"Range": "bytes=0-9", "If-Range": headers["etag"]})[0] == 206
+    assert get(path, {"Range": "bytes=0-9", "If-Range": headers["last-modified"]})[0] == 206
+
+    # Contenu changé, ou ETag faible (comparaison forte) : fichier entier
+    for if_range in ('"other"', f"W/{headers['etag']}"):
+        status, _, body = get(path, {"Range": "bytes=0-9", "If-Range": if_range})
+        assert status == 200
+        assert body == data
+
+# Plus grande taille de fichier acceptée (fichier creux : pas d'écriture réelle)
+
+@pytest.fixture
+def largest_file(tmp_path):
+    path = tmp_path / "largest.bin"
+    with open(path, "wb") as f:
+        f.truncate(settings.MAX_FILE_SIZE)
+        f.seek(settings.MAX_FILE_SIZE - 4)
+        f.write(b"last")
+    return str(path)
+
+def test_range_on_largest_file(largest_file):
+    size = settings.MAX_FILE_SIZE
+    status, headers, body = get(largest_file, {"Range": "bytes=-4"})
+
+    assert status == 206
+    assert body == b"last"
+    assert headers["content-range"] == f"bytes {size - 4}-{size - 1}/{size}"
+
+def test_range_across_4gib_on_largest_file(largest_file):
+    size = settings.MAX_FILE_SIZE
+    start = 2 ** 32 - 8
+    status, headers, body = get(largest_file, {"Range": f"bytes={start}-{start + 15}"})
+
+    assert status == 206
+    assert body == b"\0" * 16
+    assert headers["content-range"] == f"bytes {start}-{start + 15}/{size}"
+    assert headers["content-length"] == "16"
+
+def test_multiple_ranges_on_largest_file(largest_file):
+    size = settings.MAX_FILE_SIZE
+    status, headers, body = get(largest_file, {"Range": "bytes=0-1,-4"})
+
+    assert status == 206
+    assert headers["content-length"] == str(len(body))
+    assert f"Content-Range: bytes {size - 4}-{size - 1}/{size}".encode() in body
+    assert b"\r\n\r\nlast\r\n" in body
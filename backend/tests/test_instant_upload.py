@@ -0,0 +1,92 @@
+import hashlib
+import os
+import pytest
+from app.config import settings
+from app.services.file_service import FileService
+from tests.conftest import register_user
+
+CONTENT = os.urandom(1000)
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(settings, "INSTANT_UPLOAD_ENABLED", True)
+    monkeypatch.setattr(settings, "INSTANT_UPLOAD_PROOF_BYTES", 64)
+
+def _challenge(client, digest: str = DIGEST, size: int = len(CONTENT)):
+    response = client.post("/api/v1/files/upload/instant/challenge", json={"digest": digest, "size": size})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def _proof(challenge, content: bytes = CONTENT):
+    data = content[challenge["offset"]:challenge["offset"] + challenge["length"]]
+    return hashlib.sha256(bytes.fromhex(challenge["nonce"]) + data).hexdigest()
+
+def _instant(client, challenge, proof: str, digest: str = DIGEST, size: int = len(CONTENT)):
+    return client.post("/api/v1/files/upload/instant", json={
+        "name": "copie.bin", "size": size, "digest": digest, "challenge": challenge["challenge"], "proof": proof
+    })
+
+def _storage_used(client):
+    return client.get("/api/v1/users/me").json()["storage_used"]
+
+@pytest.fixture
+def stored(client, enabled):
+    """Contenu téléversé par un autre utilisateur, puis client authentifié en tant qu'utilisateur neuf"""
+    response = client.post("/api/v1/files/upload", files={"file": ("original.bin", CONTENT)})
+    assert response.status_code == 201, response.text
+    return register_user(client)
+
+def test_disabled_by_default(client):
+    assert client.post("/api/v1/files/upload/instant/challenge", json={"digest": DIGEST, "size": 1}).status_code == 404
+
+def test_instant_upload_with_valid_proof(stored):
+    challenge = _challenge(stored)
+    assert challenge["length"] == 64
+
+    response = _instant(stored, challenge, _proof(challenge))
+
+    assert response.status_code == 201, response.text
+    assert stored.get(f"/api/v1/files/{response.json()['id']}/download").content == CONTENT
+    assert _storage_used(stored) == len(CONTENT)
+
+def test_wrong_proof_looks_like_unknown_content(stored):
+    wrong = _instant(stored, _challenge(stored), "0" * 64)
+
+    unknown_digest = hashlib.sha256(b"inconnu").hexdigest()
+    unknown_challenge = _challenge(stored, unknown_digest, 7)
+    unknown = _instant(stored, unknown_challenge, _proof(unknown_challenge, b"inconnu"), unknown_digest, 7)
+
+    assert wrong.status_code == unknown.status_code == 404
+    assert wrong.json() == unknown.json()
+    assert _storage_used(stored) == 0
+
+def test_challenge_is_bound_to_content_and_user(stored):
+    challenge = _challenge(stored)
+    proof = _proof(challenge)
+
+    assert _instant(stored, challenge, proof, size=len(CONTENT) - 1).status_code == 400
+
+    register_user(stored)
+    assert _instant(stored, challenge, proof).status_code == 400
+
+def test_challenge_is_not_an_access_token(stored):
+    challenge = _challenge(stored)
+
+    response = stored.get("/api/v1/users/me", headers={"Authorization": f"Bearer {challenge['challenge']}"})
+
+    assert response.status_code == 401
+
+def test_unknown_content_still_computes_a_proof(stored, monkeypatch):
+    calls = []
+    range_proof = FileService._range_proof
+    monkeypatch.setattr(FileService, "_range_proof", staticmethod(lambda *args: calls.append(args[0]) or range_proof(*args)))
+
+    _instant(stored, _challenge(stored), "0" * 64)
+    unknown_digest = hashlib.sha256(b"inconnu").hexdigest()
+    unknown_challenge = _challenge(stored, unknown_digest, 7)
+    _instant(stored, unknown_challenge, _proof(unknown_challenge, bytes(7)), unknown_digest, 7)
+
+    # Contenu connu : plage lue sur disque ; inconnu : plage fictive, même calcul, jamais acceptée
+    assert calls[0] is not None and calls[1] is None
+    assert _storage_used(stored) == 0
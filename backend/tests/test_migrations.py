@@ -0,0 +1,48 @@
+import pytest
+from alembic import command
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+from app import database
+
+@pytest.fixture
+def legacy_engine(tmp_path, monkeypatch):
+    """Base SQLite séparée, utilisée par init_db et par les migrations à la place de celle des tests"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    yield engine
+    engine.dispose()
+
+def _pre_alembic_database(engine, revision: str):
+    # Schéma d'une révision, sans alembic_version : base créée par create_all avant les migrations
+    command.upgrade(database.alembic_config(), revision)
+
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE alembic_version"))
+        connection.execute(text(
+            "INSERT INTO users (id, email, hashed_password, is_active, storage_used, storage_quota) "
+            "VALUES (1, 'ancien@example.com', 'x', 1, 11, 1000)"
+        ))
+        connection.execute(text(
+            "INSERT INTO files (id, name, original_name, size, storage_path, user_id, is_deleted) "
+            "VALUES (1, 'f.txt', 'f.txt', 11, '/ancien/chemin', 1, 0)"
+        ))
+
+# 0001 : schéma d'origine ; 0001a : base créée après l'ajout des blobs et des sessions d'upload
+@pytest.mark.parametrize("revision", ["0001", "0001a"])
+def test_init_db_upgrades_pre_alembic_database(legacy_engine, revision):
+    _pre_alembic_database(legacy_engine, revision)
+
+    database.init_db()
+
+    inspector = inspect(legacy_engine)
+    head = ScriptDirectory.from_config(database.alembic_config()).get_current_head()
+
+    assert "content_hash" in {column["name"] for column in inspector.get_columns("files")}
+    assert "storage_reserved" in {column["name"] for column in inspector.get_columns("users")}
+    assert not [c for c in inspector.get_unique_constraints("files") if c["column_names"] == ["storage_path"]]
+    assert {"blobs", "upload_sessions", "search_grams", "quota_reservations", "storage_stats"} <= set(inspector.get_table_names())
+
+    with legacy_engine.connect() as connection:
+        assert connection.execute(text("SELECT version_num FROM alembic_version")).scalar() == head
+        assert connection.execute(text("SELECT storage_path FROM files WHERE id = 1")).scalar() == "/ancien/chemin"
+        assert connection.execute(text("SELECT SUM(item_count) FROM storage_stats WHERE user_id = 1")).scalar() == 1
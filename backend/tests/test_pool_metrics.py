@@ -0,0 +1,15 @@
+import os
+
+def test_server_timing_on_streamed_download(client):
+    content = os.urandom(3 * 1048576)
+    file_id = client.post("/api/v1/files/upload", files={"file": ("gros.bin", content)}).json()["id"]
+
+    with client.stream("GET", f"/api/v1/files/{file_id}/download") as response:
+        assert response.status_code == 200
+        assert response.headers["server-timing"].startswith("db-pool;dur=")
+        assert b"".join(response.iter_bytes()) == content
+
+def test_server_timing_on_json_response(client):
+    response = client.get("/api/v1/users/me")
+
+    assert response.headers["server-timing"].startswith("db-pool;dur=")
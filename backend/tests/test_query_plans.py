@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import select
+from app.database import engine
+from app.models.file import File
+from app.scripts.check_indexes import hot_queries, query_plans, explain, sequential_scans
+
+# Index attendus dans le plan (noms SQLite et PostgreSQL) : un index supprimé ou ignoré fait échouer le test
+EXPECTED_INDEXES = {
+    "listing fichiers (dossier)": {"ix_files_user_folder_name", "ix_files_user_folder_deleted"},
+    "listing fichiers (racine)": {"ix_files_user_folder_name", "ix_files_user_folder_deleted"},
+    "listing dossiers (dossier)": {"ix_folders_user_parent_name", "ix_folders_user_parent_deleted"},
+    "listing dossiers (racine)": {"ix_folders_user_parent_name", "ix_folders_user_parent_deleted"},
+    "page de listing (tri par nom, après curseur)": {"ix_files_user_folder_name"},
+    "corbeille fichiers": {"ix_files_user_trash"},
+    "corbeille dossiers": {"ix_folders_user_trash"},
+    "sous-arbre (CTE récursive)": {"ix_folders_parent_deleted"},
+    "fichiers d'un sous-arbre": {"ix_files_folder_deleted"},
+    "recherche par nom": {"ix_search_grams_user_gram", "ix_files_name_trgm"},
+    "recherche par nom (terme court)": {"ix_search_grams_user_gram", "ix_folders_name_trgm"},
+    "recherche dans le contenu": {"sqlite_autoindex_content_terms_1", "content_terms_pkey"},
+}
+
+@pytest.fixture(scope="module")
+def plans(app_client):
+    # Base migrée au démarrage de l'application
+    return {label: (plan, scans) for label, plan, scans in query_plans()}
+
+@pytest.mark.parametrize("label", [label for label, _ in hot_queries(engine.dialect.name)])
+def test_hot_query_has_no_sequential_scan(plans, label):
+    plan, scans = plans[label]
+    assert not scans, "\n".join(plan)
+
+@pytest.mark.parametrize("label", sorted(EXPECTED_INDEXES))
+def test_hot_query_uses_its_index(plans, label):
+    plan, _ = plans[label]
+    used = {index for index in EXPECTED_INDEXES[label] if any(index in line for line in plan)}
+    assert used, "\n".join(plan)
+
+def test_sequential_scan_is_detected(app_client):
+    # Garde-fou : une requête sans index adapté doit bien être signalée
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = explain(connection, select(File).where(File.size > 1000))
+        assert sequential_scans(connection.dialect.name, plan)
+        connection.rollback()
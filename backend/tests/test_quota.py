@@ -0,0 +1,74 @@
+import asyncio
+from collections import Counter
+from sqlalchemy import select, func
+from app.database import AsyncSessionLocal
+from app.models.file import File
+from app.models.user import User
+from app.models.quota_reservation import QuotaReservation
+from tests.conftest import async_client, set_quota, run_async
+
+UPLOADS = 100
+SIZE = 1000
+FITTING = 37
+
+async def _counters(user_id: int):
+    async with AsyncSessionLocal() as db:
+        used, reserved, quota = (await db.execute(
+            select(User.storage_used, User.storage_reserved, User.storage_quota).where(User.id == user_id)
+        )).one()
+        files_size, files_count = (await db.execute(
+            select(func.coalesce(func.sum(File.size), 0), func.count(File.id)).where(File.user_id == user_id)
+        )).one()
+        pending = (await db.execute(
+            select(func.count()).select_from(QuotaReservation).where(QuotaReservation.user_id == user_id)
+        )).scalar()
+
+    return {"used": used, "reserved": reserved, "quota": quota, "files_size": files_size, "files_count": files_count, "pending": pending}
+
+async def _upload_concurrently(uploads, with_sessions: bool = False):
+    client = await async_client()
+    try:
+        # Quota pour FITTING fichiers et une fraction d'un suivant : les uploads simultanés doivent se départager
+        await set_quota(client.user_id, FITTING * SIZE + SIZE // 2)
+
+        async def upload(index):
+            data = (b"%04d" % index) * (SIZE // 4)
+            response = await client.post("/api/v1/files/upload", files={"file": (f"f{index}.txt", data)})
+            return response.status_code
+
+        async def session(index):
+            data = (b"%04d" % index) * (SIZE // 4)
+            response = await client.post("/api/v1/files/uploads", json={"filename": f"s{index}.txt", "size": SIZE})
+            if response.status_code != 201:
+                return response.status_code
+
+            session_id = response.json()["id"]
+            if index % 8 == 0:
+                # Upload abandonné : sa réservation doit être rendue
+                return (await client.delete(f"/api/v1/files/uploads/{session_id}")).status_code
+
+            await client.put(f"/api/v1/files/uploads/{session_id}/chunks/0", content=data)
+            return (await client.post(f"/api/v1/files/uploads/{session_id}/commit")).status_code
+
+        tasks = [session(index) if with_sessions and index % 4 == 0 else upload(index) for index in range(uploads)]
+        statuses = await asyncio.gather(*tasks)
+        return statuses, await _counters(client.user_id)
+    finally:
+        await client.aclose()
+
+def test_concurrent_uploads_never_exceed_quota(app_client):
+    statuses, counters = run_async(app_client, _upload_concurrently, UPLOADS)
+
+    assert Counter(statuses) == {201: FITTING, 413: UPLOADS - FITTING}
+    assert counters["used"] == FITTING * SIZE <= counters["quota"]
+    assert counters["files_count"] == FITTING
+    assert counters["reserved"] == 0
+
+def test_concurrent_uploads_and_sessions_leave_no_drift(app_client):
+    statuses, counters = run_async(app_client, _upload_concurrently, UPLOADS, True)
+
+    # Espace utilisé égal à la somme des fichiers, aucune réservation restante
+    assert counters["used"] == counters["files_size"] <= counters["quota"]
+    assert counters["files_count"] == statuses.count(201)
+    assert counters["reserved"] == 0
+    assert counters["pending"] == 0
@@ -0,0 +1,82 @@
+import contextlib
+import pytest
+from sqlalchemy import event
+from app.database import AsyncSessionLocal, async_engine
+from app.services.folder_service import FolderService
+from app.services.storage_service import StorageService
+from tests.conftest import register_user, run_async
+
+# Arbres de tailles différentes (profondeur, largeur) : 3 dossiers, puis 40 dossiers sur 4 niveaux
+SMALL_TREE = (1, 2)
+LARGE_TREE = (3, 3)
+
+@contextlib.contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+def build_tree(client, depth: int, breadth: int):
+    """Dossier racine, breadth sous-dossiers par dossier sur depth niveaux, un fichier par dossier"""
+    def create(name, parent_id=None):
+        response = client.post("/api/v1/folders/", json={"name": name, "parent_id": parent_id})
+        assert response.status_code == 201, response.text
+        folder_id = response.json()["id"]
+
+        response = client.post("/api/v1/files/upload", data={"folder_id": folder_id}, files={"file": (f"{name}.txt", name.encode())})
+        assert response.status_code == 201, response.text
+        return folder_id
+
+    root_id = create("root")
+    level = [root_id]
+    for depth_index in range(depth):
+        level = [
+            create(f"d{depth_index}-{parent_id}-{index}", parent_id)
+            for parent_id in level
+            for index in range(breadth)
+        ]
+
+    return root_id
+
+def queries_per_operation(client, root_id: int):
+    """Nombre d'instructions SQL de chaque opération sur le sous-arbre, dans la boucle du client"""
+    user_id = client.user_id
+    operations = [
+        ("prepare_download", lambda db: StorageService.prepare_folder_download(db, root_id, user_id)),
+        ("trash", lambda db: FolderService.delete_folder(db, root_id, user_id)),
+        ("restore", lambda db: FolderService.restore_folder(db, root_id, user_id)),
+        ("purge", lambda db: FolderService.delete_folder(db, root_id, user_id, permanent=True)),
+    ]
+
+    counts = {}
+    for name, operation in operations:
+        async def call():
+            async with AsyncSessionLocal() as db:
+                with count_queries() as statements:
+                    assert await operation(db)
+                return len(statements)
+
+        counts[name] = run_async(client, call)
+
+    return counts
+
+@pytest.fixture(scope="module")
+def query_counts(app_client):
+    # Un utilisateur par arbre : mêmes lignes de statistiques à créer de part et d'autre
+    counts = []
+    for tree in (SMALL_TREE, LARGE_TREE):
+        client = register_user(app_client)
+        counts.append(queries_per_operation(client, build_tree(client, *tree)))
+    return counts
+
+@pytest.mark.parametrize("operation", ["prepare_download", "trash", "restore", "purge"])
+def test_tree_operations_run_a_constant_number_of_queries(query_counts, operation):
+    small, large = query_counts
+    assert large[operation] == small[operation]
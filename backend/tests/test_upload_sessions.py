@@ -0,0 +1,32 @@
+import pytest
+from app.database import AsyncSessionLocal
+from app.services.upload_session_service import UploadSessionService
+from tests.conftest import run_async
+
+SIZE = 1000
+
+async def _abort(session_id: str, user_id: int):
+    async with AsyncSessionLocal() as other:
+        assert await UploadSessionService.abort_session(other, session_id, user_id)
+
+async def _claim(session_id: str, user_id: int):
+    # Validation en cours : ligne retirée, morceaux encore présents
+    async with AsyncSessionLocal() as other:
+        assert await UploadSessionService._claim_session(other, session_id, user_id)
+        await other.commit()
+
+async def _write_during(concurrent, session_id: str, user_id: int):
+    async def stream():
+        yield b"a" * (SIZE // 2)
+        await concurrent(session_id, user_id)
+        yield b"a" * (SIZE // 2)
+
+    async with AsyncSessionLocal() as db:
+        return await UploadSessionService.write_chunk(db, session_id, user_id, 0, stream())
+
+@pytest.mark.parametrize("concurrent", [_abort, _claim])
+def test_chunk_for_session_removed_during_upload_is_not_found(client, concurrent):
+    session_id = client.post("/api/v1/files/uploads", json={"filename": "s.txt", "size": SIZE}).json()["id"]
+
+    assert run_async(client, _write_during, concurrent, session_id, client.user_id) is None
+    assert client.get(f"/api/v1/files/uploads/{session_id}").status_code == 404
@@ -0,0 +1,27 @@
+def _login(client, email: str, password: str):
+    return client.post("/api/v1/auth/login", json={"email": email, "password": password})
+
+def test_change_password_updates_stored_user(client):
+    email = client.get("/api/v1/users/me").json()["email"]
+
+    response = client.put("/api/v1/users/me/password", json={"current_password": "secret123", "new_password": "nouveau456"})
+
+    assert response.status_code == 200, response.text
+    assert _login(client, email, "secret123").status_code == 401
+    assert _login(client, email, "nouveau456").status_code == 200
+
+def test_change_password_rejects_wrong_current_password(client):
+    response = client.put("/api/v1/users/me/password", json={"current_password": "mauvais00", "new_password": "nouveau456"})
+
+    assert response.status_code == 401
+
+def test_update_profile_is_visible_immediately(client):
+    response = client.put("/api/v1/users/me", json={"full_name": "Nouveau nom"})
+
+    assert response.status_code == 200, response.text
+    assert client.get("/api/v1/users/me").json()["full_name"] == "Nouveau nom"
+
+def test_disconnect_oauth_requires_active_connection(client):
+    response = client.post("/api/v1/users/me/oauth/disconnect", json={"provider": "google"})
+
+    assert response.status_code == 400
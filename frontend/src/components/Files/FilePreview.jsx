@@ -60,11 +60,14 @@ const FilePreview = ({ show, onHide, file, onDownload }) => {
 
       if (type === 'image') {
         try {
-          const response = await api.get(`/files/${file.id}/preview`, {
+          // Aperçu web redimensionné (mis en cache) ; original si le format n'est pas pris en charge
+          const response = await api.get(`/files/${file.id}/rendition/preview`, {
             responseType: 'blob'
-          });
-          
-          const blob = new Blob([response.data], { type: file.mime_type });
+          }).catch(() => api.get(`/files/${file.id}/preview`, {
+            responseType: 'blob'
+          }));
+
+          const blob = new Blob([response.data], { type: response.headers['content-type'] || file.mime_type });
           const blobUrl = URL.createObjectURL(blob);
           setPreviewUrl(blobUrl);
           setLoading(false);
@@ -1,4 +1,4 @@
-import React, { createContext, useState, useContext, useCallback, useEffect } from 'react';
+import React, { createContext, useState, useContext, useCallback, useEffect, useRef } from 'react';
 import { fileService } from '../services/fileService';
 import { useAuth } from './AuthContext';
 
@@ -14,6 +14,8 @@ export const FileProvider = ({ children }) => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [refreshTrigger, setRefreshTrigger] = useState(0);
+  // Identifiant du chargement en cours : les pages d'un dossier quitté sont ignorées
+  const loadId = useRef(0);
   
   // Déclencheur manuel rafraîchissement pour éviter prop drilling
   const refresh = useCallback(() => {
@@ -22,6 +24,7 @@ export const FileProvider = ({ children }) => {
 
   // Chargement fichiers + dossiers pour un dossier donné
   const fetchContents = useCallback(async (folderId = null) => {
+    const currentLoad = ++loadId.current;
     setLoading(true);
     setError(null);
 
@@ -33,20 +36,30 @@ export const FileProvider = ({ children }) => {
         setCurrentFolder(null);
       }
 
-      // Chargement parallèle pour performance
-      const [filesData, foldersData] = await Promise.all([
-        fileService.getFiles(folderId),
-        fileService.getFolders(folderId)
-      ]);
+      // Première page affichée immédiatement, les suivantes ajoutées au fil de l'eau
+      let page = await fileService.listDirectory(folderId);
+      if (currentLoad !== loadId.current) return;
+
+      setFolders(page.folders);
+      setFiles(page.files);
+      setLoading(false);
+
+      while (page.next_cursor) {
+        page = await fileService.listDirectory(folderId, page.next_cursor);
+        if (currentLoad !== loadId.current) return;
 
-      setFiles(filesData);
-      setFolders(foldersData);
+        const { folders: nextFolders, files: nextFiles } = page;
+        setFolders(prev => [...prev, ...nextFolders]);
+        setFiles(prev => [...prev, ...nextFiles]);
+      }
       
     } catch (err) {
       console.error('Erreur lors du chargement des fichiers/dossiers:', err);
       setError(err.response?.data?.detail || 'Erreur lors du chargement des données');
     } finally {
-      setLoading(false);
+      if (currentLoad === loadId.current) {
+        setLoading(false);
+      }
     }
   }, []);
   
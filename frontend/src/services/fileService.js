@@ -131,6 +131,19 @@ export const fileService = {
 },
 
   
+  // Contenu d'un dossier par pages (sous-dossiers puis fichiers), cursor = next_cursor de la page précédente
+  listDirectory: async (folderId = null, cursor = null, limit = null) => {
+    try {
+      const response = await api.get('/folders/contents', {
+        params: { folder_id: folderId, cursor, limit }
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Erreur lors de la récupération du contenu du dossier:', error);
+      throw error;
+    }
+  },
+
   getFolders: async (parentId = null) => {
     try {
       const response = await api.get('/folders/', {